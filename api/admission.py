@@ -0,0 +1,155 @@
+# api/admission.py
+import logging
+import math
+import threading
+import time
+from typing import Dict, List
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Texts up to this many characters are tokenized exactly; for larger requests a
+# sample is tokenized and the count is scaled by the character count
+EXACT_COUNT_CHARS = 20000
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: float, status_code: int = 429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+class Admission:
+    """Tokens admitted for one request, released back to the global budget when done."""
+
+    def __init__(self, controller: "AdmissionController", tokens: int):
+        self.controller = controller
+        self.tokens = tokens
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self.tokens)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+class AdmissionController:
+    """Bounds the work requests can create, measured in estimated model tokens.
+
+    Each client has a token bucket (rate per second, burst capacity), and the
+    tokens of all admitted, unfinished requests must stay below a global
+    in-flight limit. Requests over either limit are rejected with a retry hint
+    instead of queuing behind everyone else. A limit of 0 disables it.
+    """
+
+    def __init__(self, client_tokens_per_second: float = 0, client_burst_tokens: float = 0,
+                 max_inflight_tokens: int = 0):
+        self.client_rate = client_tokens_per_second
+        self.client_burst = client_burst_tokens
+        self.max_inflight = max_inflight_tokens
+        self.inflight = 0
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.rejected = 0
+        self.admitted = 0
+        self.lock = threading.Lock()
+
+    def estimate_tokens(self, model, texts: List[str], source_lang: str, target_lang: str) -> int:
+        """Estimate input plus expected output tokens from tokenizer counts."""
+        texts = [text for text in texts if text and text.strip()]
+        if not texts:
+            return 0
+
+        total_chars = sum(len(text) for text in texts)
+        if total_chars <= EXACT_COUNT_CHARS:
+            input_tokens = model.count_tokens(texts, source_lang, target_lang)
+        else:
+            # Tokenize a sample spread over the request and scale by characters
+            step = max(1, len(texts) // 50)
+            sample = [text[:EXACT_COUNT_CHARS // 50] for text in texts[::step]]
+            sample_chars = sum(len(text) for text in sample)
+            sample_tokens = model.count_tokens(sample, source_lang, target_lang)
+            input_tokens = math.ceil(sample_tokens * total_chars / max(sample_chars, 1))
+
+        output_tokens = math.ceil(input_tokens * model.length_ratio(source_lang, target_lang))
+        return input_tokens + output_tokens
+
+    def admit(self, client_id: str, tokens: int) -> Admission:
+        now = time.monotonic()
+        with self.lock:
+            bucket = None
+            if self.client_rate and self.client_burst:
+                if tokens > self.client_burst:
+                    self.rejected += 1
+                    raise AdmissionRejected(
+                        f"Request of ~{tokens} tokens exceeds the per-client limit of {int(self.client_burst)} tokens",
+                        retry_after=0,
+                        status_code=413
+                    )
+                bucket = self.buckets.get(client_id)
+                if bucket is None:
+                    bucket = self.buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+                bucket.refill(now)
+                if bucket.tokens < tokens:
+                    self.rejected += 1
+                    raise AdmissionRejected(
+                        f"Token quota exceeded for client '{client_id}'",
+                        retry_after=(tokens - bucket.tokens) / self.client_rate
+                    )
+
+            # A single request larger than the global limit is admitted when nothing else runs
+            if self.max_inflight and self.inflight > 0 and self.inflight + tokens > self.max_inflight:
+                self.rejected += 1
+                raise AdmissionRejected("Server is at capacity", retry_after=1)
+
+            if bucket is not None:
+                bucket.tokens -= tokens
+            self.inflight += tokens
+            self.admitted += 1
+            self._prune_buckets(now)
+        return Admission(self, tokens)
+
+    def _release(self, tokens: int):
+        with self.lock:
+            self.inflight = max(0, self.inflight - tokens)
+
+    def _prune_buckets(self, now: float):
+        # Full buckets carry no state worth keeping
+        if len(self.buckets) > 10000:
+            for client_id, bucket in list(self.buckets.items()):
+                bucket.refill(now)
+                if bucket.tokens >= bucket.capacity:
+                    del self.buckets[client_id]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "inflight_tokens": self.inflight,
+                "max_inflight_tokens": self.max_inflight,
+                "clients": len(self.buckets),
+                "admitted": self.admitted,
+                "rejected": self.rejected
+            }
+
+def admit_request(controller: AdmissionController, client_id: str, tokens: int) -> Admission:
+    """Admit a request or raise the HTTP error telling the client when to retry."""
+    try:
+        return controller.admit(client_id, tokens)
+    except AdmissionRejected as e:
+        logger.info(f"Rejected request of ~{tokens} tokens from {client_id}: {str(e)}")
+        headers = {"Retry-After": str(max(1, math.ceil(e.retry_after)))} if e.status_code == 429 else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
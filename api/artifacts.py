@@ -0,0 +1,286 @@
+# api/artifacts.py
+import email.utils
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Formats worth compressing on the fly; office formats and PDFs are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.txt', '.html', '.htm')
+CHUNK_SIZE = 256 * 1024
+
+class Artifact:
+    def __init__(self, task_id: str, filename: str, path: str, size: int, etag: str, created_at: float):
+        self.task_id = task_id
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.created_at = created_at
+
+    def to_dict(self) -> Dict:
+        return {
+            "task_id": self.task_id,
+            "filename": self.filename,
+            "size": self.size,
+            "etag": self.etag,
+            "created_at": self.created_at
+        }
+
+class ArtifactStore:
+    """Translated files, kept on disk for a retention window after the job finished.
+
+    Downloads no longer consume the file, so interrupted downloads can be resumed
+    and large files fetched in parallel ranges. Metadata is written next to each
+    file, so artifacts in a persistent directory survive restarts.
+    """
+
+    def __init__(self, directory: str, retention_seconds: float):
+        self.directory = directory
+        self.retention = retention_seconds
+        self.artifacts: Dict[str, Artifact] = {}
+        self.lock = threading.Lock()
+        self.last_cleanup = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _paths(self, task_id: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, task_id)
+        return base + ".bin", base + ".json"
+
+    def _load(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                path, _ = self._paths(data["task_id"])
+                if os.path.exists(path):
+                    self.artifacts[data["task_id"]] = Artifact(path=path, **data)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Skipping unreadable artifact metadata {name}: {str(e)}")
+        if self.artifacts:
+            logger.info(f"Found {len(self.artifacts)} stored artifacts in {self.directory}")
+
+    def put(self, task_id: str, filename: str, content: bytes) -> Artifact:
+        path, meta_path = self._paths(task_id)
+        with open(path, 'wb') as f:
+            f.write(content)
+        artifact = Artifact(task_id, filename, path, len(content),
+                            hashlib.sha256(content).hexdigest()[:32], time.time())
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(artifact.to_dict(), f)
+        with self.lock:
+            self.artifacts[task_id] = artifact
+        return artifact
+
+    def get(self, task_id: str) -> Optional[Artifact]:
+        with self.lock:
+            artifact = self.artifacts.get(task_id)
+        if artifact is None or self.expired(artifact, time.time()):
+            return None
+        return artifact
+
+    def expired(self, artifact: Artifact, now: float) -> bool:
+        return now - artifact.created_at > self.retention
+
+    def expires_at(self, artifact: Artifact) -> float:
+        return artifact.created_at + self.retention
+
+    def remove_expired(self, min_interval: float = 60) -> List[str]:
+        """Delete artifacts past retention; returns their task IDs. Runs at most once per interval."""
+        now = time.time()
+        with self.lock:
+            if now - self.last_cleanup < min_interval:
+                return []
+            self.last_cleanup = now
+            expired = [artifact for artifact in self.artifacts.values() if self.expired(artifact, now)]
+            for artifact in expired:
+                del self.artifacts[artifact.task_id]
+
+        for artifact in expired:
+            for path in self._paths(artifact.task_id):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"Artifact cleanup error: {str(e)}")
+        return [artifact.task_id for artifact in expired]
+
+    def disk_bytes(self) -> int:
+        with self.lock:
+            return sum(artifact.size for artifact in self.artifacts.values())
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end inclusive) of a single byte range; None when the header should be ignored.
+
+    Raises ValueError for a syntactically valid but unsatisfiable range.
+    """
+    if not header.startswith("bytes=") or "," in header:
+        # Multiple ranges are answered with the whole file, which RFC 9110 allows
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+def accepts_gzip(header: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, honoring q-values (gzip;q=0 refuses it)."""
+    qualities = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+class ArtifactResponse(Response):
+    """Serves an artifact with Range, ETag/conditional requests and optional gzip.
+
+    When the server offers the ASGI zero-copy send extension, file bytes are
+    handed to the server (sendfile) instead of being read into Python. The
+    uvicorn version pinned in requirements.txt offers neither extension, so
+    there files are read in chunks on the threadpool.
+    """
+
+    def __init__(self, artifact: Artifact, request_headers, method: str = "GET"):
+        self.artifact = artifact
+        self.request_headers = request_headers
+        self.send_body = method != "HEAD"
+        self.background = None
+        self.status_code = 200
+        self.raw_headers = []
+
+    def _base_headers(self, etag: str) -> Dict[str, str]:
+        media_type = mimetypes.guess_type(self.artifact.filename)[0] or "application/octet-stream"
+        return {
+            "content-type": media_type,
+            "content-disposition": f"attachment; filename*=utf-8''{quote(self.artifact.filename)}",
+            "etag": f'"{etag}"',
+            "last-modified": email.utils.formatdate(self.artifact.created_at, usegmt=True),
+            "accept-ranges": "bytes",
+            "cache-control": "private, max-age=0, must-revalidate",
+        }
+
+    async def __call__(self, scope, receive, send):
+        artifact = self.artifact
+        headers = self.request_headers
+
+        gzip_ok = (artifact.filename.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+                   and accepts_gzip(headers.get("accept-encoding", ""))
+                   and "range" not in headers)
+        etag = artifact.etag + "-gzip" if gzip_ok else artifact.etag
+        response_headers = self._base_headers(etag)
+        if artifact.filename.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+            response_headers["vary"] = "Accept-Encoding"
+
+        # Conditional request: the client's copy is current
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or f'"{etag}"' in if_none_match):
+            await self._start(send, 304, response_headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        start, end = 0, artifact.size - 1
+        status = 200
+        range_header = headers.get("range")
+        # If-Range: only honor the range if the file is still the one the client has
+        if range_header and headers.get("if-range", f'"{artifact.etag}"') == f'"{artifact.etag}"':
+            try:
+                byte_range = parse_range(range_header, artifact.size)
+            except ValueError:
+                response_headers["content-range"] = f"bytes */{artifact.size}"
+                response_headers["content-length"] = "0"
+                await self._start(send, 416, response_headers)
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+                response_headers["content-range"] = f"bytes {start}-{end}/{artifact.size}"
+
+        if gzip_ok:
+            response_headers["content-encoding"] = "gzip"
+            await self._start(send, status, response_headers)
+            await self._send_gzip(send)
+            return
+
+        count = end - start + 1 if artifact.size else 0
+        response_headers["content-length"] = str(count)
+        await self._start(send, status, response_headers)
+        if not self.send_body or count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(artifact.path, 'rb') as f:
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": start, "count": count})
+        elif "http.response.pathsend" in extensions and status == 200:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(artifact.path)})
+        else:
+            await self._send_file(send, start, count)
+
+    async def _start(self, send, status: int, headers: Dict[str, str]):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()]
+        })
+
+    async def _send_file(self, send, start: int, count: int):
+        with open(self.artifact.path, 'rb') as f:
+            await run_in_threadpool(f.seek, start)
+            remaining = count
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # The file shrank underneath us; end the response
+            await send({"type": "http.response.body", "body": b""})
+
+    async def _send_gzip(self, send):
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        with open(self.artifact.path, 'rb') as f:
+            while True:
+                chunk = await run_in_threadpool(f.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = compressor.compress(chunk)
+                if data:
+                    await send({"type": "http.response.body", "body": data, "more_body": True})
+        await send({"type": "http.response.body", "body": compressor.flush()})
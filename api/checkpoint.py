@@ -0,0 +1,106 @@
+# api/checkpoint.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Jobs holding each checkpoint file open; the file is removed when the last one completes
+_open_files: Dict[str, int] = {}
+_open_files_lock = threading.Lock()
+
+class SegmentCheckpoint:
+    """Completed segment translations of one document job, appended to a local file.
+
+    Checkpoints are keyed by document hash and language pair, so a re-submitted or
+    restarted job for the same file finds the segments that were already translated.
+    Concurrent jobs for the same document append to the same file.
+    """
+
+    def __init__(self, directory: str, document_hash: str, source_lang: str, target_lang: str):
+        # Language codes come from the request; hashing them keeps them out of the path
+        key = hashlib.sha256(f"{document_hash}\0{source_lang}\0{target_lang}".encode("utf-8")).hexdigest()
+        self.path = os.path.join(directory, f"{key}.jsonl")
+        self.translations: Dict[str, str] = {}
+        self.hits = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        with _open_files_lock:
+            self._load()
+            self.file = open(self.path, 'a', encoding='utf-8')
+            _open_files[self.path] = _open_files.get(self.path, 0) + 1
+        # Segments from an earlier run, each counted once when reused
+        self.resumable = set(self.translations)
+
+    @classmethod
+    def for_document(cls, directory: str, content: bytes, source_lang: str, target_lang: str) -> "SegmentCheckpoint":
+        document_hash = hashlib.sha256(content).hexdigest()
+        return cls(directory, document_hash, source_lang, target_lang)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.translations[entry["source"]] = entry["translation"]
+                except (ValueError, KeyError):
+                    # A partially written last line from a crash
+                    continue
+        if self.translations:
+            logger.info(f"Resuming document job with {len(self.translations)} checkpointed segments from {self.path}")
+
+    def get(self, text: str) -> Optional[str]:
+        with self.lock:
+            if text in self.resumable:
+                self.resumable.discard(text)
+                self.hits += 1
+            return self.translations.get(text)
+
+    def add(self, text: str, translation: str):
+        with self.lock:
+            if text in self.translations:
+                return
+            self.translations[text] = translation
+            self.file.write(json.dumps({"source": text, "translation": translation}, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.close()
+        with _open_files_lock:
+            _open_files[self.path] -= 1
+            if not _open_files[self.path]:
+                del _open_files[self.path]
+
+    def complete(self):
+        """The job finished, the checkpoint is no longer needed unless another job still writes to it."""
+        self.close()
+        with _open_files_lock:
+            if self.path in _open_files:
+                return
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+def cleanup_stale_checkpoints(directory: str, max_age: float):
+    """Remove checkpoints of jobs that were never resumed."""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".jsonl") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError as e:
+            logger.error(f"Checkpoint cleanup error: {str(e)}")
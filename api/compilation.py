@@ -0,0 +1,35 @@
+# api/compilation.py
+import logging
+import torch
+
+logger = logging.getLogger(__name__)
+
+# "torch": torch.compile of the encoder and decoder (dynamic shapes).
+# "ipex": Intel Extension for PyTorch graph and kernel optimizations on CPU.
+COMPILE_MODES = ("torch", "ipex")
+
+def compile_model(model, mode: str):
+    """Return the model optimized for inference in the given mode.
+
+    generate() itself is a Python loop, so the encoder and decoder are what
+    gets compiled. Compilation happens lazily on the first calls for each
+    input shape, which is why compiled models are warmed up over a grid of
+    batch sizes and length buckets before they are reported ready. If the
+    mode cannot be applied, the eager model is returned.
+    """
+    if not mode:
+        return model
+    if mode not in COMPILE_MODES:
+        raise ValueError(f"Unknown compile mode '{mode}'. Supported modes: {', '.join(COMPILE_MODES)}")
+
+    try:
+        if mode == "torch":
+            model.model.encoder = torch.compile(model.model.encoder, dynamic=True)
+            model.model.decoder = torch.compile(model.model.decoder, dynamic=True)
+        elif mode == "ipex":
+            import intel_extension_for_pytorch as ipex
+            model = ipex.optimize(model, dtype=torch.float32, inplace=True)
+        logger.info(f"Model compiled with mode '{mode}'")
+    except Exception as e:
+        logger.error(f"Could not compile model with mode '{mode}', running eagerly: {str(e)}", exc_info=True)
+    return model
@@ -0,0 +1,92 @@
+# api/config.py
+import os
+
+# Model location
+MODEL_PATH = os.environ.get("TRANSLATION_MODEL_PATH", "api/models/m2m100")
+
+# Optional pre-serialized (safetensors, memory-mappable) snapshot created by
+# scripts/build_snapshot.py. Used instead of MODEL_PATH when it exists.
+MODEL_SNAPSHOT_PATH = os.environ.get("TRANSLATION_MODEL_SNAPSHOT", "api/models/m2m100-snapshot")
+
+# Run the warmup translation before reporting readiness
+WARMUP_ENABLED = os.environ.get("TRANSLATION_WARMUP", "1") == "1"
+
+# Opt-in compiled execution: "torch" (torch.compile) or "ipex" (Intel Extension for PyTorch)
+COMPILE_MODE = os.environ.get("TRANSLATION_COMPILE_MODE", "")
+
+# Compiled models pad inputs to these lengths (tokens), and are warmed up for every
+# combination of language pair, batch size and length before reporting readiness
+LENGTH_BUCKETS = [int(n) for n in os.environ.get("TRANSLATION_LENGTH_BUCKETS", "16,32,64,128").split(",") if n]
+WARMUP_BATCH_SIZES = [int(n) for n in os.environ.get("TRANSLATION_WARMUP_BATCH_SIZES", "1,4,16").split(",") if n]
+WARMUP_LANGUAGE_PAIRS = [
+    tuple(pair.split("-", 1)) for pair in os.environ.get("TRANSLATION_WARMUP_PAIRS", "en-es").split(",") if pair
+]
+
+# Language pair -> model routing file (see README), M2M100 serves all other pairs
+MODEL_REGISTRY_PATH = os.environ.get("TRANSLATION_MODEL_REGISTRY", "api/models/registry.json")
+
+# Total parameter memory for loaded models; overrides memory_budget_mb in the registry file
+MODEL_MEMORY_BUDGET_MB = int(os.environ["TRANSLATION_MODEL_MEMORY_MB"]) if os.environ.get("TRANSLATION_MODEL_MEMORY_MB") else None
+
+# Optional decoding policy overrides (greedy threshold, beams, per-pair length ratios)
+DECODING_POLICY_PATH = os.environ.get("TRANSLATION_DECODING_POLICY", "api/models/decoding.json")
+
+# Thread counts, batch size, beams and worker count written by scripts/autotune.py
+PERF_PROFILE_PATH = os.environ.get("TRANSLATION_PERF_PROFILE", "api/models/perf_profile.json")
+
+# Translation memory: segments similar to earlier ones (TM_THRESHOLD, 0-1) reuse their
+# translation with the differing tokens substituted. TM_VERIFY_RATE of the matches are
+# also translated by the model to measure agreement.
+TM_ENABLED = os.environ.get("TRANSLATION_MEMORY", "0") == "1"
+TM_THRESHOLD = float(os.environ.get("TRANSLATION_MEMORY_THRESHOLD", "0.85"))
+TM_MAX_ENTRIES = int(os.environ.get("TRANSLATION_MEMORY_MAX_ENTRIES", "100000"))
+TM_VERIFY_RATE = float(os.environ.get("TRANSLATION_MEMORY_VERIFY_RATE", "0.02"))
+
+# Completed segments of document jobs are checkpointed here so restarted jobs resume.
+# Mount a volume here to survive pod restarts; set to an empty value to disable.
+CHECKPOINT_DIR = os.environ.get("TRANSLATION_CHECKPOINT_DIR", "/tmp/translation-checkpoints")
+
+# Translated files are kept here for downloads (resumable, repeatable) until retention ends.
+# Mount a volume here to keep artifacts across restarts.
+ARTIFACT_DIR = os.environ.get("TRANSLATION_ARTIFACT_DIR", "/tmp/translation-artifacts")
+ARTIFACT_RETENTION_SECONDS = float(os.environ.get("TRANSLATION_ARTIFACT_RETENTION", str(24 * 3600)))
+
+# Translate .docx/.pptx by streaming their text parts (api/ooxml_stream.py) instead of
+# loading them with python-docx/python-pptx; packages the fast path cannot handle fall back
+OOXML_FAST_PATH = os.environ.get("TRANSLATION_OOXML_FAST_PATH", "1") == "1"
+
+# Threads executing model calls from the scheduler queue
+SCHEDULER_WORKERS = int(os.environ.get("TRANSLATION_SCHEDULER_WORKERS", "1"))
+
+# Inference replicas: scheduler workers pinned to disjoint CPU core sets, sharing the
+# loaded weights. 0 keeps SCHEDULER_WORKERS unpinned threads. Threads per replica
+# default to the available cores divided by the replica count.
+INFERENCE_REPLICAS = int(os.environ.get("TRANSLATION_INFERENCE_REPLICAS", "0"))
+INFERENCE_THREADS_PER_REPLICA = int(os.environ.get("TRANSLATION_INFERENCE_THREADS_PER_REPLICA", "0"))
+
+# Editor sessions kept for incremental re-translation, and their idle timeout in seconds
+INCREMENTAL_MAX_SESSIONS = int(os.environ.get("TRANSLATION_INCREMENTAL_MAX_SESSIONS", "1000"))
+INCREMENTAL_SESSION_TTL = float(os.environ.get("TRANSLATION_INCREMENTAL_SESSION_TTL", "3600"))
+
+# Admission control in estimated model tokens (input + expected output); 0 disables a limit.
+# A single request may not exceed the per-client burst.
+ADMISSION_CLIENT_TOKENS_PER_SECOND = float(os.environ.get("TRANSLATION_CLIENT_TOKENS_PER_SECOND", "2000"))
+ADMISSION_CLIENT_BURST_TOKENS = float(os.environ.get("TRANSLATION_CLIENT_BURST_TOKENS", "500000"))
+ADMISSION_MAX_INFLIGHT_TOKENS = int(os.environ.get("TRANSLATION_MAX_INFLIGHT_TOKENS", "1000000"))
+
+# Admin endpoints (model reload) require this token in the X-Admin-Token header;
+# they are disabled when it is empty
+ADMIN_TOKEN = os.environ.get("TRANSLATION_ADMIN_TOKEN", "")
+# After a reload, how long to wait for work on the previous model before giving up on freeing it
+RELOAD_DRAIN_TIMEOUT = float(os.environ.get("TRANSLATION_RELOAD_DRAIN_TIMEOUT", "3600"))
+
+# Serve with a deterministic stub instead of the model (for scripts/loadtest.py).
+# Each model call takes STUB_LATENCY_MS plus STUB_TOKEN_LATENCY_MS per token.
+STUB_MODEL = os.environ.get("TRANSLATION_STUB_MODEL", "0") == "1"
+STUB_LATENCY_MS = float(os.environ.get("TRANSLATION_STUB_LATENCY_MS", "20"))
+STUB_TOKEN_LATENCY_MS = float(os.environ.get("TRANSLATION_STUB_TOKEN_LATENCY_MS", "1"))
+
+# Span tracing of requests and document jobs: "file" (JSONL), "otlp" (OTLP/HTTP JSON) or empty for off
+TRACE_EXPORTER = os.environ.get("TRANSLATION_TRACE_EXPORTER", "")
+TRACE_FILE = os.environ.get("TRANSLATION_TRACE_FILE", "/tmp/translation-traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.environ.get("TRANSLATION_TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
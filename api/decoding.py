@@ -0,0 +1,92 @@
+# api/decoding.py
+import json
+import logging
+import math
+import os
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Typical target/source token length ratios. Pairs not listed use the
+# default ratio, which is deliberately generous.
+DEFAULT_LENGTH_RATIOS = {
+    ("en", "de"): 1.3,
+    ("en", "fr"): 1.3,
+    ("en", "es"): 1.3,
+    ("en", "it"): 1.3,
+    ("en", "pt"): 1.3,
+    ("en", "nl"): 1.25,
+    ("en", "zh"): 1.0,
+    ("en", "ja"): 1.2,
+    ("en", "ko"): 1.2,
+    ("de", "en"): 1.0,
+    ("fr", "en"): 1.0,
+    ("es", "en"): 1.0,
+}
+
+class DecodingPolicy:
+    """Chooses decoding parameters from the input length of a request.
+
+    Short segments (labels, spreadsheet cells, slide titles) are decoded
+    greedily, longer ones with beam search. max_new_tokens follows the input
+    length and the expected length ratio of the language pair instead of a
+    fixed budget, so short inputs stop early and long ones are not cut off.
+    """
+
+    def __init__(self, greedy_max_tokens: int = 12, num_beams: int = 2, default_length_ratio: float = 1.5,
+                 length_margin: int = 10, max_new_tokens: int = 256,
+                 length_ratios: Optional[Dict[Tuple[str, str], float]] = None):
+        self.greedy_max_tokens = greedy_max_tokens
+        self.num_beams = num_beams
+        self.default_length_ratio = default_length_ratio
+        self.length_margin = length_margin
+        self.max_new_tokens = max_new_tokens
+        self.length_ratios = dict(DEFAULT_LENGTH_RATIOS)
+        if length_ratios:
+            self.length_ratios.update(length_ratios)
+
+    @classmethod
+    def from_file(cls, path: Optional[str], **defaults):
+        """Build a policy from a JSON file. A missing file means defaults."""
+        if not path or not os.path.exists(path):
+            return cls(**defaults)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        options = dict(defaults)
+        for name in ("greedy_max_tokens", "num_beams", "default_length_ratio", "length_margin", "max_new_tokens"):
+            if name in data:
+                options[name] = data[name]
+
+        # Ratios are keyed "src-tgt", e.g. {"en-de": 1.3}
+        ratios = {}
+        for pair, ratio in data.get("length_ratios", {}).items():
+            source_lang, target_lang = pair.split("-", 1)
+            ratios[(source_lang, target_lang)] = float(ratio)
+
+        logger.info(f"Loaded decoding policy from {path}")
+        return cls(length_ratios=ratios, **options)
+
+    def length_ratio(self, source_lang: str, target_lang: str) -> float:
+        return self.length_ratios.get((source_lang, target_lang), self.default_length_ratio)
+
+    def max_new_tokens_for(self, input_length: int, source_lang: str, target_lang: str) -> int:
+        budget = math.ceil(input_length * self.length_ratio(source_lang, target_lang)) + self.length_margin
+        return min(budget, self.max_new_tokens)
+
+    def generation_kwargs(self, input_length: int, source_lang: str, target_lang: str,
+                          base: Optional[Dict] = None) -> Dict:
+        """Arguments for model.generate() given the (padded) input token length."""
+        kwargs = dict(base or {})
+        kwargs["max_new_tokens"] = self.max_new_tokens_for(input_length, source_lang, target_lang)
+
+        if input_length <= self.greedy_max_tokens or self.num_beams <= 1:
+            # Beam-only options would only trigger warnings for greedy search
+            kwargs["num_beams"] = 1
+            kwargs.pop("early_stopping", None)
+            kwargs.pop("length_penalty", None)
+        else:
+            kwargs["num_beams"] = self.num_beams
+
+        return kwargs
@@ -6,71 +6,289 @@ import pdfplumber
 from PyPDF2 import PdfReader, PdfWriter
 import tempfile
 import io
+import math
 import os
 from bs4 import BeautifulSoup
 import html
 import logging
+import re
+import zipfile
+from xml.parsers import expat
+from typing import Dict, List, Optional, Tuple
+from .segment_filter import is_translatable
+from .checkpoint import SegmentCheckpoint, cleanup_stale_checkpoints
+from . import docx_extraction, ooxml_stream, pptx_extraction, tracing
 
 logger = logging.getLogger(__name__)
 
-class DocumentTranslator:
-    def __init__(self, translation_model):
-        self.model = translation_model
+SUPPORTED_EXTENSIONS = ('.docx', '.xlsx', '.pptx', '.pdf', '.html', '.htm', '.txt')
 
-    async def translate_docx_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback):
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+def translated_filename(filename: str, target_lang: str) -> str:
+    """Name of the translated output for an input file, e.g. report.docx -> report_translated_de.docx"""
+    base, ext = os.path.splitext(filename)
+    if ext.lower() == '.htm':
+        ext = '.html'
+    return f"{base}_translated_{target_lang}{ext}"
 
-        try:
-            doc = Document(tmp_path)
-            total_items = len(doc.paragraphs) + sum(len(table.rows) * len(table.columns) for table in doc.tables)
-            processed = 0
+# Text-bearing parts of OOXML packages, used for cost estimates
+OOXML_TEXT_PARTS = re.compile(r"^(word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml"
+                              r"|ppt/(slides|notesSlides)/[^/]+\.xml|xl/sharedStrings\.xml)$")
+XML_TAG = re.compile(r"<[^>]+>")
 
-            # Track total metrics
-            total_processing_time = 0
-            total_input_tokens = 0
-            total_output_tokens = 0
+# PDF pages sampled for cost estimates; the rest is extrapolated
+ESTIMATE_PDF_PAGES = 5
 
-            # Translate paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    translation_result = self.model.translate(paragraph.text, source_lang, target_lang)
-                    translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
-                    metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
-                    
-                    paragraph.text = translated_text
-                    
-                    # Safely accumulate metrics
-                    total_input_tokens += metrics.get('input_tokens', 0)
-                    total_output_tokens += metrics.get('output_tokens', 0)
-                    total_processing_time += metrics.get('processing_time', 0)
-                    
-                processed += 1
-                progress_callback(int(processed * 100 / total_items), "Translating document content...")
-
-            # Translate tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            translation_result = self.model.translate(cell.text, source_lang, target_lang)
-                            translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
-                            metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
-                            
-                            cell.text = translated_text
-                            
-                            # Safely accumulate metrics
-                            total_input_tokens += metrics.get('input_tokens', 0)
-                            total_output_tokens += metrics.get('output_tokens', 0)
-                            total_processing_time += metrics.get('processing_time', 0)
-                            
-                        processed += 1
-                        progress_callback(int(processed * 100 / total_items), "Translating tables...")
+def extract_text_for_estimate(content: bytes, filename: str) -> List[str]:
+    """Cheaply extract a document's text to estimate its translation cost.
 
-            doc.save(tmp_path)
-            with open(tmp_path, 'rb') as f:
-                content = f.read()
+    Avoids building the python-docx/pptx/openpyxl object models: OOXML text
+    parts are read straight from the zip with their tags stripped.
+    """
+    ext = os.path.splitext(filename.lower())[1]
+    content = bytes(content)
+
+    if ext == '.txt':
+        try:
+            return [content.decode('utf-8')]
+        except UnicodeDecodeError:
+            return [content.decode('iso-8859-1')]
+
+    if ext in ('.html', '.htm'):
+        return [html.unescape(XML_TAG.sub(' ', content.decode('utf-8', errors='ignore')))]
+
+    if ext in ('.docx', '.pptx', '.xlsx'):
+        texts = []
+        with zipfile.ZipFile(io.BytesIO(content)) as package:
+            for name in package.namelist():
+                if OOXML_TEXT_PARTS.match(name):
+                    xml = package.read(name).decode('utf-8', errors='ignore')
+                    texts.append(html.unescape(XML_TAG.sub(' ', xml)))
+        return texts
+
+    if ext == '.pdf':
+        reader = PdfReader(io.BytesIO(content))
+        pages = reader.pages
+        sampled = [pages[i].extract_text() or "" for i in range(min(len(pages), ESTIMATE_PDF_PAGES))]
+        if len(pages) > len(sampled) and sampled:
+            # Assume the remaining pages look like the sampled ones
+            sampled = sampled * math.ceil(len(pages) / len(sampled))
+        return sampled
+
+    return []
+
+# Checkpoints of jobs that were not resumed within this time are removed
+CHECKPOINT_MAX_AGE = 7 * 24 * 3600
+
+# Segments per translate_batch call when a document is translated in batches
+DOCUMENT_BATCH_SIZE = 32
+# translate_batch truncates long inputs, so longer or multi-line segments are
+# translated one at a time, where TranslationModel splits them into chunks
+BATCH_MAX_CHARS = 128
+
+class DocumentJob:
+    """Per-document state shared by the translate_*_with_progress methods."""
+
+    def __init__(self, checkpoint: Optional[SegmentCheckpoint] = None, client_id: str = "default"):
+        self.checkpoint = checkpoint
+        self.client_id = client_id
+
+class DocumentTranslator:
+    def __init__(self, translation_model, checkpoint_dir: Optional[str] = None, scheduler=None,
+                 ooxml_fast_path: bool = True):
+        self.model = translation_model
+        self.checkpoint_dir = checkpoint_dir
+        # Translate .docx/.pptx by streaming their XML instead of loading the object model
+        self.ooxml_fast_path = ooxml_fast_path
+        # Documents being translated; a replaced model is kept until these finish
+        self.active_jobs = 0
+        # Without a scheduler (e.g. offline batch runs) the model is called directly
+        self.scheduler = scheduler
+        if checkpoint_dir:
+            cleanup_stale_checkpoints(checkpoint_dir, CHECKPOINT_MAX_AGE)
+
+    async def _run_model(self, job: DocumentJob, fn, *args):
+        if self.scheduler is not None:
+            # Document work runs at the lowest priority, one segment or batch at
+            # a time, so interactive requests get in between
+            return await self.scheduler.run("document", job.client_id, fn, *args)
+        return fn(*args)
+
+    async def _translate_segment(self, text: str, source_lang: str, target_lang: str,
+                                 job: Optional[DocumentJob] = None) -> Tuple[str, Dict]:
+        """Translate one segment, reusing and recording checkpointed translations."""
+        job = job or DocumentJob()
+        if job.checkpoint is not None:
+            translated_text = job.checkpoint.get(text)
+            if translated_text is not None:
+                return translated_text, {}
+
+        translation_result = await self._run_model(job, self.model.translate, text, source_lang, target_lang)
+        translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
+        metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
+
+        if job.checkpoint is not None:
+            job.checkpoint.add(text, translated_text)
+        return translated_text, metrics
+
+    async def _translate_segments(self, texts: List[str], source_lang: str, target_lang: str,
+                                  job: Optional[DocumentJob], progress_callback, message: str) -> Tuple[Dict[str, str], Dict]:
+        """Translate the distinct texts of a document in batches.
+
+        Returns a text -> translation map and the token metrics. Checkpointed
+        segments are reused, and progress is reported after every batch.
+        """
+        job = job or DocumentJob()
+        unique_texts = [text for text in dict.fromkeys(texts) if is_translatable(text)]
+        translations: Dict[str, str] = {}
+        totals = {"input_tokens": 0, "output_tokens": 0, "processing_time": 0}
+
+        short_texts = []
+        long_texts = []
+        for text in unique_texts:
+            translated_text = job.checkpoint.get(text) if job.checkpoint is not None else None
+            if translated_text is not None:
+                translations[text] = translated_text
+            elif len(text) > BATCH_MAX_CHARS or "\n" in text:
+                long_texts.append(text)
+            else:
+                short_texts.append(text)
+
+        batches = [short_texts[start:start + DOCUMENT_BATCH_SIZE]
+                   for start in range(0, len(short_texts), DOCUMENT_BATCH_SIZE)]
+
+        def record(metrics: Dict):
+            for key in totals:
+                totals[key] += metrics.get(key, 0)
+            progress_callback(min(int(len(translations) * 100 / len(unique_texts)), 99), message)
+
+        for batch in batches:
+            with tracing.span("translate_batch", segments=len(batch)):
+                translated_texts, metrics = await self._run_model(
+                    job, self.model.translate_batch, batch, source_lang, target_lang
+                )
+            for text, translated_text in zip(batch, translated_texts):
+                translations[text] = translated_text
+                if job.checkpoint is not None:
+                    job.checkpoint.add(text, translated_text)
+            record(metrics)
+
+        for text in long_texts:
+            translations[text], metrics = await self._translate_segment(text, source_lang, target_lang, job)
+            record(metrics)
+
+        return translations, totals
+
+    async def _translate_ooxml_stream(self, content: bytes, ext: str, source_lang: str, target_lang: str,
+                                      progress_callback, job: Optional[DocumentJob], message: str):
+        """Translate a .docx/.pptx with ooxml_stream; None if the package needs the object model."""
+        package = ooxml_stream.OoxmlPackage(bytes(content), ext)
+        try:
+            with tracing.span("extract", fast_path=True) as span:
+                segments = package.extract()
+                span.set_attribute("segments", len(segments))
+        except (ooxml_stream.UnsupportedPackage, expat.ExpatError) as e:
+            logger.info(f"Falling back to the object model for {ext}: {str(e)}")
+            return None
+
+        translations, totals = await self._translate_segments(
+            [segment.text for segment in segments], source_lang, target_lang, job,
+            progress_callback, message
+        )
+        try:
+            with tracing.span("write_back", fast_path=True):
+                content = package.write(translations)
+        except ooxml_stream.UnsupportedPackage as e:
+            # The object model translates again, mostly from the cache and checkpoint
+            logger.info(f"Falling back to the object model for {ext}: {str(e)}")
+            return None
+
+        total_tokens = totals["input_tokens"] + totals["output_tokens"]
+        return content, {
+            "tokens_per_second": round(total_tokens / totals["processing_time"], 2) if totals["processing_time"] > 0 else 0,
+            "total_tokens": total_tokens,
+            "input_tokens": totals["input_tokens"],
+            "output_tokens": totals["output_tokens"],
+            "processing_time": round(totals["processing_time"], 2),
+            "cached": False
+        }
+
+    async def translate_file(self, content: bytes, filename: str, source_lang: str, target_lang: str, progress_callback,
+                             client_id: str = "default"):
+        """Translate a document of any supported type, picked by its file extension.
+
+        With a checkpoint directory, finished segments are saved as they are translated,
+        and a restarted or re-submitted job for the same document only translates the rest.
+        """
+        ext = os.path.splitext(filename.lower())[1]
+        translate_methods = {
+            '.docx': self.translate_docx_with_progress,
+            '.xlsx': self.translate_xlsx_with_progress,
+            '.pptx': self.translate_pptx_with_progress,
+            '.pdf': self.translate_pdf_with_progress,
+            '.html': self.translate_html_with_progress,
+            '.htm': self.translate_html_with_progress,
+            '.txt': self.translate_txt_with_progress,
+        }
+        if ext not in translate_methods:
+            raise ValueError(f"Unsupported file type: {ext}")
+
+        checkpoint = None
+        if self.checkpoint_dir:
+            checkpoint = SegmentCheckpoint.for_document(self.checkpoint_dir, bytes(content), source_lang, target_lang)
+
+        job = DocumentJob(checkpoint=checkpoint, client_id=client_id)
+        self.active_jobs += 1
+        try:
+            with tracing.span("translate_file", format=ext, bytes=len(content)):
+                translated_content, metrics = await translate_methods[ext](
+                    content, source_lang, target_lang, progress_callback, job=job
+                )
+        finally:
+            self.active_jobs -= 1
+            if checkpoint is not None:
+                checkpoint.close()
+
+        if checkpoint is not None:
+            metrics["resumed_segments"] = checkpoint.hits
+            checkpoint.complete()
+        return translated_content, metrics
+
+    async def translate_docx_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback, job: Optional[DocumentJob] = None):
+        if self.ooxml_fast_path:
+            result = await self._translate_ooxml_stream(content, '.docx', source_lang, target_lang,
+                                                        progress_callback, job, "Translating document content...")
+            if result is not None:
+                return result
+
+        with tracing.span("tempfile.write"):
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
+                tmp_file.write(content)
+                tmp_path = tmp_file.name
+
+        try:
+            with tracing.span("extract") as span:
+                doc = Document(tmp_path)
+
+                # Body, tables, nested tables, text boxes, headers and footers,
+                # each paragraph once; identical texts are translated once
+                paragraphs = [paragraph for paragraph in docx_extraction.iter_paragraphs(doc) if is_translatable(paragraph.text)]
+                span.set_attribute("segments", len(paragraphs))
+            translations, totals = await self._translate_segments(
+                [paragraph.text for paragraph in paragraphs], source_lang, target_lang, job,
+                progress_callback, "Translating document content..."
+            )
+            with tracing.span("write_back"):
+                for paragraph in paragraphs:
+                    docx_extraction.set_paragraph_text(paragraph, translations[paragraph.text])
+
+            total_processing_time = totals["processing_time"]
+            total_input_tokens = totals["input_tokens"]
+            total_output_tokens = totals["output_tokens"]
+
+            with tracing.span("tempfile.save"):
+                doc.save(tmp_path)
+                with open(tmp_path, 'rb') as f:
+                    content = f.read()
 
             # Calculate final metrics
             total_tokens = total_input_tokens + total_output_tokens
@@ -91,7 +309,7 @@ class DocumentTranslator:
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
 
-    async def translate_xlsx_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback):
+    async def translate_xlsx_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback, job: Optional[DocumentJob] = None):
         with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
             tmp_file.write(content)
             tmp_path = tmp_file.name
@@ -108,15 +326,13 @@ class DocumentTranslator:
 
             for sheet in wb.worksheets:
                 rows = list(sheet.rows)
-                total_cells = sum(1 for row in rows for cell in row if cell.value and isinstance(cell.value, str))
+                total_cells = sum(1 for row in rows for cell in row if isinstance(cell.value, str) and is_translatable(cell.value))
                 processed_cells = 0
 
                 for row in rows:
                     for cell in row:
-                        if cell.value and isinstance(cell.value, str):
-                            translation_result = self.model.translate(cell.value, source_lang, target_lang)
-                            translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
-                            metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
+                        if isinstance(cell.value, str) and is_translatable(cell.value):
+                            translated_text, metrics = await self._translate_segment(cell.value, source_lang, target_lang, job)
                             
                             cell.value = translated_text
                             
@@ -155,49 +371,46 @@ class DocumentTranslator:
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
 
-    async def translate_pptx_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback):
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp_file:
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-
-        try:
-            prs = Presentation(tmp_path)
-            total_slides = len(prs.slides)
-            processed_slides = 0
+    async def translate_pptx_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback, job: Optional[DocumentJob] = None):
+        if self.ooxml_fast_path:
+            result = await self._translate_ooxml_stream(content, '.pptx', source_lang, target_lang,
+                                                        progress_callback, job, "Translating slides...")
+            if result is not None:
+                return result
 
-            # Track total metrics
-            total_processing_time = 0
-            total_input_tokens = 0
-            total_output_tokens = 0
+        with tracing.span("tempfile.write"):
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp_file:
+                tmp_file.write(content)
+                tmp_path = tmp_file.name
 
-            for slide in prs.slides:
-                shapes = [shape for shape in slide.shapes if hasattr(shape, "text")]
-                total_shapes = len(shapes)
-                processed_shapes = 0
-
-                for shape in shapes:
-                    if shape.text.strip():
-                        translation_result = self.model.translate(shape.text, source_lang, target_lang)
-                        translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
-                        metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
-                        
-                        shape.text = translated_text
-                        
-                        # Safely accumulate metrics
-                        total_input_tokens += metrics.get('input_tokens', 0)
-                        total_output_tokens += metrics.get('output_tokens', 0)
-                        total_processing_time += metrics.get('processing_time', 0)
-                        
-                    processed_shapes += 1
-                    progress = int((processed_slides * 100 / total_slides) + 
-                                 (processed_shapes * 100 / total_shapes / total_slides))
-                    progress_callback(min(progress, 99), f"Translating slide {processed_slides + 1}...")
-
-                processed_slides += 1
-
-            prs.save(tmp_path)
-            with open(tmp_path, 'rb') as f:
-                content = f.read()
+        try:
+            with tracing.span("extract") as span:
+                prs = Presentation(tmp_path)
+
+                # Shapes, groups, table cells and speaker notes, paragraph by paragraph.
+                # Footers and template strings repeated on every slide are translated once.
+                paragraphs = [
+                    (paragraph, pptx_extraction.paragraph_text(paragraph))
+                    for paragraph in pptx_extraction.text_paragraphs(prs)
+                ]
+                span.set_attribute("segments", len(paragraphs))
+            translations, totals = await self._translate_segments(
+                [text for _, text in paragraphs], source_lang, target_lang, job,
+                progress_callback, "Translating slides..."
+            )
+            with tracing.span("write_back"):
+                for paragraph, text in paragraphs:
+                    if text in translations:
+                        pptx_extraction.set_paragraph_text(paragraph, translations[text])
+
+            total_processing_time = totals["processing_time"]
+            total_input_tokens = totals["input_tokens"]
+            total_output_tokens = totals["output_tokens"]
+
+            with tracing.span("tempfile.save"):
+                prs.save(tmp_path)
+                with open(tmp_path, 'rb') as f:
+                    content = f.read()
 
             # Calculate final metrics
             total_tokens = total_input_tokens + total_output_tokens
@@ -217,7 +430,7 @@ class DocumentTranslator:
         finally:
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
-    async def translate_pdf_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback):
+    async def translate_pdf_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback, job: Optional[DocumentJob] = None):
         # Create a temporary file to work with the PDF
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
             tmp_file.write(content)
@@ -263,11 +476,9 @@ class DocumentTranslator:
                     # Process and translate each text element
                     total_elements = len(text_elements)
                     for idx, element in enumerate(text_elements):
-                        if element['text'].strip():
+                        if is_translatable(element['text']):
                             # Translate the text
-                            translation_result = self.model.translate(element['text'], source_lang, target_lang)
-                            translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
-                            metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
+                            translated_text, metrics = await self._translate_segment(element['text'], source_lang, target_lang, job)
                             
                             # Update metrics
                             total_input_tokens += metrics.get('input_tokens', 0)
@@ -280,6 +491,13 @@ class DocumentTranslator:
                                 'x': element['x0'],
                                 'y': element['y0']
                             })
+                        else:
+                            # Numbers, dates, codes etc. keep their original text
+                            translated_content.append({
+                                'text': element['text'],
+                                'x': element['x0'],
+                                'y': element['y0']
+                            })
 
                         # Update progress
                         current_progress = (page_num * 100 // total_pages) + (idx * 100 // total_elements // total_pages)
@@ -324,7 +542,7 @@ class DocumentTranslator:
         finally:
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
-    async def translate_html_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback):
+    async def translate_html_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback, job: Optional[DocumentJob] = None):
         try:
             # Convert bytes to string
             html_content = content.decode('utf-8')
@@ -335,7 +553,7 @@ class DocumentTranslator:
             # Get all text elements (focusing on common text-containing tags)
             text_elements = []
             for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'span', 'div', 'li', 'td', 'th', 'a']):
-                if tag.string and tag.string.strip():
+                if tag.string and is_translatable(tag.string):
                     text_elements.append(tag)
 
             total_elements = len(text_elements)
@@ -348,11 +566,9 @@ class DocumentTranslator:
 
             # Translate each text element
             for element in text_elements:
-                if element.string and element.string.strip():
+                if element.string and is_translatable(element.string):
                     # Translate the text
-                    translation_result = self.model.translate(element.string, source_lang, target_lang)
-                    translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
-                    metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
+                    translated_text, metrics = await self._translate_segment(element.string, source_lang, target_lang, job)
                     
                     # Update metrics
                     total_input_tokens += metrics.get('input_tokens', 0)
@@ -388,7 +604,7 @@ class DocumentTranslator:
             logger.error(f"Text file translation error: {str(e)}")
             raise
 # Add to DocumentTranslator class
-    async def translate_txt_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback):
+    async def translate_txt_with_progress(self, content: bytes, source_lang: str, target_lang: str, progress_callback, job: Optional[DocumentJob] = None):
         try:
             logger.info("Starting text file translation")
             # Decode text content with error handling
@@ -427,11 +643,9 @@ class DocumentTranslator:
             
             # Translate each paragraph
             for paragraph in paragraphs:
-                if paragraph:
+                if is_translatable(paragraph):
                     # Translate the text
-                    translation_result = self.model.translate(paragraph, source_lang, target_lang)
-                    translated_text = translation_result[0] if isinstance(translation_result, tuple) else translation_result
-                    metrics = translation_result[1] if isinstance(translation_result, tuple) else {}
+                    translated_text, metrics = await self._translate_segment(paragraph, source_lang, target_lang, job)
                     
                     # Update metrics
                     total_input_tokens += metrics.get('input_tokens', 0)
@@ -439,6 +653,9 @@ class DocumentTranslator:
                     total_processing_time += metrics.get('processing_time', 0)
                     
                     translated_paragraphs.append(translated_text)
+                else:
+                    # Numbers, dates, codes etc. are kept as they are
+                    translated_paragraphs.append(paragraph)
                 
                 processed += 1
                 progress = int(processed * 100 / total_paragraphs)
@@ -0,0 +1,49 @@
+# api/docx_extraction.py
+from typing import Iterator, List
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+# Parts with their own text besides the main document body
+STORY_RELATIONSHIPS = (RT.HEADER, RT.FOOTER)
+
+def story_roots(doc) -> List:
+    """XML roots of the body and of every header and footer part, each part once.
+
+    Sections that reuse the previous section's header point to the same part,
+    so going through the document's relationships visits each part once,
+    including first-page and even-page headers and footers.
+    """
+    roots = [doc.element.body]
+    seen = set()
+    for rel in doc.part.rels.values():
+        if rel.reltype in STORY_RELATIONSHIPS and rel.target_part.partname not in seen:
+            seen.add(rel.target_part.partname)
+            roots.append(rel.target_part.element)
+    return roots
+
+def iter_paragraphs(doc) -> Iterator[Paragraph]:
+    """Every paragraph of the document exactly once.
+
+    Walks the XML rather than python-docx's tables API: row.cells returns a
+    merged cell once per grid column it spans, while the XML has one <w:tc>
+    per cell. Walking all <w:p> elements also reaches nested tables, text
+    boxes and content controls.
+    """
+    for root in story_roots(doc):
+        for p in root.iter(qn('w:p')):
+            yield Paragraph(p, None)
+
+def set_paragraph_text(paragraph: Paragraph, text: str):
+    """Replace a paragraph's text, keeping the formatting of its first run.
+
+    The translation has no word alignment to the source runs, so formatting
+    and hyperlinks of the other runs (a bold word, a linked phrase) are lost.
+    """
+    runs = [run for run in paragraph.runs if run.text]
+    if not runs:
+        paragraph.text = text
+        return
+    runs[0].text = text
+    for run in runs[1:]:
+        run.text = ""
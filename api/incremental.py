@@ -0,0 +1,154 @@
+# api/incremental.py
+import difflib
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .segment_filter import is_translatable
+
+# translate_batch truncates long inputs; longer sentences go through translate(),
+# which splits them into chunks
+BATCH_MAX_CHARS = 128
+
+# Sentence ends, and line breaks, with the whitespace after them
+SENTENCE_BREAK_RE = re.compile(r"((?<=[.!?。！？])\s+|\s*\n\s*)")
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    """Split text into (sentence, following whitespace) pairs that join back to the text."""
+    parts = SENTENCE_BREAK_RE.split(text)
+    # re.split alternates text and captured separators; pad the last sentence
+    parts.append("")
+    return [(parts[i], parts[i + 1]) for i in range(0, len(parts) - 1, 2) if parts[i] or parts[i + 1]]
+
+class EditorSession:
+    def __init__(self, session_id: str, source_lang: str, target_lang: str):
+        self.session_id = session_id
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.revision = 0
+        self.sentences: List[str] = []
+        self.translations: List[str] = []
+        # Translated sentence plus the source's whitespace after it, joined for the full translation
+        self.segments: List[str] = []
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+class IncrementalTranslator:
+    """Keeps the last version of each editor session and re-translates only what changed.
+
+    The new text is diffed against the previous version at sentence level.
+    Unchanged sentences keep their translation, changed and inserted ones are
+    translated in one batch, and the client gets a patch against the
+    translated segments it already has.
+    """
+
+    def __init__(self, max_sessions: int = 1000, session_ttl: float = 3600):
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.sessions: "OrderedDict[str, EditorSession]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _session(self, session_id: Optional[str], source_lang: str, target_lang: str) -> EditorSession:
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(session_id) if session_id else None
+            if session is None or (session.source_lang, session.target_lang) != (source_lang, target_lang):
+                session = EditorSession(session_id or uuid.uuid4().hex, source_lang, target_lang)
+                self.sessions[session.session_id] = session
+            self.sessions.move_to_end(session.session_id)
+            session.last_used = now
+
+            # Drop sessions that were idle too long, and the least recently used beyond the limit
+            while self.sessions:
+                oldest = next(iter(self.sessions.values()))
+                if len(self.sessions) <= self.max_sessions and now - oldest.last_used < self.session_ttl:
+                    break
+                del self.sessions[oldest.session_id]
+            return session
+
+    def changed_sentences(self, session_id: Optional[str], text: str, source_lang: str, target_lang: str) -> List[str]:
+        """Sentences that would be translated for this edit, for cost estimates."""
+        with self.lock:
+            session = self.sessions.get(session_id) if session_id else None
+        previous = set()
+        if session is not None and (session.source_lang, session.target_lang) == (source_lang, target_lang):
+            previous = set(session.sentences)
+        return [sentence for sentence, _ in split_sentences(text) if sentence not in previous]
+
+    def update(self, model, session_id: Optional[str], text: str, source_lang: str, target_lang: str,
+               base_revision: Optional[int] = None) -> Dict:
+        """Translate a new version of the session's text and return the patch."""
+        session = self._session(session_id, source_lang, target_lang)
+        with session.lock:
+            pairs = split_sentences(text)
+            sentences = [sentence for sentence, _ in pairs]
+
+            # Reuse translations of unchanged sentences, collect the rest
+            translations: List[Optional[str]] = [None] * len(sentences)
+            matcher = difflib.SequenceMatcher(a=session.sentences, b=sentences, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == "equal":
+                    for offset in range(i2 - i1):
+                        translations[j1 + offset] = session.translations[i1 + offset]
+
+            to_translate = []
+            for j, translation in enumerate(translations):
+                if translation is None:
+                    if is_translatable(sentences[j]):
+                        to_translate.append(j)
+                    else:
+                        # Numbers, codes etc. pass through unchanged
+                        translations[j] = sentences[j]
+
+            metrics = {"processing_time": 0, "input_tokens": 0, "output_tokens": 0}
+            short = [j for j in to_translate if len(sentences[j]) <= BATCH_MAX_CHARS]
+            if short:
+                new_translations, batch_metrics = model.translate_batch(
+                    [sentences[j] for j in short], source_lang, target_lang
+                )
+                for j, translation in zip(short, new_translations):
+                    translations[j] = translation
+                for key in metrics:
+                    metrics[key] += batch_metrics.get(key, 0)
+            for j in to_translate:
+                if translations[j] is None:
+                    translations[j], line_metrics = model.translate(sentences[j], source_lang, target_lang)
+                    for key in metrics:
+                        metrics[key] += line_metrics.get(key, 0)
+
+            segments = [translation + separator for translation, (_, separator) in zip(translations, pairs)]
+
+            # A client on another revision (or a new session) gets the full translation
+            full = base_revision is None or base_revision != session.revision
+            patch = []
+            if not full:
+                segment_matcher = difflib.SequenceMatcher(a=session.segments, b=segments, autojunk=False)
+                patch = [
+                    {"start": i1, "end": i2, "segments": segments[j1:j2]}
+                    for tag, i1, i2, j1, j2 in segment_matcher.get_opcodes()
+                    if tag != "equal"
+                ]
+
+            session.sentences = sentences
+            session.translations = translations
+            session.segments = segments
+            session.revision += 1
+
+            total_tokens = metrics["input_tokens"] + metrics["output_tokens"]
+            return {
+                "session_id": session.session_id,
+                "revision": session.revision,
+                "full": full,
+                "segments": segments if full else None,
+                "patch": patch,
+                "metrics": {
+                    **metrics,
+                    "total_tokens": total_tokens,
+                    "tokens_per_second": round(total_tokens / metrics["processing_time"], 2) if metrics["processing_time"] > 0 else 0,
+                    "sentences": len(sentences),
+                    "translated_sentences": len(to_translate),
+                    "reused_sentences": len(sentences) - len(to_translate)
+                }
+            }
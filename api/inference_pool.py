@@ -0,0 +1,105 @@
+# api/inference_pool.py
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on (respects cgroup/taskset limits where the OS exposes them)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+class Replica:
+    def __init__(self, index: int, cpus: List[int], threads: int):
+        self.index = index
+        self.cpus = cpus
+        # Intra-op threads for the whole process: one replica's share of the cores
+        self.threads = threads
+        self.jobs = 0
+        self.busy_seconds = 0.0
+        self.busy = False
+
+    def to_dict(self) -> Dict:
+        return {
+            "index": self.index,
+            "cpus": self.cpus,
+            "threads": self.threads,
+            "jobs": self.jobs,
+            "busy": self.busy,
+            "busy_seconds": round(self.busy_seconds, 2)
+        }
+
+class InferencePool:
+    """N inference replicas over one set of model weights, each on its own CPU cores.
+
+    A replica is a scheduler worker thread pinned to a disjoint core set. All
+    replicas call the same loaded models, so the weights are in memory once.
+    Several small requests then run side by side on separate cores instead of
+    one generate() call spreading thin over every core. Free replicas take the
+    next job from the scheduler queue, so dispatch follows the scheduler's
+    priorities and per-client fairness.
+
+    This gives affinity, not isolation: torch's intra-op thread count is
+    process-wide, so the model sets it once to one replica's share (threads),
+    and every replica still shares its model's single tokenizer thread.
+    """
+
+    def __init__(self, replicas: int, threads_per_replica: int = 0, cpus: Optional[List[int]] = None):
+        cpus = cpus or available_cpus()
+        if replicas < 1:
+            raise ValueError("An inference pool needs at least one replica")
+        if replicas > len(cpus):
+            logger.warning(f"{replicas} replicas for {len(cpus)} CPUs, using {len(cpus)}")
+            replicas = len(cpus)
+        threads = threads_per_replica or len(cpus) // replicas
+        if threads * replicas > len(cpus):
+            logger.warning(f"{replicas} replicas x {threads} threads oversubscribe {len(cpus)} CPUs, "
+                           f"using {len(cpus) // replicas} threads per replica")
+            threads = len(cpus) // replicas
+        # Intra-op threads for the whole process: one replica's share of the cores
+        self.threads = threads
+        self.replicas = [
+            Replica(i, cpus[i * threads:(i + 1) * threads], threads)
+            for i in range(replicas)
+        ]
+        self.lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.replicas)
+
+    def bind(self, index: int):
+        """Pin the calling thread to replica index's cores."""
+        replica = self.replicas[index]
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                # On Linux, PID 0 is the calling thread; OpenMP threads it starts inherit the mask
+                os.sched_setaffinity(0, replica.cpus)
+            except OSError as e:
+                logger.warning(f"Could not pin replica {index} to CPUs {replica.cpus}: {str(e)}")
+        # The intra-op thread count is process-wide; the model is loaded with self.threads (main.load_model)
+        logger.info(f"Inference replica {index} on CPUs {replica.cpus} with {replica.threads} threads")
+
+    def execute(self, index: int, fn: Callable):
+        replica = self.replicas[index]
+        with self.lock:
+            replica.busy = True
+        start = time.monotonic()
+        try:
+            return fn()
+        finally:
+            with self.lock:
+                replica.busy = False
+                replica.jobs += 1
+                replica.busy_seconds += time.monotonic() - start
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "replicas": [replica.to_dict() for replica in self.replicas],
+                "busy": sum(replica.busy for replica in self.replicas)
+            }
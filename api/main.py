@@ -5,70 +5,205 @@ from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from fastapi.requests import Request
 import logging
-from .model import TranslationModel
+import threading
+import time
+from typing import Dict
+from .model_registry import ModelRegistry, load_configured_registry
 from .document_translator import DocumentTranslator
-from .routers import translation, document, websocket, system
+from .scheduler import TranslationScheduler
+from .inference_pool import InferencePool
+from .perf_profile import load_profile
+from .admission import AdmissionController
+from .incremental import IncrementalTranslator
+from .artifacts import ArtifactStore
+from .resources import LeakTracker
+from .reload import ModelReloader
+from .stub_model import StubTranslationModel
+from .routers import translation, document, websocket, system, admin
+from . import config, tracing
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Model lifecycle state, shared with the system router for liveness/readiness
+model_state: Dict = {
+    "state": "starting",
+    "error": None,
+    "started_at": None,
+    "ready_at": None
+}
+
+# Model calls run on replicas pinned to their own cores, if configured
+inference_pool = (
+    InferencePool(config.INFERENCE_REPLICAS, config.INFERENCE_THREADS_PER_REPLICA)
+    if config.INFERENCE_REPLICAS else None
+)
+
+# Orders model work by priority class (interactive, batch, document) and client
+scheduler = TranslationScheduler(workers=config.SCHEDULER_WORKERS, pool=inference_pool)
+
+# Token-based quotas per client and a global in-flight limit
+admission = AdmissionController(
+    client_tokens_per_second=config.ADMISSION_CLIENT_TOKENS_PER_SECOND,
+    client_burst_tokens=config.ADMISSION_CLIENT_BURST_TOKENS,
+    max_inflight_tokens=config.ADMISSION_MAX_INFLIGHT_TOKENS
+)
+
+# Previous versions of editor texts, so edits only re-translate changed sentences
+incremental = IncrementalTranslator(
+    max_sessions=config.INCREMENTAL_MAX_SESSIONS,
+    session_ttl=config.INCREMENTAL_SESSION_TTL
+)
+
+# Translated files, downloadable until their retention expires
+artifacts = ArtifactStore(config.ARTIFACT_DIR, config.ARTIFACT_RETENTION_SECONDS)
+
+# tracemalloc snapshots for /api/admin/tracemalloc/, off until requested
+leak_tracker = LeakTracker()
+
 def create_application() -> FastAPI:
     # Initialize FastAPI app
     app = FastAPI(title="Translation API")
-    
+
     # Mount static files and templates
     app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
     templates = Jinja2Templates(directory="frontend/templates")
-    
+
     @app.get("/", response_class=HTMLResponse)
     async def root(request: Request):
         return templates.TemplateResponse("index.html", {"request": request})
-    
+
+    if tracing.enabled():
+        setup_tracing_middleware(app)
+
     return app
 
-def initialize_model():
+def setup_tracing_middleware(app: FastAPI):
+    # Pure ASGI rather than @app.middleware("http"), whose span would end
+    # before a streamed response body is sent
+    app.add_middleware(tracing.TracingMiddleware)
+
+def load_model(**overrides):
+    if config.STUB_MODEL:
+        logger.info("Using stub translation model")
+        return StubTranslationModel(config.STUB_LATENCY_MS, config.STUB_TOKEN_LATENCY_MS)
+    if inference_pool is not None:
+        # The thread count is process-wide, so it is one replica's share, not the profile's
+        profile = load_profile(config.PERF_PROFILE_PATH)
+        profile["intra_op_threads"] = inference_pool.threads
+        overrides["perf_profile"] = profile
+    return load_configured_registry(**overrides)
+
+def initialize_model(**overrides):
+    """Load and warm up a model; overrides are model, snapshot and registry paths."""
     logger.info("Loading translation model...")
     try:
-        model = TranslationModel()
-        doc_translator = DocumentTranslator(model)
-            
+        model = load_model(**overrides)
+        doc_translator = DocumentTranslator(model, checkpoint_dir=config.CHECKPOINT_DIR or None, scheduler=scheduler,
+                                           ooxml_fast_path=config.OOXML_FAST_PATH)
+
         # Warmup request
-        logger.info("Performing warmup request...")
-        dummy_text = "Hello, world!"
-        model.translate(dummy_text, "en", "es")
-            
+        if config.WARMUP_ENABLED and config.COMPILE_MODE and not config.STUB_MODEL:
+            # Compiled graphs are built per input shape, so cover the shapes
+            # requests will have before reporting readiness
+            logger.info("Warming up compiled model...")
+            model.default_model.warmup(
+                config.WARMUP_LANGUAGE_PAIRS, config.WARMUP_BATCH_SIZES, config.LENGTH_BUCKETS
+            )
+        elif config.WARMUP_ENABLED:
+            logger.info("Performing warmup request...")
+            dummy_text = "Hello, world!"
+            model.translate(dummy_text, "en", "es")
+
         logger.info("Model loaded successfully!")
         return model, doc_translator
     except Exception as e:
         logger.error(f"Error loading model: {str(e)}", exc_info=True)
         raise
 
-def setup_routers(app: FastAPI, model: TranslationModel, doc_translator: DocumentTranslator):
+def attach_model(model: ModelRegistry, doc_translator: DocumentTranslator):
     # Share model and doc_translator with routers
     translation.router.model = model
     document.router.model = model
     document.router.doc_translator = doc_translator
     system.router.model = model
+
+# Swaps in a new model without a restart (POST /api/admin/reload/)
+reloader = ModelReloader(initialize_model, attach_model, drain_timeout=config.RELOAD_DRAIN_TIMEOUT)
+
+def load_model_in_background():
+    def load():
+        model_state["state"] = "loading"
+        model_state["started_at"] = time.time()
+        try:
+            model, doc_translator = initialize_model()
+        except Exception as e:
+            model_state["state"] = "error"
+            model_state["error"] = str(e)
+            return
+        reloader.install(model, doc_translator)
+        model_state["ready_at"] = time.time()
+        model_state["state"] = "ready"
+        logger.info(f"Model ready after {model_state['ready_at'] - model_state['started_at']:.2f}s")
+
+    thread = threading.Thread(target=load, name="model-loader", daemon=True)
+    thread.start()
+    return thread
+
+def setup_routers(app: FastAPI):
+    # Routers start without a model; it is attached once background loading finishes
+    translation.router.model = None
+    document.router.model = None
+    document.router.doc_translator = None
+    system.router.model = None
+    system.router.model_state = model_state
+    translation.router.scheduler = scheduler
+    system.router.scheduler = scheduler
+    translation.router.admission = admission
+    translation.router.incremental = incremental
+    document.router.admission = admission
+    document.router.artifacts = artifacts
+    system.router.admission = admission
+    system.router.artifacts = artifacts
+    system.router.incremental = incremental
+    system.router.translation_progress = document.translation_progress
+    system.router.checkpoint_dir = config.CHECKPOINT_DIR or None
+    system.router.leak_tracker = leak_tracker
     websocket.router.translation_progress = document.translation_progress
+    admin.router.reloader = reloader
+    admin.router.model_state = model_state
+    admin.router.admin_token = config.ADMIN_TOKEN
+    admin.router.leak_tracker = leak_tracker
 
     # Include routers with prefixes and tags
     app.include_router(translation.router, prefix="/api", tags=["translation"])
     app.include_router(document.router, prefix="/api", tags=["document"])
     app.include_router(websocket.router, prefix="/ws", tags=["websocket"])
     app.include_router(system.router, prefix="/api", tags=["system"])
+    app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 def get_application() -> FastAPI:
+    tracing.configure(config.TRACE_EXPORTER, config.TRACE_FILE, config.TRACE_OTLP_ENDPOINT)
+
     # Create FastAPI application
     app = create_application()
-    
-    # Initialize model and document translator
-    model, doc_translator = initialize_model()
-    
+
     # Setup routers
-    setup_routers(app, model, doc_translator)
-    
+    setup_routers(app)
+
+    # Load model and document translator without blocking server startup
+    @app.on_event("startup")
+    async def start_model_loading():
+        scheduler.start()
+        load_model_in_background()
+
+    @app.on_event("shutdown")
+    async def stop_scheduler():
+        scheduler.stop()
+        tracing.shutdown()
+
     return app
 
 # Create application instance
-app = get_application()
\ No newline at end of file
+app = get_application()
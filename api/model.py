@@ -1,34 +1,182 @@
 # api/model.py
 import torch
 import time
-from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
-from typing import List, Dict, Tuple
+import os
+import logging
+import threading
+from concurrent.futures import Future
+from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer, MarianMTModel, MarianTokenizer
+from typing import List, Dict, Tuple, Optional
+from .decoding import DecodingPolicy
+from .perf_profile import DEFAULT_PROFILE, apply_thread_settings
+from .segment_filter import is_translatable, mask, unmask
+from .tokenization import TokenizerStage
+from .vocab import VocabRemap
+from .compilation import compile_model
+from .translation_memory import TranslationMemory
+from .resources import mapping_bytes
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+# Supported engines. M2M100 is multilingual and needs the language codes on
+# every call, Marian (opus-mt) checkpoints are trained for a single pair.
+ENGINES = ("m2m100", "marian")
 
 class TranslationModel:
-    def __init__(self, model_path="api/models/m2m100"):
+    def __init__(self, model_path="api/models/m2m100", snapshot_path: Optional[str] = None, engine: str = "m2m100",
+                 decoding_policy: Optional[DecodingPolicy] = None, perf_profile: Optional[Dict] = None,
+                 compile_mode: str = "", length_buckets: Optional[List[int]] = None,
+                 translation_memory: Optional[TranslationMemory] = None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Supported engines: {', '.join(ENGINES)}")
+        self.engine = engine
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Using device: {self.device}")
+
+        # Thread counts and batch size tuned by scripts/autotune.py
+        self.perf_profile = perf_profile or dict(DEFAULT_PROFILE)
+        if self.device == "cpu":
+            apply_thread_settings(self.perf_profile)
+        self.batch_size = self.perf_profile["batch_size"]
         
         # Load tokenizer and model
-        self.tokenizer = M2M100Tokenizer.from_pretrained(model_path)
-        self.model = M2M100ForConditionalGeneration.from_pretrained(model_path)
+        load_start = time.time()
+        if engine == "marian":
+            self.tokenizer = MarianTokenizer.from_pretrained(model_path)
+            self.model = MarianMTModel.from_pretrained(model_path)
+            self.model_path = model_path
+        elif snapshot_path and os.path.isdir(snapshot_path):
+            # Snapshots are stored as safetensors, which are memory-mapped on load
+            # instead of being unpickled and copied like pytorch_model.bin
+            logger.info(f"Loading model snapshot from {snapshot_path}")
+            self.tokenizer = M2M100Tokenizer.from_pretrained(snapshot_path)
+            self.model = M2M100ForConditionalGeneration.from_pretrained(
+                snapshot_path,
+                use_safetensors=True,
+                low_cpu_mem_usage=True
+            )
+            self.model_path = snapshot_path
+        else:
+            self.tokenizer = M2M100Tokenizer.from_pretrained(model_path)
+            self.model = M2M100ForConditionalGeneration.from_pretrained(model_path)
+            self.model_path = model_path
         self.model = self.model.to(self.device)
+
+        # Models built by scripts/prune_vocab.py only cover a few languages and
+        # use their own token IDs, mapped from and to the tokenizer's
+        self.vocab_remap = VocabRemap.from_dir(self.model_path) if engine == "m2m100" else None
+        self.languages = self.vocab_remap.languages if self.vocab_remap is not None else None
+        self.load_time = round(time.time() - load_start, 2)
         
         # Initialize cache and metrics
         self.cache = {}
         self.last_translation_metrics = {}
+
+        # Translations currently being generated, keyed like the cache, so that
+        # identical concurrent requests wait for the first one (single-flight)
+        self.inflight: Dict[str, Future] = {}
+        self.inflight_lock = threading.Lock()
         
         # Performance optimizations
         self.model.eval()  # Set to evaluation mode
+        self.compile_mode = compile_mode
+        self.model = compile_model(self.model, compile_mode)
         
         # Optimize generation parameters
         self.generation_config = {
             'max_new_tokens': 128,
-            'num_beams': 2,        # Reduced from default 5
+            'num_beams': self.perf_profile["num_beams"],  # Reduced from default 5
             'early_stopping': True,
             'use_cache': True,     # Enable model caching
             'length_penalty': 1.0   # Neutral length penalty
         }
+        # Longest input (in tokens) fed to the model; longer lines are split into chunks
+        self.max_input_length = 128
+
+        # Tokenization and detokenization run on their own thread, with token IDs cached.
+        # Compiled models get inputs padded to a few fixed lengths, so they see few shapes.
+        self.length_buckets = length_buckets if compile_mode else None
+        self.tokenizer_stage = TokenizerStage(self.tokenizer, self.set_source_lang, self.max_input_length,
+                                              length_buckets=self.length_buckets)
+
+        # Near-identical segments reuse earlier translations (optional, shared across models)
+        self.translation_memory = translation_memory
+
+        # Beams and max_new_tokens are chosen per call from the input length
+        self.decoding_policy = decoding_policy or DecodingPolicy(
+            num_beams=self.generation_config['num_beams']
+        )
+
+    def generation_kwargs(self, input_length: int, source_lang: str, target_lang: str) -> Dict:
+        return {
+            **self.decoding_policy.generation_kwargs(input_length, source_lang, target_lang, base=self.generation_config),
+            **self.target_lang_kwargs(target_lang)
+        }
+
+    def memory_bytes(self) -> int:
+        """Memory held by the model parameters and buffers."""
+        tensors = list(self.model.parameters()) + list(self.model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def memory_report(self) -> Dict:
+        """Memory held by the weights and by this model's caches (approximate)."""
+        cache_items = list(self.cache.items())
+        report = {
+            "parameter_bytes": self.memory_bytes(),
+            "cache_entries": len(cache_items),
+            "cache_bytes": mapping_bytes(cache_items),
+            "tokenizer_cache_entries": len(self.tokenizer_stage.cache),
+            "tokenizer_cache_bytes": self.tokenizer_stage.cache_bytes(),
+            "inflight": len(self.inflight)
+        }
+        if self.device == "cuda":
+            # Process-wide: all models on the GPU
+            report["cuda_allocated_bytes"] = torch.cuda.memory_allocated()
+            report["cuda_peak_allocated_bytes"] = torch.cuda.max_memory_allocated()
+        return report
+
+    def set_source_lang(self, source_lang: str):
+        if self.engine == "m2m100":
+            self.tokenizer.src_lang = source_lang
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        """Whether the pair is covered; always true unless the vocabulary was pruned."""
+        return self.languages is None or (source_lang in self.languages and target_lang in self.languages)
+
+    def model_inputs(self, encoded: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """Move tokenizer output to the device, in the model's vocabulary."""
+        if self.vocab_remap is not None:
+            encoded = {**encoded, "input_ids": self.vocab_remap.to_model(encoded["input_ids"])}
+        return {key: tensor.to(self.device) for key, tensor in encoded.items()}
+
+    def tokenizer_ids(self, generated_tokens: torch.Tensor) -> torch.Tensor:
+        """Generated IDs on the CPU, in the tokenizer's vocabulary."""
+        generated_tokens = generated_tokens.cpu()
+        if self.vocab_remap is not None:
+            generated_tokens = self.vocab_remap.to_tokenizer(generated_tokens)
+        return generated_tokens
+
+    def encode(self, texts, source_lang: str):
+        """Tokenize text(s) for the model."""
+        if isinstance(texts, str):
+            texts = [texts]
+        return self.model_inputs(self.tokenizer_stage.encode(texts, source_lang))
+
+    def count_tokens(self, texts: List[str], source_lang: str) -> int:
+        """Number of input tokens the texts tokenize to, without truncation."""
+        return self.tokenizer_stage.count_tokens(texts, source_lang)
+
+    def target_lang_kwargs(self, target_lang: str) -> Dict:
+        """Generation arguments selecting the target language."""
+        if self.engine == "m2m100":
+            lang_id = self.tokenizer.get_lang_id(target_lang)
+            if self.vocab_remap is not None:
+                if target_lang not in self.languages:
+                    raise ValueError(f"Target language '{target_lang}' is not in the pruned model vocabulary")
+                lang_id = self.vocab_remap.token_id(lang_id)
+            return {"forced_bos_token_id": lang_id}
+        return {}
 
     def split_text(self, text: str, max_length: int) -> list:
         """Split text into chunks suitable for translation."""
@@ -51,16 +199,84 @@ class TranslationModel:
 
         return chunks
 
+    def _memory_lookup(self, masked_text: str, source_lang: str, target_lang: str):
+        if self.translation_memory is None:
+            return None
+        return self.translation_memory.lookup(masked_text, source_lang, target_lang)
+
+    def _memory_store(self, masked_text: str, masked_translation: str, match, source_lang: str, target_lang: str):
+        """Remember a model translation; for a sampled memory match, compare the two first."""
+        if self.translation_memory is None:
+            return
+        if match is not None and match.verify:
+            self.translation_memory.record_verification(match, masked_translation)
+        self.translation_memory.add(masked_text, masked_translation, source_lang, target_lang)
+
+    @staticmethod
+    def cache_key(text: str, source_lang: str, target_lang: str) -> str:
+        return f"{text}|{source_lang}|{target_lang}"
+
+    def _join_inflight(self, cache_key: str) -> Tuple[Future, bool]:
+        """Return the future for an in-flight translation and whether the caller owns it."""
+        with self.inflight_lock:
+            future = self.inflight.get(cache_key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self.inflight[cache_key] = future
+            return future, True
+
+    def _finish_inflight(self, cache_key: str, future: Future, result: Optional[str] = None,
+                         error: Optional[BaseException] = None):
+        with self.inflight_lock:
+            self.inflight.pop(cache_key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
     def translate(self, text: str, source_lang: str, target_lang: str) -> Tuple[str, Dict]:
         start_time = time.time()
-        input_tokens = 0
-        output_tokens = 0
+
+        # Numbers, dates, URLs, codes etc. pass through without touching the model
+        if not is_translatable(text):
+            return text, {"tokens_per_second": 0, "total_tokens": 0, "processing_time": 0, "cached": False, "passthrough": True}
 
         # Check cache
-        cache_key = f"{text}|{source_lang}|{target_lang}"
+        cache_key = self.cache_key(text, source_lang, target_lang)
         if cache_key in self.cache:
             return self.cache[cache_key], {"tokens_per_second": 0, "total_tokens": 0, "processing_time": 0, "cached": True}
 
+        # Wait for an identical translation that is already running
+        future, owner = self._join_inflight(cache_key)
+        if not owner:
+            translation = future.result()
+            return translation, {
+                "tokens_per_second": 0,
+                "total_tokens": 0,
+                "processing_time": round(time.time() - start_time, 2),
+                "cached": False,
+                "coalesced": True
+            }
+
+        try:
+            final_translation, metrics = self._translate_text(text, source_lang, target_lang)
+        except Exception as e:
+            self._finish_inflight(cache_key, future, error=e)
+            raise
+
+        # Cache the translation
+        self.cache[cache_key] = final_translation
+        self.last_translation_metrics = metrics
+        self._finish_inflight(cache_key, future, result=final_translation)
+
+        return final_translation, metrics
+
+    def _translate_text(self, text: str, source_lang: str, target_lang: str) -> Tuple[str, Dict]:
+        start_time = time.time()
+        input_tokens = 0
+        output_tokens = 0
+
         # Split text by lines to preserve line breaks
         lines = text.splitlines()
         translated_lines = []
@@ -71,42 +287,35 @@ class TranslationModel:
                 translated_lines.append("")
                 continue
 
-            # Split line into chunks if it's too long
-            chunks = self.split_text(line, self.generation_config['max_new_tokens'])
-            translations = []
-
-            for chunk in chunks:
-                with torch.no_grad():
-                    self.tokenizer.src_lang = source_lang
-
-                    # Tokenize with optimized settings
-                    encoded = self.tokenizer(
-                        chunk,
-                        return_tensors="pt",
-                        padding=True,
-                        truncation=True,
-                        max_length=self.generation_config['max_new_tokens']
-                    ).to(self.device)
-
-                    # Count input tokens
-                    input_tokens += len(encoded['input_ids'][0])
-
-                    # Generate translation
-                    generated_tokens = self.model.generate(
-                        **encoded,
-                        forced_bos_token_id=self.tokenizer.get_lang_id(target_lang),
-                        max_new_tokens=self.generation_config['max_new_tokens']
-                    )
-
-                    # Count output tokens
-                    output_tokens += len(generated_tokens[0])
+            # Keep lines without words as they are
+            if not is_translatable(line):
+                translated_lines.append(line)
+                continue
 
-                    # Decode translation
-                    translation = self.tokenizer.decode(generated_tokens[0], skip_special_tokens=True)
-                    translations.append(translation)
+            # Protect URLs, numbers and placeholders from the model
+            masked_line, protected = mask(line)
+            match = self._memory_lookup(masked_line, source_lang, target_lang)
+            if match is not None and not match.verify:
+                translated_line, restored = unmask(match.translation, protected)
+                if restored:
+                    translated_lines.append(translated_line)
+                    continue
+
+            masked_translation, line_input_tokens, line_output_tokens = self._translate_line(masked_line, source_lang, target_lang)
+            input_tokens += line_input_tokens
+            output_tokens += line_output_tokens
+
+            translated_line, restored = unmask(masked_translation, protected)
+            if restored:
+                self._memory_store(masked_line, masked_translation, match, source_lang, target_lang)
+            else:
+                # The model dropped a placeholder, translate the original line instead
+                logger.debug(f"Placeholder lost in translation, retrying unmasked: {line!r}")
+                translated_line, line_input_tokens, line_output_tokens = self._translate_line(line, source_lang, target_lang)
+                input_tokens += line_input_tokens
+                output_tokens += line_output_tokens
 
-            # Combine translated chunks
-            translated_lines.append(' '.join(translations))
+            translated_lines.append(translated_line)
 
         # Combine lines and preserve line breaks
         final_translation = '\n'.join(translated_lines)
@@ -123,15 +332,50 @@ class TranslationModel:
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
             "processing_time": round(total_time, 2),
-            "cached": False
+            "cached": False,
+            "coalesced": False
         }
 
-        # Cache the translation
-        self.cache[cache_key] = final_translation
-        self.last_translation_metrics = metrics
-
         return final_translation, metrics
     
+    def _translate_line(self, line: str, source_lang: str, target_lang: str) -> Tuple[str, int, int]:
+        """Translate a single line, split into chunks if it's too long."""
+        input_tokens = 0
+        output_tokens = 0
+
+        # Split line into chunks if it's too long
+        chunks = self.split_text(line, self.max_input_length)
+
+        # Tokenize all chunks on the tokenizer thread while the model works
+        pending_encodes = [self.tokenizer_stage.submit_encode([chunk], source_lang) for chunk in chunks]
+        pending_decodes = []
+
+        with torch.no_grad():
+            for pending in pending_encodes:
+                encoded = self.model_inputs(pending.result())
+
+                # Count input tokens (without padding to a length bucket)
+                chunk_tokens = int(encoded['attention_mask'].sum())
+                input_tokens += chunk_tokens
+
+                # Generate translation
+                with tracing.span("generate", batch_size=1, input_tokens=chunk_tokens):
+                    generated_tokens = self.model.generate(
+                        **encoded,
+                        **self.generation_kwargs(chunk_tokens, source_lang, target_lang)
+                    )
+
+                # Count output tokens
+                output_tokens += len(generated_tokens[0])
+
+                # Decode translation in the background
+                pending_decodes.append(self.tokenizer_stage.submit_decode(self.tokenizer_ids(generated_tokens)))
+
+        translations = [pending.result()[0] for pending in pending_decodes]
+
+        # Combine translated chunks
+        return ' '.join(translations), input_tokens, output_tokens
+
     def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> Tuple[List[str], Dict]:
         """Translate a batch of texts efficiently"""
         if not texts:
@@ -141,57 +385,53 @@ class TranslationModel:
         input_tokens = 0
         output_tokens = 0
 
-        # Check cache for all texts
-        translations = []
+        # Check cache and in-flight translations for all texts
+        translations: List[Optional[str]] = [None] * len(texts)
         texts_to_translate = []
-        indices_to_translate = []
+        owned = []    # (index, cache_key, future) translated by this call
+        waiting = []  # (index, future) already being translated by another call
 
         for i, text in enumerate(texts):
-            cache_key = f"{text}|{source_lang}|{target_lang}"
+            # Numbers, dates, URLs, codes etc. pass through without touching the model
+            if not is_translatable(text):
+                translations[i] = text
+                continue
+            cache_key = self.cache_key(text, source_lang, target_lang)
             if cache_key in self.cache:
-                translations.append(self.cache[cache_key])
-            else:
+                translations[i] = self.cache[cache_key]
+                continue
+            future, owner = self._join_inflight(cache_key)
+            if owner:
                 texts_to_translate.append(text)
-                indices_to_translate.append(i)
+                owned.append((i, cache_key, future))
+            else:
+                waiting.append((i, future))
 
         # If all texts were cached, return early
-        if not texts_to_translate:
+        if not texts_to_translate and not waiting:
             return translations, {"tokens_per_second": 0, "total_tokens": 0, "processing_time": 0, "cached": True}
 
-        # Translate uncached texts
-        with torch.no_grad():
-            self.tokenizer.src_lang = source_lang
-            
-            encoded = self.tokenizer(
-                texts_to_translate,
-                return_tensors="pt",
-                padding=True,
-                truncation=True,
-                max_length=self.generation_config['max_new_tokens']
-            ).to(self.device)
-
-            # Count input tokens
-            input_tokens = encoded['input_ids'].numel()
-
-            generated_tokens = self.model.generate(
-                **encoded,
-                forced_bos_token_id=self.tokenizer.get_lang_id(target_lang),
-                **self.generation_config
-            )
-
-            # Count output tokens
-            output_tokens = generated_tokens.numel()
-
-            new_translations = self.tokenizer.batch_decode(
-                generated_tokens,
-                skip_special_tokens=True
-            )
+        # Translate uncached texts. Our own texts are resolved before waiting on
+        # others, so two batches waiting on each other cannot deadlock.
+        if texts_to_translate:
+            try:
+                new_translations, input_tokens, output_tokens = self._generate_masked_batch(
+                    texts_to_translate, source_lang, target_lang
+                )
+            except Exception as e:
+                for _, cache_key, future in owned:
+                    self._finish_inflight(cache_key, future, error=e)
+                raise
 
             # Cache and insert new translations
-            for i, (text, translation) in enumerate(zip(texts_to_translate, new_translations)):
-                cache_key = f"{text}|{source_lang}|{target_lang}"
+            for (i, cache_key, future), translation in zip(owned, new_translations):
                 self.cache[cache_key] = translation
-                translations.insert(indices_to_translate[i], translation)
+                translations[i] = translation
+                self._finish_inflight(cache_key, future, result=translation)
+
+        # Share results of identical translations started by other requests
+        for i, future in waiting:
+            translations[i] = future.result()
 
         # Calculate metrics
         end_time = time.time()
@@ -205,8 +445,113 @@ class TranslationModel:
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
             "processing_time": round(total_time, 2),
-            "cached": False
+            "cached": False,
+            "coalesced": len(waiting) > 0,
+            "coalesced_texts": len(waiting)
         }
 
         self.last_translation_metrics = metrics
-        return translations, metrics
\ No newline at end of file
+        return translations, metrics
+
+    def _generate_masked_batch(self, texts: List[str], source_lang: str, target_lang: str) -> Tuple[List[str], int, int]:
+        """Run the model on texts with URLs, numbers and placeholders protected."""
+        masked = [mask(text) for text in texts]
+        translations: List[Optional[str]] = [None] * len(texts)
+
+        # Near-identical segments translated before come from the translation memory
+        matches = [self._memory_lookup(masked_text, source_lang, target_lang) for masked_text, _ in masked]
+        for i, (match, (_, protected)) in enumerate(zip(matches, masked)):
+            if match is not None and not match.verify:
+                translation, restored = unmask(match.translation, protected)
+                if restored:
+                    translations[i] = translation
+
+        pending = [i for i, translation in enumerate(translations) if translation is None]
+        input_tokens = output_tokens = 0
+        if pending:
+            generated, input_tokens, output_tokens = self._generate_batch(
+                [masked[i][0] for i in pending], source_lang, target_lang
+            )
+        else:
+            generated = []
+
+        retry = []
+        for i, translation in zip(pending, generated):
+            masked_text, protected = masked[i]
+            translations[i], restored = unmask(translation, protected)
+            if restored:
+                self._memory_store(masked_text, translation, matches[i], source_lang, target_lang)
+            else:
+                retry.append(i)
+
+        # The model dropped a placeholder, translate the original texts instead
+        if retry:
+            logger.debug(f"Placeholders lost in {len(retry)} translations, retrying unmasked")
+            retried, retry_input_tokens, retry_output_tokens = self._generate_batch(
+                [texts[i] for i in retry], source_lang, target_lang
+            )
+            for i, translation in zip(retry, retried):
+                translations[i] = translation
+            input_tokens += retry_input_tokens
+            output_tokens += retry_output_tokens
+
+        return translations, input_tokens, output_tokens
+
+    def _generate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> Tuple[List[str], int, int]:
+        """Run the model on texts, at most batch_size texts per generate call.
+
+        Batches are tokenized ahead and decoded behind on the tokenizer thread,
+        so this thread only runs forward passes.
+        """
+        input_tokens = 0
+        output_tokens = 0
+
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        pending_encodes = [self.tokenizer_stage.submit_encode(batch, source_lang) for batch in batches]
+        pending_decodes = []
+
+        with torch.no_grad():
+            for pending in pending_encodes:
+                encoded = self.model_inputs(pending.result())
+
+                # Count input tokens
+                lengths = encoded['attention_mask'].sum(dim=1)
+                input_tokens += int(lengths.sum())
+
+                # The longest text bounds the output length
+                with tracing.span("generate", batch_size=len(encoded['input_ids']), input_tokens=int(lengths.sum())):
+                    generated_tokens = self.model.generate(
+                        **encoded,
+                        **self.generation_kwargs(int(lengths.max()), source_lang, target_lang)
+                    )
+
+                # Count output tokens
+                output_tokens += generated_tokens.numel()
+
+                pending_decodes.append(self.tokenizer_stage.submit_decode(self.tokenizer_ids(generated_tokens)))
+
+        translations = []
+        for pending in pending_decodes:
+            translations.extend(pending.result())
+
+        return translations, input_tokens, output_tokens
+
+    def warmup(self, language_pairs: List[Tuple[str, str]], batch_sizes: List[int], lengths: List[int]):
+        """Run generate once per language pair, batch size and input length.
+
+        Compiled models build their graphs on the first call for each shape;
+        this makes those calls before any request arrives. The cache is bypassed.
+        Short single inputs decode greedily rather than with beam search, which
+        compiles separately, so one such input per pair is run as well.
+        """
+        shapes = [(batch_size, length) for batch_size in batch_sizes for length in lengths]
+        if self.decoding_policy.num_beams > 1:
+            shapes.append((1, self.decoding_policy.greedy_max_tokens))
+        for source_lang, target_lang in language_pairs:
+            for batch_size, length in shapes:
+                # Roughly one token per word, leaving room for the special tokens
+                text = " ".join(["hello"] * max(1, length - 2))
+                start = time.time()
+                self._generate_batch([text] * batch_size, source_lang, target_lang)
+                logger.info(f"Warmup {source_lang}->{target_lang} batch={batch_size} length={length}: "
+                            f"{time.time() - start:.2f}s")
@@ -0,0 +1,202 @@
+# api/model_registry.py
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .model import TranslationModel, ENGINES
+from .decoding import DecodingPolicy
+from .translation_memory import TranslationMemory
+from .perf_profile import load_profile
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Token estimate for pairs whose model is not loaded yet (SentencePiece averages 3-4 characters per token)
+CHARS_PER_TOKEN = 3.5
+
+class ModelRegistry:
+    """Routes language pairs to dedicated models, falling back to the default
+    M2M100 model. Routed models are loaded on first use and evicted in LRU
+    order when the total parameter memory exceeds the budget."""
+
+    def __init__(self, default_model: TranslationModel, routes: Optional[Dict[Tuple[str, str], Dict]] = None,
+                 memory_budget_mb: Optional[int] = None):
+        self.default_model = default_model
+        self.routes = routes or {}
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        self.loaded: "OrderedDict[Tuple[str, str], TranslationModel]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, default_model: TranslationModel, memory_budget_mb: Optional[int] = None):
+        """Build a registry from a JSON file. A missing file means no routes."""
+        if not path or not os.path.exists(path):
+            return cls(default_model, memory_budget_mb=memory_budget_mb)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        routes = {}
+        for route in data.get("routes", []):
+            engine = route.get("engine", "marian")
+            if engine not in ENGINES:
+                raise ValueError(f"Unknown engine '{engine}' in {path}")
+            key = (route["source_lang"], route["target_lang"])
+            routes[key] = {"engine": engine, "path": route["path"]}
+
+        if memory_budget_mb is None:
+            memory_budget_mb = data.get("memory_budget_mb")
+
+        logger.info(f"Loaded {len(routes)} model routes from {path}")
+        return cls(default_model, routes, memory_budget_mb)
+
+    @property
+    def device(self):
+        return self.default_model.device
+
+    @property
+    def translation_memory(self):
+        return self.default_model.translation_memory
+
+    def engine_for(self, source_lang: str, target_lang: str) -> TranslationModel:
+        """Return the model serving a language pair, loading it if needed."""
+        key = (source_lang, target_lang)
+        route = self.routes.get(key)
+        if route is None:
+            return self.default_model
+
+        with self.lock:
+            if key in self.loaded:
+                self.loaded.move_to_end(key)
+                return self.loaded[key]
+
+            try:
+                self._make_room(self._estimate_bytes(route["path"]))
+                model = TranslationModel(
+                    route["path"],
+                    engine=route["engine"],
+                    decoding_policy=self.default_model.decoding_policy,
+                    perf_profile=self.default_model.perf_profile,
+                    compile_mode=self.default_model.compile_mode,
+                    length_buckets=self.default_model.length_buckets,
+                    translation_memory=self.default_model.translation_memory
+                )
+                if model.compile_mode and config.WARMUP_ENABLED:
+                    # Otherwise the first requests for the pair pay for compilation
+                    model.warmup([key], config.WARMUP_BATCH_SIZES, model.length_buckets)
+            except Exception as e:
+                # A broken route should not take the pair offline
+                logger.error(f"Error loading model for {source_lang}->{target_lang}: {str(e)}", exc_info=True)
+                return self.default_model
+
+            self.loaded[key] = model
+            logger.info(f"Loaded {route['engine']} model for {source_lang}->{target_lang} "
+                        f"({model.memory_bytes() / 1024 / 1024:.0f}MB)")
+            return model
+
+    def _estimate_bytes(self, path: str) -> int:
+        # Weights on disk are a good estimate of the memory they need once loaded
+        total = 0
+        for name in os.listdir(path):
+            if name.endswith(('.bin', '.safetensors')):
+                total += os.path.getsize(os.path.join(path, name))
+        return total
+
+    def memory_report(self) -> Dict:
+        # Not under the lock, which is held while a routed model loads
+        loaded = list(self.loaded.items())
+        return {
+            "parameter_bytes": self.default_model.memory_bytes() + sum(m.memory_bytes() for _, m in loaded),
+            "models": {
+                "default": self.default_model.memory_report(),
+                **{f"{src}-{tgt}": model.memory_report() for (src, tgt), model in loaded}
+            },
+            "translation_memory_entries": len(self.translation_memory.entries) if self.translation_memory is not None else None
+        }
+
+    def loaded_bytes(self) -> int:
+        return self.default_model.memory_bytes() + sum(m.memory_bytes() for m in self.loaded.values())
+
+    def _make_room(self, needed: int):
+        # Evict least recently used models until the new one fits the budget.
+        # The default model is always resident and never evicted.
+        if self.memory_budget is None:
+            return
+        while self.loaded and self.loaded_bytes() + needed > self.memory_budget:
+            key, model = self.loaded.popitem(last=False)
+            logger.info(f"Evicting model for {key[0]}->{key[1]} to stay within memory budget")
+            del model
+
+    def describe_routes(self) -> List[Dict]:
+        return [
+            {
+                "source_lang": src,
+                "target_lang": tgt,
+                "engine": route["engine"],
+                "loaded": (src, tgt) in self.loaded
+            }
+            for (src, tgt), route in self.routes.items()
+        ]
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        return (source_lang, target_lang) in self.routes or self.default_model.supports(source_lang, target_lang)
+
+    def languages(self) -> Optional[List[str]]:
+        """Languages served, or None when the default model covers all of them."""
+        if self.default_model.languages is None:
+            return None
+        languages = set(self.default_model.languages)
+        for src, tgt in self.routes:
+            languages.update((src, tgt))
+        return sorted(languages)
+
+    def count_tokens(self, texts: List[str], source_lang: str, target_lang: str) -> int:
+        key = (source_lang, target_lang)
+        if key in self.routes:
+            model = self.loaded.get(key)
+            if model is None:
+                # Estimating must not load a model; it loads when the request is translated
+                return math.ceil(sum(len(text) for text in texts) / CHARS_PER_TOKEN)
+            return model.count_tokens(texts, source_lang)
+        return self.default_model.count_tokens(texts, source_lang)
+
+    def length_ratio(self, source_lang: str, target_lang: str) -> float:
+        return self.default_model.decoding_policy.length_ratio(source_lang, target_lang)
+
+    def translate(self, text: str, source_lang: str, target_lang: str):
+        return self.engine_for(source_lang, target_lang).translate(text, source_lang, target_lang)
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str):
+        return self.engine_for(source_lang, target_lang).translate_batch(texts, source_lang, target_lang)
+
+def load_configured_registry(perf_profile: Optional[Dict] = None, model_path: Optional[str] = None,
+                             snapshot_path: Optional[str] = None, registry_path: Optional[str] = None) -> ModelRegistry:
+    """Build the default model and registry from api.config settings.
+
+    The paths override the configured ones, e.g. to reload with a new model.
+    Profile, decoding policy and registry files are read again on every call.
+    """
+    if perf_profile is None:
+        perf_profile = load_profile(config.PERF_PROFILE_PATH)
+    decoding_policy = DecodingPolicy.from_file(config.DECODING_POLICY_PATH, num_beams=perf_profile["num_beams"])
+    default_model = TranslationModel(
+        model_path or config.MODEL_PATH,
+        snapshot_path=snapshot_path if snapshot_path is not None else config.MODEL_SNAPSHOT_PATH,
+        decoding_policy=decoding_policy,
+        perf_profile=perf_profile,
+        compile_mode=config.COMPILE_MODE,
+        length_buckets=config.LENGTH_BUCKETS,
+        translation_memory=TranslationMemory(
+            threshold=config.TM_THRESHOLD,
+            max_entries=config.TM_MAX_ENTRIES,
+            verify_rate=config.TM_VERIFY_RATE
+        ) if config.TM_ENABLED else None
+    )
+    return ModelRegistry.from_file(
+        registry_path or config.MODEL_REGISTRY_PATH,
+        default_model,
+        memory_budget_mb=config.MODEL_MEMORY_BUDGET_MB
+    )
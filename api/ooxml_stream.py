@@ -0,0 +1,310 @@
+# api/ooxml_stream.py
+import copy
+import io
+import re
+import struct
+import zipfile
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+CHUNK_SIZE = 64 * 1024
+
+# _copy_raw writes members through zipfile internals; without them, members are recompressed
+RAW_COPY_SUPPORTED = (
+    all(hasattr(zipfile, name) for name in ("sizeFileHeader", "stringFileHeader"))
+    and hasattr(zipfile.ZipInfo, "FileHeader")
+)
+RAW_COPY_ATTRIBUTES = ("fp", "filelist", "NameToInfo", "start_dir", "_didModify")
+
+class OoxmlFormat:
+    """Element names of one OOXML flavor, matched by their usual prefixes."""
+
+    def __init__(self, parts: str, prefix: str, namespaces: Tuple[str, ...], paragraph: str, text: str,
+                 breaks: Tuple[str, ...], break_parents: Tuple[str, ...], skipped: Tuple[str, ...]):
+        self.parts = re.compile(parts)
+        self.prefix = prefix
+        self.namespaces = namespaces
+        self.paragraph = paragraph
+        self.text = text
+        # Line breaks and tabs end a segment; each line is translated on its own
+        self.breaks = breaks
+        self.break_parents = break_parents
+        # Elements whose text is generated, e.g. slide number fields
+        self.skipped = skipped
+
+FORMATS = {
+    '.docx': OoxmlFormat(
+        parts=r"^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$",
+        prefix="w",
+        namespaces=("http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+                    "http://purl.oclc.org/ooxml/wordprocessingml/main"),
+        paragraph="w:p", text="w:t",
+        # <w:tab> is also a tab stop definition inside <w:tabs>; only tabs in runs count
+        breaks=("w:br", "w:cr", "w:tab"), break_parents=("w:r",),
+        skipped=()
+    ),
+    '.pptx': OoxmlFormat(
+        parts=r"^ppt/(slides|notesSlides)/[^/]+\.xml$",
+        prefix="a",
+        namespaces=("http://schemas.openxmlformats.org/drawingml/2006/main",
+                    "http://purl.oclc.org/ooxml/drawingml/main"),
+        paragraph="a:p", text="a:t",
+        breaks=("a:br",), break_parents=("a:p",),
+        skipped=("a:fld",)
+    ),
+}
+
+class UnsupportedPackage(Exception):
+    """The package uses something the fast path does not handle; use the object model instead."""
+
+class TextSegment:
+    """Text of a paragraph (or of one line of it) and where its text nodes are in the part.
+
+    nodes holds (start, end, has_space_attribute) per non-empty text node: the
+    byte range of the node's content and whether its tag has xml:space.
+    """
+
+    __slots__ = ("text", "nodes")
+
+    def __init__(self):
+        self.text = ""
+        self.nodes: List[Tuple[int, int, bool]] = []
+
+class _PartScanner:
+    """Collects the text segments of one XML part from expat events.
+
+    Text node content is located by byte offsets: the first character data
+    event gives its start and the end tag gives its end.
+    """
+
+    def __init__(self, fmt: OoxmlFormat, name: str):
+        self.fmt = fmt
+        self.name = name
+        self.segments: List[TextSegment] = []
+        self.stack: List[str] = []
+        # Current segment of each open paragraph; text boxes nest paragraphs
+        self.open_segments: List[Optional[TextSegment]] = []
+        self.skip_depth = 0
+        self.text_node = None  # [start, has_space_attribute, text parts] of the open text node
+
+        self.parser = expat.ParserCreate()
+        self.parser.XmlDeclHandler = self.xml_declaration
+        self.parser.StartElementHandler = self.start_element
+        self.parser.EndElementHandler = self.end_element
+        self.parser.CharacterDataHandler = self.character_data
+        self.parser.StartCdataSectionHandler = self.cdata
+        self.parser.CommentHandler = self.markup_in_text
+        self.parser.ProcessingInstructionHandler = self.markup_in_text
+
+    def feed(self, data: bytes, final: bool = False):
+        if not self.stack and not self.segments and data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+            raise UnsupportedPackage(f"{self.name} is not UTF-8")
+        self.parser.Parse(data, final)
+
+    def xml_declaration(self, version, encoding, standalone):
+        if encoding and encoding.lower().replace("-", "") != "utf8":
+            raise UnsupportedPackage(f"{self.name} is encoded as {encoding}")
+
+    def cdata(self):
+        raise UnsupportedPackage(f"{self.name} has CDATA sections")
+
+    def markup_in_text(self, *args):
+        # Text nodes are assumed to hold only text right after their start tag's '>'
+        if self.text_node is not None:
+            raise UnsupportedPackage(f"{self.name} has comments or processing instructions in text")
+
+    def start_element(self, name: str, attributes: Dict[str, str]):
+        fmt = self.fmt
+        if not self.stack and attributes.get(f"xmlns:{fmt.prefix}", fmt.namespaces[0]) not in fmt.namespaces:
+            raise UnsupportedPackage(f"{self.name} binds the '{fmt.prefix}' prefix to another namespace")
+        parent = self.stack[-1] if self.stack else None
+        self.stack.append(name)
+
+        if name in fmt.skipped:
+            self.skip_depth += 1
+        elif name == fmt.paragraph:
+            self.open_segments.append(None)
+        elif name in fmt.breaks and parent in fmt.break_parents and self.open_segments:
+            self.open_segments[-1] = None
+        elif name == fmt.text and not self.skip_depth and self.open_segments:
+            self.text_node = [None, "xml:space" in attributes, []]
+
+    def character_data(self, data: str):
+        if self.text_node is not None:
+            if self.text_node[0] is None:
+                self.text_node[0] = self.parser.CurrentByteIndex
+            self.text_node[2].append(data)
+
+    def end_element(self, name: str):
+        fmt = self.fmt
+        self.stack.pop()
+        if name in fmt.skipped:
+            self.skip_depth -= 1
+        elif name == fmt.paragraph:
+            self.open_segments.pop()
+        elif name == fmt.text and self.text_node is not None:
+            start, has_space, parts = self.text_node
+            self.text_node = None
+            if start is None:
+                return
+            segment = self.open_segments[-1]
+            if segment is None:
+                segment = self.open_segments[-1] = TextSegment()
+                self.segments.append(segment)
+            segment.text += "".join(parts)
+            segment.nodes.append((start, self.parser.CurrentByteIndex, has_space))
+
+def segment_edits(segment: TextSegment, translation: str) -> List[Tuple[int, int, bytes]]:
+    """Byte edits putting the translation in the first text node and emptying the others.
+
+    The first node gets xml:space="preserve" so leading and trailing spaces survive.
+    """
+    start, end, has_space = segment.nodes[0]
+    edits = []
+    if not has_space:
+        # Inserted before the start tag's closing '>', which directly precedes the
+        # content: the scanner rejects anything else there, and verify() checks it
+        edits.append((start - 1, start - 1, b' xml:space="preserve"'))
+    edits.append((start, end, escape(translation).encode("utf-8")))
+    edits.extend((node_start, node_end, b"") for node_start, node_end, _ in segment.nodes[1:])
+    return edits
+
+def splice(chunks: Iterable[bytes], edits: List[Tuple[int, int, bytes]]) -> Iterator[bytes]:
+    """Apply sorted, non-overlapping (start, end, replacement) byte edits to a chunked stream."""
+    pending = deque(edits)
+    position = 0
+    skip_until = 0
+    for chunk in chunks:
+        index = min(len(chunk), max(0, skip_until - position))
+        while pending and pending[0][0] < position + len(chunk):
+            start, end, replacement = pending.popleft()
+            yield chunk[index:start - position]
+            yield replacement
+            skip_until = end
+            index = min(len(chunk), max(0, end - position))
+        yield chunk[index:]
+        position += len(chunk)
+    for _, _, replacement in pending:
+        # Insertions at the very end of the part
+        yield replacement
+
+def verify(chunks: Iterable[bytes], offsets: List[int], expected: bytes) -> Iterator[bytes]:
+    """Pass a chunked stream through, checking that the byte at each sorted offset is expected.
+
+    Each chunk is checked before it is passed on, so nothing is written from a
+    part whose offsets do not match.
+    """
+    pending = deque(offsets)
+    position = 0
+    for chunk in chunks:
+        while pending and pending[0] < position + len(chunk):
+            offset = pending.popleft()
+            if chunk[offset - position:offset - position + 1] != expected:
+                raise UnsupportedPackage(f"Expected {expected!r} at byte {offset}")
+        yield chunk
+        position += len(chunk)
+    if pending:
+        raise UnsupportedPackage(f"Expected {expected!r} at byte {pending[0]}, past the end of the part")
+
+def _read_chunks(member) -> Iterator[bytes]:
+    while True:
+        chunk = member.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+class OoxmlPackage:
+    """Translates the text of a .docx or .pptx without python-docx/python-pptx.
+
+    Only the text-bearing parts are parsed, incrementally with expat, and
+    rewritten by splicing translations into the original bytes. Every other
+    member (images, styles, relationships, embedded files) is copied through
+    compressed, byte for byte. Memory and CPU therefore grow with the amount
+    of text, not with the number of shapes, runs or media in the package.
+    """
+
+    def __init__(self, content: bytes, ext: str):
+        if ext not in FORMATS:
+            raise UnsupportedPackage(f"No fast path for {ext}")
+        self.content = content
+        self.format = FORMATS[ext]
+        self.parts: Dict[str, List[TextSegment]] = {}
+
+    def extract(self) -> List[TextSegment]:
+        """Text segments of all text-bearing parts, in document order."""
+        with zipfile.ZipFile(io.BytesIO(self.content)) as package:
+            for info in package.infolist():
+                if info.flag_bits & 0x1:
+                    # Neither readable nor copyable without the password
+                    raise UnsupportedPackage(f"{info.filename} is encrypted")
+                if not self.format.parts.match(info.filename):
+                    continue
+                scanner = _PartScanner(self.format, info.filename)
+                with package.open(info) as member:
+                    for chunk in _read_chunks(member):
+                        scanner.feed(chunk)
+                scanner.feed(b"", final=True)
+                self.parts[info.filename] = [segment for segment in scanner.segments if segment.text.strip()]
+        return [segment for segments in self.parts.values() for segment in segments]
+
+    def write(self, translations: Dict[str, str]) -> bytes:
+        """The package with translated text; segments without a translation are left as they are."""
+        output = io.BytesIO()
+        source = io.BytesIO(self.content)
+        with zipfile.ZipFile(source) as package, zipfile.ZipFile(output, 'w') as result:
+            for info in package.infolist():
+                edits = [
+                    edit
+                    for segment in self.parts.get(info.filename, ())
+                    if segment.text in translations
+                    for edit in segment_edits(segment, translations[segment.text])
+                ]
+                if edits:
+                    edits.sort(key=lambda edit: (edit[0], edit[1]))
+                    self._write_spliced(package, result, info, edits)
+                elif RAW_COPY_SUPPORTED and all(hasattr(result, name) for name in RAW_COPY_ATTRIBUTES):
+                    self._copy_raw(source, result, info)
+                else:
+                    # Decompress and recompress with public APIs only
+                    self._write_spliced(package, result, info, [])
+        return output.getvalue()
+
+    def _write_spliced(self, package: zipfile.ZipFile, result: zipfile.ZipFile, info: zipfile.ZipInfo, edits):
+        new_info = zipfile.ZipInfo(info.filename, info.date_time)
+        new_info.compress_type = info.compress_type
+        new_info.external_attr = info.external_attr
+        # xml:space insertions go before a start tag's '>'
+        insertions = [start for start, end, _ in edits if start == end]
+        with package.open(info) as member, result.open(new_info, 'w') as target:
+            for data in splice(verify(_read_chunks(member), insertions, b">"), edits):
+                target.write(data)
+
+    def _copy_raw(self, source: io.BytesIO, result: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Copy a member's compressed bytes without decompressing them.
+
+        zipfile has no public API for this, so the local header is written
+        from the member's ZipInfo and the archive's directory bookkeeping is
+        updated the same way ZipFile.write() does it.
+        """
+        if info.flag_bits & 0x1:
+            raise UnsupportedPackage(f"{info.filename} is encrypted")
+        source.seek(info.header_offset)
+        header = source.read(zipfile.sizeFileHeader)
+        if header[:4] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        source.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+        data = source.read(info.compress_size)
+
+        new_info = copy.copy(info)
+        # Sizes and CRC go into the local header instead of a trailing data descriptor
+        new_info.flag_bits &= ~0x08
+        new_info.header_offset = result.fp.tell()
+        result.fp.write(new_info.FileHeader())
+        result.fp.write(data)
+        result.filelist.append(new_info)
+        result.NameToInfo[new_info.filename] = new_info
+        result.start_dir = result.fp.tell()
+        result._didModify = True
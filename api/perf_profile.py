@@ -0,0 +1,48 @@
+# api/perf_profile.py
+import json
+import logging
+import os
+from typing import Dict, Optional
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Used when no profile has been written by scripts/autotune.py
+DEFAULT_PROFILE = {
+    "intra_op_threads": None,  # None keeps torch's default
+    "inter_op_threads": None,
+    "batch_size": 16,
+    "num_beams": 2,
+    "workers": 2
+}
+
+def load_profile(path: Optional[str]) -> Dict:
+    """Load a performance profile, filling in defaults for missing settings."""
+    profile = dict(DEFAULT_PROFILE)
+    if not path or not os.path.exists(path):
+        return profile
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        profile.update({key: data[key] for key in DEFAULT_PROFILE if key in data})
+        logger.info(f"Loaded performance profile from {path}: {profile}")
+    except Exception as e:
+        logger.error(f"Error loading performance profile {path}: {str(e)}")
+    return profile
+
+def save_profile(profile: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+
+def apply_thread_settings(profile: Dict):
+    """Apply the torch thread counts of a profile to the current process."""
+    if profile.get("intra_op_threads"):
+        torch.set_num_threads(profile["intra_op_threads"])
+    if profile.get("inter_op_threads"):
+        try:
+            torch.set_num_interop_threads(profile["inter_op_threads"])
+        except RuntimeError:
+            # Can only be set once, before any inter-op parallel work has started
+            logger.warning("Inter-op thread count already fixed for this process, keeping it")
@@ -0,0 +1,50 @@
+# api/pptx_extraction.py
+from typing import Iterator, List
+from pptx.shapes.group import GroupShape
+
+def iter_shape_text_frames(shapes) -> Iterator:
+    """Text frames of shapes, descending into groups and table cells."""
+    for shape in shapes:
+        # shape_type raises NotImplementedError for autoshapes python-pptx does not know
+        if isinstance(shape, GroupShape):
+            yield from iter_shape_text_frames(shape.shapes)
+        elif getattr(shape, "has_table", False):
+            for row in shape.table.rows:
+                for cell in row.cells:
+                    # Cells covered by a merged cell have no text of their own
+                    if not cell.is_spanned:
+                        yield cell.text_frame
+        elif shape.has_text_frame:
+            yield shape.text_frame
+
+def iter_text_frames(prs) -> Iterator:
+    """Every text frame of a presentation: slide shapes, groups, tables and speaker notes."""
+    for slide in prs.slides:
+        yield from iter_shape_text_frames(slide.shapes)
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame
+            if notes is not None:
+                yield notes
+
+def paragraph_text(paragraph) -> str:
+    return "".join(run.text for run in paragraph.runs)
+
+def text_paragraphs(prs) -> List:
+    """Paragraphs with text; each one is translated as a unit."""
+    return [
+        paragraph
+        for text_frame in iter_text_frames(prs)
+        for paragraph in text_frame.paragraphs
+        if paragraph_text(paragraph).strip()
+    ]
+
+def set_paragraph_text(paragraph, text: str):
+    """Put the translation in the first run, keeping its formatting, and empty the others.
+
+    The translation has no word alignment to the source runs, so formatting
+    and hyperlinks of the other runs are lost, as in docx_extraction.
+    """
+    runs = [run for run in paragraph.runs if run.text]
+    runs[0].text = text
+    for run in runs[1:]:
+        run.text = ""
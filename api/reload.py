@@ -0,0 +1,107 @@
+# api/reload.py
+import gc
+import logging
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks whether the previous model has drained
+DRAIN_POLL_INTERVAL = 1.0
+
+class ReloadInProgress(Exception):
+    pass
+
+class ModelReloader:
+    """Replaces the serving model without a restart.
+
+    The new model is loaded and warmed up on a background thread while the
+    current one keeps serving. The routers are then pointed at the new model,
+    so new requests use it, while work already running keeps its reference to
+    the old model and finishes there. Once no document job runs on the old
+    instance and its last reference is gone, it is garbage collected.
+    """
+
+    def __init__(self, initialize: Callable, attach: Callable, drain_timeout: float = 3600):
+        # initialize(**overrides) -> (model, doc_translator); attach(model, doc_translator)
+        self.initialize = initialize
+        self.attach = attach
+        self.drain_timeout = drain_timeout
+        self.model = None
+        self.doc_translator = None
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.state: Dict = {"state": "idle", "generation": 0}
+
+    def install(self, model, doc_translator):
+        """Serve a model: attach it to the routers and keep track of it for the next reload."""
+        with self.lock:
+            self.model = model
+            self.doc_translator = doc_translator
+            self.generation += 1
+            self.attach(model, doc_translator)
+            return self.generation
+
+    def start(self, **overrides) -> Dict:
+        with self.lock:
+            if self.state["state"] in ("loading", "draining"):
+                raise ReloadInProgress(f"A reload is already {self.state['state']}")
+            self.state = {
+                "state": "loading",
+                "generation": self.generation,
+                "overrides": overrides,
+                "started_at": time.time()
+            }
+        threading.Thread(target=self._reload, args=(overrides,), name="model-reloader", daemon=True).start()
+        return self.status()
+
+    def _reload(self, overrides: Dict):
+        try:
+            model, doc_translator = self.initialize(**overrides)
+        except Exception as e:
+            # The current model keeps serving
+            logger.error(f"Model reload failed: {str(e)}", exc_info=True)
+            self._update(state="error", error=str(e), finished_at=time.time())
+            return
+
+        old_model, old_translator = self.model, self.doc_translator
+        generation = self.install(model, doc_translator)
+        logger.info(f"Serving model generation {generation}, draining the previous one")
+        self._update(state="draining", generation=generation, swapped_at=time.time())
+
+        old_translator_ref = weakref.ref(old_translator) if old_translator is not None else None
+        old_model_ref = weakref.ref(old_model) if old_model is not None else None
+        del model, doc_translator, old_model, old_translator
+        self._drain(old_model_ref, old_translator_ref)
+
+    def _drain(self, old_model_ref, old_translator_ref):
+        deadline = time.monotonic() + self.drain_timeout
+        while True:
+            translator = old_translator_ref() if old_translator_ref is not None else None
+            active_jobs = translator.active_jobs if translator is not None else 0
+            del translator
+            if active_jobs == 0:
+                # Cycles (model <-> tokenizer stage) need the collector
+                gc.collect()
+                if old_model_ref is None or old_model_ref() is None:
+                    break
+            if time.monotonic() > deadline:
+                logger.warning(f"Previous model not released after {self.drain_timeout}s "
+                               f"({active_jobs} document jobs still running on it)")
+                self._update(state="done", old_model_freed=False, active_jobs=active_jobs, finished_at=time.time())
+                return
+            self._update(active_jobs=active_jobs)
+            time.sleep(DRAIN_POLL_INTERVAL)
+
+        logger.info("Previous model drained and freed")
+        self._update(state="done", old_model_freed=True, active_jobs=0, finished_at=time.time())
+
+    def _update(self, **values):
+        with self.lock:
+            self.state.update(values)
+
+    def status(self) -> Dict:
+        with self.lock:
+            return dict(self.state, current_generation=self.generation)
@@ -0,0 +1,124 @@
+# api/resources.py
+import os
+import resource
+import sys
+import tempfile
+import threading
+import tracemalloc
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Rough size of an int object in a list of token IDs
+INT_BYTES = 28
+
+def object_bytes(value) -> int:
+    """Shallow size of a string, or of a list of ints with its elements."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += len(value) * INT_BYTES
+    return size
+
+def mapping_bytes(items: Iterable[Tuple]) -> int:
+    """Approximate memory of cache entries: keys (strings or tuples of strings) and values."""
+    total = 0
+    for key, value in items:
+        if isinstance(key, tuple):
+            total += sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+        else:
+            total += sys.getsizeof(key)
+        total += object_bytes(value)
+    return total
+
+def process_memory() -> Dict:
+    """Resident set size now and at its peak, from /proc where available."""
+    memory = {"rss_bytes": None, "peak_rss_bytes": None}
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_bytes"] = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    memory["peak_rss_bytes"] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if memory["peak_rss_bytes"] is None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    return memory
+
+def directory_usage(path: Optional[str], suffixes: Optional[Tuple[str, ...]] = None, recursive: bool = True) -> Dict:
+    """Number and total size of files in a directory, optionally only those with the given suffixes."""
+    usage = {"path": path, "files": 0, "bytes": 0}
+    if not path or not os.path.isdir(path):
+        return usage
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            if suffixes and not name.lower().endswith(suffixes):
+                continue
+            try:
+                usage["bytes"] += os.path.getsize(os.path.join(root, name))
+                usage["files"] += 1
+            except OSError:
+                # Removed while we were looking
+                pass
+        if not recursive:
+            break
+    return usage
+
+def temp_file_usage(suffixes: Tuple[str, ...]) -> Dict:
+    """Document temp files left in the system temp directory (top level only)."""
+    return directory_usage(tempfile.gettempdir(), suffixes, recursive=False)
+
+class LeakTracker:
+    """tracemalloc snapshots on demand, to compare allocations between two points in time.
+
+    Tracing costs memory and CPU on every allocation, so it only runs between
+    start() and stop().
+    """
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self.baseline = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            self.baseline = self._snapshot()
+
+    def stop(self):
+        with self.lock:
+            tracemalloc.stop()
+            self.baseline = None
+
+    def _snapshot(self):
+        # tracemalloc's own bookkeeping is not what we are looking for
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def diff(self, top: int = 20) -> Optional[List[Dict]]:
+        """Allocation sites that grew most since start() (or since the previous diff)."""
+        with self.lock:
+            if self.baseline is None or not tracemalloc.is_tracing():
+                return None
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self.baseline, "lineno")
+            self.baseline = snapshot
+        return [
+            {
+                "location": str(stat.traceback[0]),
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff
+            }
+            for stat in stats[:top]
+        ]
+
+    def status(self) -> Dict:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {"tracing": True, "traced_bytes": current, "traced_peak_bytes": peak}
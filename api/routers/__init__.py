@@ -2,4 +2,5 @@
 from . import translation
 from . import document
 from . import websocket
-from . import system
\ No newline at end of file
+from . import system
+from . import admin
\ No newline at end of file
@@ -0,0 +1,62 @@
+# api/routers/admin.py
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+from typing import Optional
+import hmac
+import logging
+from ..reload import ReloadInProgress
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+class ReloadRequest(BaseModel):
+    # Paths default to the configured ones; config files (registry, decoding
+    # policy, perf profile) are read again either way
+    model_path: Optional[str] = None
+    snapshot_path: Optional[str] = None
+    registry_path: Optional[str] = None
+
+def check_admin(request: Request):
+    if not router.admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode(), router.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.post("/reload/", status_code=202)
+async def reload_model(req: ReloadRequest, request: Request):
+    """Load and warm up a new model in the background, then switch requests over to it."""
+    check_admin(request)
+    if router.model_state["state"] != "ready":
+        # The initial load would install its model over the reloaded one
+        raise HTTPException(status_code=503, detail=f"Model is {router.model_state['state']}, reload once it is ready")
+    overrides = {key: value for key, value in req.dict().items() if value is not None}
+    if "model_path" in overrides and "snapshot_path" not in overrides:
+        # The configured snapshot belongs to the configured model
+        overrides["snapshot_path"] = ""
+    try:
+        status = router.reloader.start(**overrides)
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(f"Model reload started: {overrides}")
+    return status
+
+@router.get("/reload/")
+async def reload_status(request: Request):
+    check_admin(request)
+    return router.reloader.status()
+
+@router.post("/tracemalloc/{action}/")
+def control_tracemalloc(action: str, request: Request, top: int = 20):
+    """Start or stop tracing allocations, or list the sites that grew since the last start/diff."""
+    check_admin(request)
+    if action == "start":
+        router.leak_tracker.start()
+    elif action == "stop":
+        router.leak_tracker.stop()
+    elif action != "diff":
+        raise HTTPException(status_code=404, detail="Action must be start, diff or stop")
+    status = router.leak_tracker.status()
+    if action == "diff":
+        status["diff"] = router.leak_tracker.diff(top)
+    return status
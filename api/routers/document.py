@@ -1,12 +1,17 @@
 # api/routers/document.py
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from starlette.background import BackgroundTask  # Changed this line
-import tempfile
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from starlette.concurrency import run_in_threadpool
 import os
+import time
 import uuid
 import logging
 from typing import Dict
+from ..document_translator import SUPPORTED_EXTENSIONS, translated_filename, extract_text_for_estimate
+from ..scheduler import client_id_for
+from ..admission import admit_request
+from .translation import check_language_pair
+from ..artifacts import ArtifactResponse
+from .. import tracing
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -19,141 +24,141 @@ def update_progress(task_id: str, progress: int, message: str):
     translation_progress[task_id] = {
         "status": "processing",
         "progress": progress,
-        "message": message
+        "message": message,
+        "trace_id": translation_progress.get(task_id, {}).get("trace_id")
     }
 
-def cleanup_file(path: str, task_id: str):
-    try:
-        if os.path.exists(path):
-            os.remove(path)
-        if task_id in translation_progress:
-            del translation_progress[task_id]
-    except Exception as e:
-        logger.error(f"Cleanup error: {str(e)}")
+def remove_expired_tasks():
+    # Tasks are kept as long as their artifact, so the task store stays bounded
+    for task_id in router.artifacts.remove_expired():
+        translation_progress.pop(task_id, None)
+    # Failed tasks have no artifact; they are dropped after the same retention
+    cutoff = time.time() - router.artifacts.retention
+    for task_id, task in list(translation_progress.items()):
+        if task["status"] in ("completed", "error") and task.get("finished_at", cutoff) < cutoff:
+            translation_progress.pop(task_id, None)
 
 @router.post("/translate/document/")
 async def translate_document(
+    request: Request,
     file: UploadFile = File(...),
     source_lang: str = Form(...),  # Required parameter using Query
     target_lang: str = Form(...)   # Required parameter using Query
 ):
+    if not router.doc_translator:
+        raise HTTPException(status_code=503, detail="Translation model is still loading")
+
+    remove_expired_tasks()
     task_id = str(uuid.uuid4())
-    translation_progress[task_id] = {"status": "starting", "progress": 0}
+    # The request's trace covers the whole job; the task ID leads to it
+    trace_id = tracing.current_trace_id()
+    tracing.current_span().set_attribute("task_id", task_id)
+    translation_progress[task_id] = {"status": "starting", "progress": 0, "trace_id": trace_id}
 
     try:
         file_size = 0
         content = bytearray()
         
-        while True:
-            chunk = await file.read(8192)
-            if not chunk:
-                break
-            file_size += len(chunk)
-            if file_size > MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"File too large. Maximum size is {MAX_FILE_SIZE/1024/1024}MB"
-                )
-            content.extend(chunk)
+        with tracing.span("upload.read") as span:
+            while True:
+                chunk = await file.read(8192)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {MAX_FILE_SIZE/1024/1024}MB"
+                    )
+                content.extend(chunk)
+            span.set_attribute("bytes", file_size)
 
         filename = file.filename.lower()
-        if not any(filename.endswith(ext) for ext in ['.docx', '.xlsx', '.pptx', '.pdf', '.html', '.htm', '.txt']):
+        if not filename.endswith(SUPPORTED_EXTENSIONS):
                 raise HTTPException(
                     status_code=400,
                     detail="Unsupported file type. Only .docx, .xlsx, .pptx, .pdf, .html, and .txt files are supported."
                 )       
 
-        translation_progress[task_id] = {
-            "status": "processing",
-            "progress": 10,
-            "message": "File validation completed"
-        }
+        update_progress(task_id, 10, "File validation completed")
 
-        if filename.endswith('.docx'):
-            content_and_metrics = await router.doc_translator.translate_docx_with_progress(
-                content, source_lang, target_lang,
-                lambda p, m: update_progress(task_id, p, m)
-            )
-            translated_content, metrics = content_and_metrics  # Unpack the tuple
-            output_filename = filename.replace('.docx', f'_translated_{target_lang}.docx')
-        elif filename.endswith('.xlsx'):
-            content_and_metrics = await router.doc_translator.translate_xlsx_with_progress(
-                content, source_lang, target_lang,
-                lambda p, m: update_progress(task_id, p, m)
-            )
-            translated_content, metrics = content_and_metrics
-            output_filename = filename.replace('.xlsx', f'_translated_{target_lang}.xlsx')
-        elif filename.endswith('.pdf'):
-            content_and_metrics = await router.doc_translator.translate_pdf_with_progress(
-                content, source_lang, target_lang,
-                lambda p, m: update_progress(task_id, p, m)
-            )
-            translated_content, metrics = content_and_metrics
-            output_filename = filename.replace('.pdf', f'_translated_{target_lang}.pdf')        
-        elif filename.endswith(('.html', '.htm')):
-            content_and_metrics = await router.doc_translator.translate_html_with_progress(
-                content, source_lang, target_lang,
-                lambda p, m: update_progress(task_id, p, m)
+        # Estimate the cost before doing any translation work
+        check_language_pair(router.model, source_lang, target_lang)
+        client_id = client_id_for(request)
+        # Text extraction and tokenization block, keep them off the event loop
+        def estimate():
+            return router.admission.estimate_tokens(
+                router.model, extract_text_for_estimate(content, filename), source_lang, target_lang
             )
-            translated_content, metrics = content_and_metrics
-            output_filename = filename.replace(
-                '.html' if filename.endswith('.html') else '.htm',
-                f'_translated_{target_lang}.html'
-            )   
-        elif filename.endswith('.txt'):
-            content_and_metrics = await router.doc_translator.translate_txt_with_progress(
-                content, source_lang, target_lang,
-                lambda p, m: update_progress(task_id, p, m)
+        tokens = await run_in_threadpool(estimate)
+        with admit_request(router.admission, client_id, tokens):
+            translated_content, metrics = await router.doc_translator.translate_file(
+                content, filename, source_lang, target_lang,
+                lambda p, m: update_progress(task_id, p, m),
+                client_id=client_id
             )
-            translated_content, metrics = content_and_metrics
-            output_filename = filename.replace('.txt', f'_translated_{target_lang}.txt')
-        else:  # pptx
-            content_and_metrics = await router.doc_translator.translate_pptx_with_progress(
-                content, source_lang, target_lang,
-                lambda p, m: update_progress(task_id, p, m)
-            )
-            translated_content, metrics = content_and_metrics
-            output_filename = filename.replace('.pptx', f'_translated_{target_lang}.pptx')
+        output_filename = translated_filename(filename, target_lang)
 
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_file.write(translated_content)  # Now just writing the content part
-            tmp_path = tmp_file.name
+        with tracing.span("artifact.write", bytes=len(translated_content)):
+            # Hashing and writing the file block, keep them off the event loop
+            artifact = await run_in_threadpool(router.artifacts.put, task_id, output_filename, translated_content)
 
         translation_progress[task_id] = {
             "status": "completed",
             "progress": 100,
             "message": "Translation completed",
             "download_url": f"/api/download/{task_id}/{output_filename}",
-            "tmp_path": tmp_path,
-            "metrics": metrics  # Store the metrics part
+            "expires_at": router.artifacts.expires_at(artifact),
+            "metrics": metrics,  # Store the metrics part
+            "trace_id": trace_id,
+            "finished_at": time.time()
         }
 
         return {
             "task_id": task_id,
+            "trace_id": trace_id,
             "message": "Translation completed",
-            "download_url": f"/api/download/{task_id}/{output_filename}"
+            "download_url": f"/api/download/{task_id}/{output_filename}",
+            "expires_at": router.artifacts.expires_at(artifact)
         }
 
+    except HTTPException as e:
+        translation_progress[task_id] = {
+            "status": "error",
+            "progress": 0,
+            "message": str(e.detail),
+            "trace_id": trace_id,
+            "finished_at": time.time()
+        }
+        raise
     except Exception as e:
         translation_progress[task_id] = {
             "status": "error",
             "progress": 0,
-            "message": str(e)
+            "message": str(e),
+            "trace_id": trace_id,
+            "finished_at": time.time()
         }
         logger.error(f"Translation error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/download/{task_id}/{filename}")
-async def download_file(task_id: str, filename: str):
-    if task_id not in translation_progress or translation_progress[task_id]["status"] != "completed":
-        raise HTTPException(status_code=404, detail="File not found or translation not completed")
-    
-    tmp_path = translation_progress[task_id].get("tmp_path")
-    if not tmp_path or not os.path.exists(tmp_path):
-        raise HTTPException(status_code=404, detail="File not found")
-
-    return FileResponse(
-        tmp_path,
-        filename=filename,
-        background=BackgroundTask(lambda: cleanup_file(tmp_path, task_id))
-    )
\ No newline at end of file
+@router.api_route("/download/{task_id}/{filename}", methods=["GET", "HEAD"])
+async def download_file(task_id: str, filename: str, request: Request):
+    """Serve a translated file until its retention expires.
+
+    Downloads can be repeated, resumed and split with Range requests;
+    If-None-Match/If-Range are honored and text formats are gzipped on request.
+    """
+    remove_expired_tasks()
+    artifact = router.artifacts.get(task_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="File not found, not completed or expired")
+
+    # Link the download to the job's trace
+    span = tracing.current_span()
+    span.set_attribute("task_id", task_id)
+    span.set_attribute("job_trace_id", translation_progress.get(task_id, {}).get("trace_id"))
+    span.set_attribute("bytes", artifact.size)
+    span.set_attribute("range", request.headers.get("range", ""))
+
+    return ArtifactResponse(artifact, request.headers, request.method)
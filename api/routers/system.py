@@ -1,17 +1,137 @@
 # api/routers/system.py
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 import logging
+from ..document_translator import SUPPORTED_EXTENSIONS
+from ..resources import directory_usage, process_memory, temp_file_usage
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Languages of the full M2M100 model
+LANGUAGES = [
+    {"code": "af", "name": "Afrikaans"},
+    {"code": "am", "name": "Amharic"},
+    {"code": "ar", "name": "Arabic"},
+    {"code": "ast", "name": "Asturian"},
+    {"code": "az", "name": "Azerbaijani"},
+    {"code": "ba", "name": "Bashkir"},
+    {"code": "be", "name": "Belarusian"},
+    {"code": "bg", "name": "Bulgarian"},
+    {"code": "bn", "name": "Bengali"},
+    {"code": "br", "name": "Breton"},
+    {"code": "bs", "name": "Bosnian"},
+    {"code": "ca", "name": "Catalan"},
+    {"code": "ceb", "name": "Cebuano"},
+    {"code": "cs", "name": "Czech"},
+    {"code": "cy", "name": "Welsh"},
+    {"code": "da", "name": "Danish"},
+    {"code": "de", "name": "German"},
+    {"code": "el", "name": "Greek"},
+    {"code": "en", "name": "English"},
+    {"code": "es", "name": "Spanish"},
+    {"code": "et", "name": "Estonian"},
+    {"code": "fa", "name": "Persian"},
+    {"code": "ff", "name": "Fulah"},
+    {"code": "fi", "name": "Finnish"},
+    {"code": "fr", "name": "French"},
+    {"code": "fy", "name": "Western Frisian"},
+    {"code": "ga", "name": "Irish"},
+    {"code": "gd", "name": "Scottish Gaelic"},
+    {"code": "gl", "name": "Galician"},
+    {"code": "gu", "name": "Gujarati"},
+    {"code": "ha", "name": "Hausa"},
+    {"code": "he", "name": "Hebrew"},
+    {"code": "hi", "name": "Hindi"},
+    {"code": "hr", "name": "Croatian"},
+    {"code": "ht", "name": "Haitian Creole"},
+    {"code": "hu", "name": "Hungarian"},
+    {"code": "hy", "name": "Armenian"},
+    {"code": "id", "name": "Indonesian"},
+    {"code": "ig", "name": "Igbo"},
+    {"code": "ilo", "name": "Iloko"},
+    {"code": "is", "name": "Icelandic"},
+    {"code": "it", "name": "Italian"},
+    {"code": "ja", "name": "Japanese"},
+    {"code": "jv", "name": "Javanese"},
+    {"code": "ka", "name": "Georgian"},
+    {"code": "kk", "name": "Kazakh"},
+    {"code": "km", "name": "Central Khmer"},
+    {"code": "kn", "name": "Kannada"},
+    {"code": "ko", "name": "Korean"},
+    {"code": "lb", "name": "Luxembourgish"},
+    {"code": "lg", "name": "Ganda"},
+    {"code": "ln", "name": "Lingala"},
+    {"code": "lo", "name": "Lao"},
+    {"code": "lt", "name": "Lithuanian"},
+    {"code": "lv", "name": "Latvian"},
+    {"code": "mg", "name": "Malagasy"},
+    {"code": "mk", "name": "Macedonian"},
+    {"code": "ml", "name": "Malayalam"},
+    {"code": "mn", "name": "Mongolian"},
+    {"code": "mr", "name": "Marathi"},
+    {"code": "ms", "name": "Malay"},
+    {"code": "my", "name": "Burmese"},
+    {"code": "ne", "name": "Nepali"},
+    {"code": "nl", "name": "Dutch"},
+    {"code": "no", "name": "Norwegian"},
+    {"code": "ns", "name": "Northern Sotho"},
+    {"code": "oc", "name": "Occitan"},
+    {"code": "or", "name": "Oriya"},
+    {"code": "pa", "name": "Punjabi"},
+    {"code": "pl", "name": "Polish"},
+    {"code": "ps", "name": "Pashto"},
+    {"code": "pt", "name": "Portuguese"},
+    {"code": "ro", "name": "Romanian"},
+    {"code": "ru", "name": "Russian"},
+    {"code": "sd", "name": "Sindhi"},
+    {"code": "si", "name": "Sinhala"},
+    {"code": "sk", "name": "Slovak"},
+    {"code": "sl", "name": "Slovenian"},
+    {"code": "so", "name": "Somali"},
+    {"code": "sq", "name": "Albanian"},
+    {"code": "sr", "name": "Serbian"},
+    {"code": "ss", "name": "Swati"},
+    {"code": "su", "name": "Sundanese"},
+    {"code": "sv", "name": "Swedish"},
+    {"code": "sw", "name": "Swahili"},
+    {"code": "ta", "name": "Tamil"},
+    {"code": "th", "name": "Thai"},
+    {"code": "tl", "name": "Tagalog"},
+    {"code": "tn", "name": "Tswana"},
+    {"code": "tr", "name": "Turkish"},
+    {"code": "uk", "name": "Ukrainian"},
+    {"code": "ur", "name": "Urdu"},
+    {"code": "uz", "name": "Uzbek"},
+    {"code": "vi", "name": "Vietnamese"},
+    {"code": "wo", "name": "Wolof"},
+    {"code": "xh", "name": "Xhosa"},
+    {"code": "yi", "name": "Yiddish"},
+    {"code": "yo", "name": "Yoruba"},
+    {"code": "zh", "name": "Chinese"},
+    {"code": "zu", "name": "Zulu"}
+]
+
 @router.get("/status/")
 async def check_status():
     try:
-        is_ready = router.model is not None
+        state = router.model_state
+        is_ready = state["state"] == "ready" and router.model is not None
+        load_time = None
+        if state["ready_at"] and state["started_at"]:
+            load_time = round(state["ready_at"] - state["started_at"], 2)
         return {
-            "status": "ready" if is_ready else "not_ready",
-            "device": router.model.device if is_ready else None
+            "status": "ready" if is_ready else state["state"],
+            "live": True,
+            "ready": is_ready,
+            "device": router.model.device if is_ready else None,
+            "load_time": load_time,
+            "error": state["error"],
+            "queues": router.scheduler.stats(),
+            "inference_pool": router.scheduler.pool.stats() if router.scheduler.pool is not None else None,
+            "admission": router.admission.stats(),
+            "translation_memory": router.model.translation_memory.stats()
+            if is_ready and router.model.translation_memory is not None else None
         }
     except Exception as e:
         return {
@@ -19,110 +139,58 @@ async def check_status():
             "error": str(e)
         }
 
+@router.get("/status/resources/")
+def check_resources():
+    """Memory and disk held by each component, to find what grows before an OOM kill.
+
+    Sizes of caches are estimates; the walk over caches and directories runs
+    in the threadpool. Allocation tracing is controlled through the admin
+    endpoints, this only reports whether it is on.
+    """
+    artifacts = router.artifacts
+    return {
+        "process": process_memory(),
+        "model": router.model.memory_report() if router.model is not None else None,
+        "tasks": {
+            "translation_progress": len(router.translation_progress),
+            "artifacts": len(artifacts.artifacts),
+            "incremental_sessions": len(router.incremental.sessions)
+        },
+        "disk": {
+            "artifacts": directory_usage(artifacts.directory),
+            "checkpoints": directory_usage(router.checkpoint_dir),
+            "temp_files": temp_file_usage(SUPPORTED_EXTENSIONS)
+        },
+        "tracemalloc": router.leak_tracker.status()
+    }
+
+@router.get("/status/live/")
+async def check_liveness():
+    # The process is serving requests, regardless of model state
+    return {"live": True}
+
+@router.get("/status/ready/")
+async def check_readiness():
+    state = router.model_state
+    if state["state"] != "ready" or router.model is None:
+        return JSONResponse(
+            status_code=503,
+            content={"ready": False, "status": state["state"], "error": state["error"]}
+        )
+    return {"ready": True}
+
 @router.get("/languages/")
 async def get_languages():
+    # Report which engine serves which pair; all other pairs use the default model
+    routes = router.model.describe_routes() if router.model is not None else []
+
+    # A pruned model only serves the languages it was built for
+    supported = router.model.languages() if router.model is not None else None
+    languages = LANGUAGES if supported is None else [lang for lang in LANGUAGES if lang["code"] in supported]
+
     # Return supported languages
     return {
-        "languages": [
-            {"code": "af", "name": "Afrikaans"},
-            {"code": "am", "name": "Amharic"},
-            {"code": "ar", "name": "Arabic"},
-            {"code": "ast", "name": "Asturian"},
-            {"code": "az", "name": "Azerbaijani"},
-            {"code": "ba", "name": "Bashkir"},
-            {"code": "be", "name": "Belarusian"},
-            {"code": "bg", "name": "Bulgarian"},
-            {"code": "bn", "name": "Bengali"},
-            {"code": "br", "name": "Breton"},
-            {"code": "bs", "name": "Bosnian"},
-            {"code": "ca", "name": "Catalan"},
-            {"code": "ceb", "name": "Cebuano"},
-            {"code": "cs", "name": "Czech"},
-            {"code": "cy", "name": "Welsh"},
-            {"code": "da", "name": "Danish"},
-            {"code": "de", "name": "German"},
-            {"code": "el", "name": "Greek"},
-            {"code": "en", "name": "English"},
-            {"code": "es", "name": "Spanish"},
-            {"code": "et", "name": "Estonian"},
-            {"code": "fa", "name": "Persian"},
-            {"code": "ff", "name": "Fulah"},
-            {"code": "fi", "name": "Finnish"},
-            {"code": "fr", "name": "French"},
-            {"code": "fy", "name": "Western Frisian"},
-            {"code": "ga", "name": "Irish"},
-            {"code": "gd", "name": "Scottish Gaelic"},
-            {"code": "gl", "name": "Galician"},
-            {"code": "gu", "name": "Gujarati"},
-            {"code": "ha", "name": "Hausa"},
-            {"code": "he", "name": "Hebrew"},
-            {"code": "hi", "name": "Hindi"},
-            {"code": "hr", "name": "Croatian"},
-            {"code": "ht", "name": "Haitian Creole"},
-            {"code": "hu", "name": "Hungarian"},
-            {"code": "hy", "name": "Armenian"},
-            {"code": "id", "name": "Indonesian"},
-            {"code": "ig", "name": "Igbo"},
-            {"code": "ilo", "name": "Iloko"},
-            {"code": "is", "name": "Icelandic"},
-            {"code": "it", "name": "Italian"},
-            {"code": "ja", "name": "Japanese"},
-            {"code": "jv", "name": "Javanese"},
-            {"code": "ka", "name": "Georgian"},
-            {"code": "kk", "name": "Kazakh"},
-            {"code": "km", "name": "Central Khmer"},
-            {"code": "kn", "name": "Kannada"},
-            {"code": "ko", "name": "Korean"},
-            {"code": "lb", "name": "Luxembourgish"},
-            {"code": "lg", "name": "Ganda"},
-            {"code": "ln", "name": "Lingala"},
-            {"code": "lo", "name": "Lao"},
-            {"code": "lt", "name": "Lithuanian"},
-            {"code": "lv", "name": "Latvian"},
-            {"code": "mg", "name": "Malagasy"},
-            {"code": "mk", "name": "Macedonian"},
-            {"code": "ml", "name": "Malayalam"},
-            {"code": "mn", "name": "Mongolian"},
-            {"code": "mr", "name": "Marathi"},
-            {"code": "ms", "name": "Malay"},
-            {"code": "my", "name": "Burmese"},
-            {"code": "ne", "name": "Nepali"},
-            {"code": "nl", "name": "Dutch"},
-            {"code": "no", "name": "Norwegian"},
-            {"code": "ns", "name": "Northern Sotho"},
-            {"code": "oc", "name": "Occitan"},
-            {"code": "or", "name": "Oriya"},
-            {"code": "pa", "name": "Punjabi"},
-            {"code": "pl", "name": "Polish"},
-            {"code": "ps", "name": "Pashto"},
-            {"code": "pt", "name": "Portuguese"},
-            {"code": "ro", "name": "Romanian"},
-            {"code": "ru", "name": "Russian"},
-            {"code": "sd", "name": "Sindhi"},
-            {"code": "si", "name": "Sinhala"},
-            {"code": "sk", "name": "Slovak"},
-            {"code": "sl", "name": "Slovenian"},
-            {"code": "so", "name": "Somali"},
-            {"code": "sq", "name": "Albanian"},
-            {"code": "sr", "name": "Serbian"},
-            {"code": "ss", "name": "Swati"},
-            {"code": "su", "name": "Sundanese"},
-            {"code": "sv", "name": "Swedish"},
-            {"code": "sw", "name": "Swahili"},
-            {"code": "ta", "name": "Tamil"},
-            {"code": "th", "name": "Thai"},
-            {"code": "tl", "name": "Tagalog"},
-            {"code": "tn", "name": "Tswana"},
-            {"code": "tr", "name": "Turkish"},
-            {"code": "uk", "name": "Ukrainian"},
-            {"code": "ur", "name": "Urdu"},
-            {"code": "uz", "name": "Uzbek"},
-            {"code": "vi", "name": "Vietnamese"},
-            {"code": "wo", "name": "Wolof"},
-            {"code": "xh", "name": "Xhosa"},
-            {"code": "yi", "name": "Yiddish"},
-            {"code": "yo", "name": "Yoruba"},
-            {"code": "zh", "name": "Chinese"},
-            {"code": "zu", "name": "Zulu"}
-        ]
-    }
\ No newline at end of file
+        "default_engine": "m2m100",
+        "routes": routes,
+        "languages": languages
+    }
@@ -1,12 +1,23 @@
 # api/routers/translation.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool, run_until_first_complete
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+import asyncio
+import json
 import logging
+from ..scheduler import client_id_for
+from ..document_translator import BATCH_MAX_CHARS
+from ..admission import AdmissionRejected, admit_request
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+STREAM_BATCH_SIZE = 32                 # Records per generate call in streaming translation
+MAX_STREAM_RECORD_SIZE = 1024 * 1024   # 1MB limit per NDJSON record
+
 class TranslationRequest(BaseModel):
     text: str
     source_lang: str
@@ -17,32 +28,62 @@ class BatchTranslationRequest(BaseModel):
     source_lang: str
     target_lang: str
 
+class IncrementalTranslationRequest(BaseModel):
+    text: str
+    source_lang: str
+    target_lang: str
+    session_id: Optional[str] = None
+    revision: Optional[int] = None  # Revision the client's segments are at
+
 @router.post("/translate/")
-async def translate(req: TranslationRequest):
+async def translate(req: TranslationRequest, request: Request):
     try:
         logger.debug(f"Translation request: {req}")
         if not router.model:
-            raise HTTPException(status_code=500, detail="Translation model not initialized")
-            
-        translation, metrics = router.model.translate(
-            req.text,
-            req.source_lang,
-            req.target_lang
+            raise HTTPException(status_code=503, detail="Translation model is still loading")
+
+        check_language_pair(router.model, req.source_lang, req.target_lang)
+        client_id = client_id_for(request)
+        tokens = await run_in_threadpool(
+            router.admission.estimate_tokens, router.model, [req.text], req.source_lang, req.target_lang
         )
+        with admit_request(router.admission, client_id, tokens):
+            # Interactive requests are served ahead of batch and document work
+            translation, metrics = await router.scheduler.run(
+                "interactive",
+                client_id,
+                router.model.translate,
+                req.text,
+                req.source_lang,
+                req.target_lang
+            )
         logger.debug(f"Translation metrics: {metrics}")
         
         return {
             "translation": translation,
             "metrics": metrics
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Translation error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/translate/batch/")
-async def translate_batch(req: BatchTranslationRequest):
+async def translate_batch(req: BatchTranslationRequest, request: Request):
+    if not router.model:
+        raise HTTPException(status_code=503, detail="Translation model is still loading")
+    check_language_pair(router.model, req.source_lang, req.target_lang)
+    client_id = client_id_for(request)
+    tokens = await run_in_threadpool(
+        router.admission.estimate_tokens, router.model, req.texts, req.source_lang, req.target_lang
+    )
+    admission = admit_request(router.admission, client_id, tokens)
     try:
-        translations = router.model.translate_batch(
+        translations = await router.scheduler.run(
+            "batch",
+            client_id,
+            router.model.translate_batch,
             req.texts,
             req.source_lang,
             req.target_lang
@@ -50,4 +91,215 @@ async def translate_batch(req: BatchTranslationRequest):
         return {"translations": translations}
     except Exception as e:
         logger.error(f"Batch translation error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        admission.release()
+
+@router.post("/translate/incremental/")
+async def translate_incremental(req: IncrementalTranslationRequest, request: Request):
+    """Translate an edited text, re-translating only the sentences that changed.
+
+    Returns the session's new revision and a patch: replace segments[start:end]
+    with the given segments, applied from the last operation to the first.
+    Without a session, or when the client's revision is not the server's, the
+    response has "full": true and all segments instead.
+    """
+    if not router.model:
+        raise HTTPException(status_code=503, detail="Translation model is still loading")
+    check_language_pair(router.model, req.source_lang, req.target_lang)
+    client_id = client_id_for(request)
+
+    # Only the changed sentences cost anything
+    changed = router.incremental.changed_sentences(req.session_id, req.text, req.source_lang, req.target_lang)
+    tokens = await run_in_threadpool(
+        router.admission.estimate_tokens, router.model, changed, req.source_lang, req.target_lang
+    )
+    try:
+        with admit_request(router.admission, client_id, tokens):
+            return await router.scheduler.run(
+                "interactive",
+                client_id,
+                router.incremental.update,
+                router.model,
+                req.session_id,
+                req.text,
+                req.source_lang,
+                req.target_lang,
+                req.revision
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Incremental translation error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+class RequestStreamingResponse(StreamingResponse):
+    """A StreamingResponse whose content reads the request body as it goes.
+
+    StreamingResponse listens for a client disconnect from the start, and that
+    listener takes http.request messages off the same channel, swallowing the
+    body. This one only starts listening once body_read is set.
+    """
+
+    def __init__(self, content, body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def listen_for_disconnect(self, receive):
+        await self.body_read.wait()
+        await super().listen_for_disconnect(receive)
+
+    async def __call__(self, scope, receive, send):
+        await run_until_first_complete(
+            (self.stream_response, {"send": send}),
+            (self.listen_for_disconnect, {"receive": receive}),
+        )
+        if self.background is not None:
+            await self.background()
+
+async def read_ndjson_lines(chunks):
+    """Yield NDJSON lines from a request body stream.
+
+    Lines longer than MAX_STREAM_RECORD_SIZE are yielded as None and skipped,
+    so memory stays bounded whatever the payload size.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if skipping:
+                # Rest of an oversized record
+                skipping = False
+                continue
+            if line.strip():
+                yield line
+        if len(buffer) > MAX_STREAM_RECORD_SIZE:
+            if not skipping:
+                yield None
+            skipping = True
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield buffer
+
+def check_language_pair(model, source_lang: str, target_lang: str):
+    if not model.supports(source_lang, target_lang):
+        raise HTTPException(status_code=400, detail=f"Unsupported language pair {source_lang}->{target_lang}")
+
+def stream_line(result: dict) -> bytes:
+    return (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+
+@router.post("/translate/stream/")
+async def translate_stream(request: Request, source_lang: Optional[str] = None, target_lang: Optional[str] = None):
+    """Translate newline-delimited JSON records, streaming NDJSON results back in order.
+
+    Each record is {"text": ..., "id": optional, "source_lang": optional, "target_lang": optional};
+    the query parameters provide default languages. Each result line carries the record
+    index and id plus either "translation" or "error".
+    """
+    if not router.model:
+        raise HTTPException(status_code=503, detail="Translation model is still loading")
+    model = router.model
+    scheduler = router.scheduler
+    admission = router.admission
+    client_id = client_id_for(request)
+    body_read = asyncio.Event()
+
+    async def translate_records():
+        try:
+            async for line in translate_body():
+                yield line
+        except ClientDisconnect:
+            logger.info("Client disconnected during a streaming translation upload")
+
+    async def body_lines():
+        # Records are read as results are sent, so a slow reader slows the upload down
+        try:
+            async for line in read_ndjson_lines(request.stream()):
+                yield line
+        finally:
+            body_read.set()
+
+    async def translate_body():
+        batch = []  # (index, id, text)
+        batch_pair = None
+        index = 0
+
+        async def flush():
+            # Translate the pending batch and return its result lines in input order
+            if not batch:
+                return []
+            texts = [text for _, _, text in batch]
+            try:
+                tokens = await run_in_threadpool(admission.estimate_tokens, model, texts, *batch_pair)
+                # Over quota, slow the stream down instead of failing it
+                while True:
+                    try:
+                        admitted = admission.admit(client_id, tokens)
+                        break
+                    except AdmissionRejected as e:
+                        if e.status_code != 429:
+                            raise
+                        await asyncio.sleep(e.retry_after)
+                with admitted:
+                    # Batched inputs are truncated to the model's input length; long
+                    # and multi-line records are split into chunks by translate()
+                    short_texts = [text for text in texts if len(text) <= BATCH_MAX_CHARS and "\n" not in text]
+                    translated = {}
+                    if short_texts:
+                        translations, _ = await scheduler.run("batch", client_id, model.translate_batch,
+                                                              short_texts, *batch_pair)
+                        translated.update(zip(short_texts, translations))
+                    for text in texts:
+                        if text not in translated:
+                            translated[text], _ = await scheduler.run("batch", client_id, model.translate,
+                                                                      text, *batch_pair)
+                lines = [
+                    stream_line({"index": i, "id": record_id, "translation": translated[text]})
+                    for i, record_id, text in batch
+                ]
+            except Exception as e:
+                logger.error(f"Streaming batch translation error: {str(e)}", exc_info=True)
+                lines = [stream_line({"index": i, "id": record_id, "error": str(e)}) for i, record_id, _ in batch]
+            batch.clear()
+            return lines
+
+        async for line in body_lines():
+            record_id = None
+            error = None
+            try:
+                if line is None:
+                    raise ValueError(f"Record exceeds {MAX_STREAM_RECORD_SIZE} bytes")
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Record must be a JSON object")
+                record_id = record.get("id")
+                text = record.get("text")
+                if not isinstance(text, str):
+                    raise ValueError("Record needs a string 'text' field")
+                pair = (record.get("source_lang") or source_lang, record.get("target_lang") or target_lang)
+                if not pair[0] or not pair[1]:
+                    raise ValueError("source_lang and target_lang are required")
+                if not model.supports(*pair):
+                    raise ValueError(f"Unsupported language pair {pair[0]}->{pair[1]}")
+            except ValueError as e:
+                error = str(e)
+
+            # Errors and language changes end the current batch so results stay in order
+            if error is not None or (batch and pair != batch_pair) or len(batch) >= STREAM_BATCH_SIZE:
+                for result_line in await flush():
+                    yield result_line
+
+            if error is not None:
+                yield stream_line({"index": index, "id": record_id, "error": error})
+            else:
+                batch.append((index, record_id, text))
+                batch_pair = pair
+            index += 1
+
+        for result_line in await flush():
+            yield result_line
+
+    return RequestStreamingResponse(translate_records(), body_read, media_type="application/x-ndjson")
@@ -0,0 +1,157 @@
+# api/scheduler.py
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, highest first
+PRIORITY_CLASSES = ("interactive", "batch", "document")
+
+# A lower class is served ahead of higher ones once its oldest job has waited this
+# long (seconds), so batch and document work keeps moving under interactive load
+MAX_WAIT = {
+    "interactive": None,
+    "batch": 2.0,
+    "document": 5.0,
+}
+
+class Job:
+    def __init__(self, priority: str, fn: Callable, args: tuple, kwargs: dict):
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+        # Run in the submitter's context, so the work shows up in its trace
+        self.context = contextvars.copy_context()
+
+    def run(self):
+        queue_wait = time.monotonic() - self.enqueued_at
+        with tracing.span("scheduler.job", priority=self.priority, queue_wait_ms=round(queue_wait * 1000, 1)):
+            return self.fn(*self.args, **self.kwargs)
+
+class TranslationScheduler:
+    """Orders model work between priority classes and between clients.
+
+    Work is submitted in units of one model call (a segment or a batch), so a
+    long document yields to interactive requests at every batch boundary.
+    Within a class, clients are served round-robin, so one client's large
+    upload does not delay everyone else in the same class.
+    """
+
+    def __init__(self, workers: int = 1, pool=None):
+        # With an InferencePool, there is one worker per replica, pinned to its cores
+        self.pool = pool
+        self.workers = pool.size if pool is not None else workers
+        # class -> client_id -> queued jobs; client order is the round-robin order
+        self.queues: Dict[str, "OrderedDict[str, deque]"] = {cls: OrderedDict() for cls in PRIORITY_CLASSES}
+        self.condition = threading.Condition()
+        self.threads = []
+        self.running = False
+        self.dispatched = {cls: 0 for cls in PRIORITY_CLASSES}
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(i,), name=f"translation-scheduler-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def submit(self, priority: str, client_id: str, fn: Callable, *args, **kwargs) -> Future:
+        if priority not in self.queues:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        job = Job(priority, fn, args, kwargs)
+        with self.condition:
+            self.queues[priority].setdefault(client_id, deque()).append(job)
+            self.condition.notify()
+        return job.future
+
+    async def run(self, priority: str, client_id: str, fn: Callable, *args, **kwargs):
+        """Submit work and wait for it without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(priority, client_id, fn, *args, **kwargs))
+
+    def _oldest_wait(self, priority: str, now: float) -> float:
+        return max((now - jobs[0].enqueued_at for jobs in self.queues[priority].values()), default=0)
+
+    def _pick_class(self) -> Optional[str]:
+        now = time.monotonic()
+        # Lower classes that waited too long go first, lowest first
+        for priority in reversed(PRIORITY_CLASSES):
+            max_wait = MAX_WAIT[priority]
+            if self.queues[priority] and max_wait is not None and self._oldest_wait(priority, now) >= max_wait:
+                return priority
+        for priority in PRIORITY_CLASSES:
+            if self.queues[priority]:
+                return priority
+        return None
+
+    def _next_job(self) -> Optional[Job]:
+        priority = self._pick_class()
+        if priority is None:
+            return None
+        clients = self.queues[priority]
+        client_id, jobs = next(iter(clients.items()))
+        job = jobs.popleft()
+        # Round-robin: the client goes to the back of its class
+        del clients[client_id]
+        if jobs:
+            clients[client_id] = jobs
+        self.dispatched[priority] += 1
+        return job
+
+    def _worker(self, index: int):
+        if self.pool is not None:
+            self.pool.bind(index)
+        while True:
+            with self.condition:
+                job = self._next_job()
+                while job is None:
+                    if not self.running:
+                        return
+                    self.condition.wait()
+                    job = self._next_job()
+
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                if self.pool is not None:
+                    result = self.pool.execute(index, lambda: job.context.run(job.run))
+                else:
+                    result = job.context.run(job.run)
+                job.future.set_result(result)
+            except BaseException as e:
+                job.future.set_exception(e)
+
+    def stats(self) -> Dict:
+        with self.condition:
+            return {
+                priority: {
+                    "queued": sum(len(jobs) for jobs in clients.values()),
+                    "clients": len(clients),
+                    "dispatched": self.dispatched[priority]
+                }
+                for priority, clients in self.queues.items()
+            }
+
+def client_id_for(request) -> str:
+    """Identify the client for fair sharing: X-Client-ID header, else the remote address."""
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "unknown"
@@ -0,0 +1,77 @@
+# api/segment_filter.py
+import re
+from typing import List, Tuple
+
+# Tokens that must survive translation unchanged. Order matters: earlier
+# patterns win where matches overlap (a URL containing digits stays one token).
+PROTECTED_PATTERNS = [
+    r"https?://[^\s<>\"']+",                          # URLs
+    r"www\.[^\s<>\"']+",                              # bare www. URLs
+    r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",                  # e-mail addresses
+    r"\{\{[^{}]*\}\}|\{[^{}\s]*\}|%\([\w]+\)[sd]|%[sd]|\$\{[^{}]*\}",  # {name}, {{var}}, %(x)s, %s, ${x}
+    r"`[^`]+`",                                       # inline code
+    r"\b[A-Z]{1,5}[-_]?\d[\w./-]*",                   # part numbers, IDs (AB-1234, X12.3)
+    r"\d[\d.,:/-]*\d%?|\d%?",                         # numbers, dates, times, percentages
+]
+PROTECTED_RE = re.compile("|".join(f"(?:{pattern})" for pattern in PROTECTED_PATTERNS))
+
+# Restoring tolerates the spacing and case changes the model applies to placeholders
+PLACEHOLDER_RE = re.compile(r"__\s*PH\s*(\d+)\s*__", re.IGNORECASE)
+
+LETTER_RE = re.compile(r"[^\W\d_]")
+# Ideographs, kana and hangul: a single one can be a whole word
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]")
+
+# Shapes of identifiers and code: snake_case, camelCase, calls (not file(s)) or indexing,
+# dotted names (os.path, but not e.g.) and assignments
+CODE_RE = re.compile(r"[A-Za-z0-9]_\w|^_|\b[a-z]+[A-Z]\w*|\w(?:\((?!s\))|\[)|[A-Za-z_]\w+\.[A-Za-z_]\w+|\w=")
+
+def is_translatable(text: str) -> bool:
+    """Whether a segment contains words worth sending to the model.
+
+    Numbers, dates, URLs, e-mail addresses, IDs, placeholders and code-like
+    segments are passed through untouched.
+    """
+    if not text or not text.strip():
+        return False
+
+    # Letters left once protected tokens are removed
+    remainder = PROTECTED_RE.sub(" ", text)
+    letters = LETTER_RE.findall(remainder)
+    if len(letters) < 2 and not CJK_RE.search(remainder):
+        return False
+
+    # Identifiers and code without spaces, e.g. foo_bar(), os.path, camelCase;
+    # plain words with brackets or periods like "(optional)" or "e.g." are text
+    stripped = text.strip()
+    if " " not in stripped and CODE_RE.search(stripped):
+        return False
+
+    return True
+
+def mask(text: str) -> Tuple[str, List[str]]:
+    """Replace protected tokens with numbered placeholders."""
+    tokens: List[str] = []
+
+    def replace(match):
+        tokens.append(match.group(0))
+        return f"__PH{len(tokens) - 1}__"
+
+    return PROTECTED_RE.sub(replace, text), tokens
+
+def unmask(text: str, tokens: List[str]) -> Tuple[str, bool]:
+    """Restore placeholders. Returns the text and whether every token was restored."""
+    if not tokens:
+        return text, True
+
+    restored = set()
+
+    def replace(match):
+        index = int(match.group(1))
+        if index >= len(tokens):
+            return match.group(0)
+        restored.add(index)
+        return tokens[index]
+
+    result = PLACEHOLDER_RE.sub(replace, text)
+    return result, len(restored) == len(tokens)
@@ -0,0 +1,22 @@
+# api/server.py
+import logging
+import os
+import uvicorn
+from . import config
+from .perf_profile import load_profile
+
+logger = logging.getLogger(__name__)
+
+def main():
+    # The worker count comes from the autotuned profile unless overridden.
+    # Thread counts are applied by TranslationModel inside each worker.
+    profile = load_profile(config.PERF_PROFILE_PATH)
+    workers = int(os.environ.get("TRANSLATION_WORKERS") or profile["workers"])
+    host = os.environ.get("TRANSLATION_HOST", "0.0.0.0")
+    port = int(os.environ.get("TRANSLATION_PORT", "8000"))
+
+    logger.info(f"Starting server with {workers} workers on {host}:{port}")
+    uvicorn.run("api.main:app", host=host, port=port, workers=workers)
+
+if __name__ == "__main__":
+    main()
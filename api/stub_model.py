@@ -0,0 +1,66 @@
+# api/stub_model.py
+import time
+from typing import Dict, List, Optional, Tuple
+
+class StubTranslationModel:
+    """Deterministic stand-in for the model registry, for load tests.
+
+    Translations are "[<target_lang>] <text>". Each call sleeps for a fixed
+    latency plus a per-token latency, so the HTTP stack, the document parsers
+    and the scheduler can be measured without the model's cost and variance.
+    """
+
+    device = "stub"
+    translation_memory = None
+
+    def __init__(self, latency_ms: float = 20, token_latency_ms: float = 1, length_ratio: float = 1.0):
+        self.latency = latency_ms / 1000
+        self.token_latency = token_latency_ms / 1000
+        self.ratio = length_ratio
+        self.calls = 0
+
+    def _tokens(self, text: str) -> int:
+        return len(text.split()) + 2
+
+    def count_tokens(self, texts: List[str], source_lang: str, target_lang: str) -> int:
+        return sum(self._tokens(text) for text in texts)
+
+    def length_ratio(self, source_lang: str, target_lang: str) -> float:
+        return self.ratio
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        return True
+
+    def languages(self) -> Optional[List[str]]:
+        return None
+
+    def describe_routes(self) -> List[Dict]:
+        return []
+
+    def memory_report(self) -> Dict:
+        return {"parameter_bytes": 0, "models": {}, "translation_memory_entries": None}
+
+    def _generate(self, texts: List[str], target_lang: str) -> Tuple[List[str], Dict]:
+        start_time = time.time()
+        input_tokens = sum(self._tokens(text) for text in texts)
+        output_tokens = round(input_tokens * self.ratio)
+        time.sleep(self.latency + self.token_latency * (input_tokens + output_tokens))
+        self.calls += 1
+
+        total_time = time.time() - start_time
+        metrics = {
+            "tokens_per_second": round((input_tokens + output_tokens) / total_time, 2),
+            "total_tokens": input_tokens + output_tokens,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "processing_time": round(total_time, 2),
+            "cached": False
+        }
+        return [f"[{target_lang}] {text}" for text in texts], metrics
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> Tuple[str, Dict]:
+        translations, metrics = self._generate([text], target_lang)
+        return translations[0], metrics
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> Tuple[List[str], Dict]:
+        return self._generate(texts, target_lang)
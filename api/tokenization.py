@@ -0,0 +1,113 @@
+# api/tokenization.py
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import torch
+from .resources import mapping_bytes
+
+class TokenizerStage:
+    """Runs tokenization and detokenization on a dedicated thread.
+
+    The model thread submits work and only waits when it needs the result,
+    so encoding the next batch and decoding the previous one overlap with
+    generate(). Token IDs are cached per (segment, source language), so
+    repeated segments are not re-tokenized.
+
+    All tokenizer calls go through the single stage thread, which also keeps
+    the tokenizer's src_lang state consistent between concurrent requests.
+    """
+
+    def __init__(self, tokenizer, set_source_lang: Callable[[str], None], max_input_length: int,
+                 cache_size: int = 50000, length_buckets: Optional[List[int]] = None):
+        self.tokenizer = tokenizer
+        self.set_source_lang = set_source_lang
+        self.max_input_length = max_input_length
+        # Pad to the smallest bucket that fits, instead of the longest input
+        self.length_buckets = sorted(length_buckets) if length_buckets else None
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tokenizer")
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[List[int]]:
+        with self.cache_lock:
+            ids = self.cache.get(key)
+            if ids is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+            return ids
+
+    def _store(self, key: Tuple[str, str], ids: List[int]):
+        with self.cache_lock:
+            self.cache[key] = ids
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _encode_ids(self, texts: List[str], source_lang: str) -> List[List[int]]:
+        result: List[Optional[List[int]]] = [None] * len(texts)
+        missing = []
+        for i, text in enumerate(texts):
+            ids = self._cached((text, source_lang))
+            if ids is None:
+                missing.append(i)
+            else:
+                result[i] = ids
+
+        if missing:
+            with self.cache_lock:
+                self.misses += len(missing)
+            self.set_source_lang(source_lang)
+            encoded = self.tokenizer(
+                [texts[i] for i in missing],
+                truncation=True,
+                max_length=self.max_input_length
+            )
+            for i, ids in zip(missing, encoded['input_ids']):
+                result[i] = ids
+                self._store((texts[i], source_lang), ids)
+        return result
+
+    def _pad(self, ids: List[List[int]]) -> Dict[str, torch.Tensor]:
+        if self.length_buckets:
+            longest = max(len(item) for item in ids)
+            length = next((bucket for bucket in self.length_buckets if bucket >= longest), longest)
+            return self.tokenizer.pad({"input_ids": ids}, padding="max_length", max_length=length, return_tensors="pt")
+        return self.tokenizer.pad({"input_ids": ids}, padding=True, return_tensors="pt")
+
+    def _encode(self, texts: List[str], source_lang: str) -> Dict[str, torch.Tensor]:
+        return self._pad(self._encode_ids(texts, source_lang))
+
+    def submit_encode(self, texts: List[str], source_lang: str) -> Future:
+        """Tokenize and pad texts; the future resolves to input_ids/attention_mask tensors."""
+        return self.executor.submit(self._encode, texts, source_lang)
+
+    def submit_decode(self, generated_tokens: torch.Tensor) -> Future:
+        """Decode generated token IDs; the future resolves to a list of strings."""
+        return self.executor.submit(self.tokenizer.batch_decode, generated_tokens, skip_special_tokens=True)
+
+    def encode(self, texts: List[str], source_lang: str) -> Dict[str, torch.Tensor]:
+        return self.submit_encode(texts, source_lang).result()
+
+    def count_tokens(self, texts: List[str], source_lang: str) -> int:
+        """Untruncated token count, for cost estimates."""
+        def count():
+            self.set_source_lang(source_lang)
+            return sum(len(ids) for ids in self.tokenizer(texts)['input_ids'])
+        return self.executor.submit(count).result()
+
+    def cache_bytes(self) -> int:
+        with self.cache_lock:
+            items = list(self.cache.items())
+        return mapping_bytes(items)
+
+    def stats(self) -> Dict:
+        with self.cache_lock:
+            return {
+                "cached_segments": len(self.cache),
+                "hits": self.hits,
+                "misses": self.misses
+            }
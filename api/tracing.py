@@ -0,0 +1,258 @@
+# api/tracing.py
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "translation-api"
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+class NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+class JsonlExporter:
+    """Appends finished spans to a local file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def shutdown(self):
+        with self.lock:
+            self.file.close()
+
+def otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class OtlpExporter:
+    """Sends spans to an OTLP/HTTP collector as JSON, in batches from a background thread."""
+
+    def __init__(self, endpoint: str, batch_size: int = 512, interval: float = 2.0):
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=10000)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._worker, name="trace-exporter", daemon=True)
+        self.thread.start()
+
+    def export(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            # Never slow requests down for tracing
+            self.dropped += 1
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._send(batch)
+
+    def _send(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [self._otlp_span(span) for span in spans]
+                }]
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            logger.warning(f"Could not export {len(spans)} spans to {self.endpoint}: {str(e)}")
+
+    def _otlp_span(self, span: Span) -> Dict:
+        otlp = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+        }
+        if span.parent_id:
+            otlp["parentSpanId"] = span.parent_id
+        return otlp
+
+    def shutdown(self):
+        self.queue.put(None)
+        self.thread.join(timeout=10)
+
+# Tracing is off until configure() installs an exporter
+_exporter = None
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+def configure(exporter_name: str, file_path: str = "", otlp_endpoint: str = ""):
+    """Install the exporter named by config: "file", "otlp", or "" for no tracing."""
+    global _exporter
+    if exporter_name == "file":
+        _exporter = JsonlExporter(file_path)
+    elif exporter_name == "otlp":
+        _exporter = OtlpExporter(otlp_endpoint)
+    elif exporter_name:
+        raise ValueError(f"Unknown trace exporter '{exporter_name}'. Use 'file' or 'otlp'")
+    if _exporter is not None:
+        logger.info(f"Tracing enabled with the {exporter_name} exporter")
+
+def shutdown():
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+def enabled() -> bool:
+    return _exporter is not None
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+def current_trace_id() -> Optional[str]:
+    return current_span().trace_id
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+    """Time a block as a child of the current span, or as a new trace.
+
+    trace_id and parent_id continue a trace started elsewhere (e.g. from a
+    traceparent header). Without an exporter this costs one global lookup.
+    """
+    if _exporter is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    if parent is not None and trace_id is None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    new_span = Span(name, trace_id or os.urandom(16).hex(), parent_id, attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.error = f"{type(e).__name__}: {str(e)}"
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.end_ns = time.time_ns()
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(new_span)
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent span_id) from a W3C traceparent header, or (None, None)."""
+    if not header:
+        return None, None
+    parts = header.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+class TracingMiddleware:
+    """ASGI middleware timing each HTTP request until the last byte of its response is sent.
+
+    A streamed response body is produced after the endpoint returns, so the
+    span is ended once the application is done sending, not when the
+    response object is created. The trace ID is returned in X-Trace-ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent")
+        # Continue the caller's trace when it sends a W3C traceparent header
+        trace_id, parent_id = parse_traceparent(traceparent.decode("latin-1") if traceparent else None)
+        method, path = scope["method"], scope["path"]
+        with span(
+            f"{method} {path}",
+            trace_id=trace_id,
+            parent_id=parent_id,
+            **{"http.method": method, "http.target": path}
+        ) as request_span:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    request_span.set_attribute("http.status_code", message["status"])
+                    message = dict(message, headers=list(message.get("headers", [])) + [
+                        (b"x-trace-id", request_span.trace_id.encode("latin-1"))
+                    ])
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -0,0 +1,197 @@
+# api/translation_memory.py
+import difflib
+import random
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Placeholders from segment_filter.mask() are single tokens
+TOKEN_RE = re.compile(r"__PH\d+__|\w+|[^\w\s]")
+
+# Candidates scored with difflib per lookup, out of those sharing the most n-grams
+MAX_CANDIDATES = 5
+# N-grams found in more entries than this (e.g. "^ The") say little about similarity
+MAX_POSTINGS = 2000
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text)
+
+def ngrams(tokens: List[str], n: int) -> Set[Tuple[str, ...]]:
+    padded = ["^"] + tokens + ["$"]
+    return {tuple(padded[i:i + n]) for i in range(max(1, len(padded) - n + 1))}
+
+def is_term(token: str) -> bool:
+    """Capitalized words, acronyms and tokens with digits or symbols: likely kept as they are."""
+    return not (token.isalpha() and token.islower())
+
+class MemoryEntry:
+    __slots__ = ("entry_id", "pair", "source", "tokens", "translation", "grams")
+
+    def __init__(self, entry_id: int, pair: Tuple[str, str], source: str, tokens: List[str],
+                 translation: str, grams: Set[Tuple[str, ...]]):
+        self.entry_id = entry_id
+        self.pair = pair
+        self.source = source
+        self.tokens = tokens
+        self.translation = translation
+        self.grams = grams
+
+class MemoryMatch:
+    def __init__(self, translation: str, similarity: float, exact: bool, verify: bool):
+        self.translation = translation
+        self.similarity = similarity
+        self.exact = exact
+        # Sampled for quality checking: the caller translates with the model anyway and reports back
+        self.verify = verify
+
+def substitute(entry: MemoryEntry, tokens: List[str]) -> Optional[str]:
+    """Adapt an entry's translation to a source that differs in a few tokens.
+
+    Only one-for-one token replacements are handled, and only when each
+    replaced source token appears exactly once, unchanged, in the stored
+    translation, and both tokens look like names or codes rather than plain
+    lowercase words (which the model would translate). Anything else returns
+    None and goes to the model.
+    """
+    translation = entry.translation
+    matcher = difflib.SequenceMatcher(a=entry.tokens, b=tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag != "replace" or i2 - i1 != j2 - j1:
+            return None
+        for old, new in zip(entry.tokens[i1:i2], tokens[j1:j2]):
+            if old.startswith("__PH") or new.startswith("__PH") or entry.tokens.count(old) != 1:
+                return None
+            if not (is_term(old) and is_term(new)):
+                return None
+            pattern = re.compile(rf"(?<!\w){re.escape(old)}(?!\w)")
+            if len(pattern.findall(translation)) != 1:
+                return None
+            translation = pattern.sub(lambda _: new, translation)
+    return translation
+
+class TranslationMemory:
+    """Reuses translations of near-identical segments, e.g. differing in a number or a name.
+
+    Entries are stored masked (see segment_filter.mask), so numbers, URLs and
+    IDs are placeholders and segments differing only in those are exact
+    matches. Other near matches are found through an inverted index of token
+    n-grams, scored with difflib, and accepted above the similarity threshold
+    if the differing tokens can be substituted in the stored translation.
+    A small sample of matches is also translated by the model, to measure
+    how often the memory agrees with it.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 100000, verify_rate: float = 0.0, n: int = 2):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.verify_rate = verify_rate
+        self.n = n
+        self.entries: "OrderedDict[int, MemoryEntry]" = OrderedDict()
+        self.exact: Dict[Tuple[Tuple[str, str], str], int] = {}
+        self.index: Dict[Tuple[Tuple[str, str], Tuple[str, ...]], Set[int]] = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.similarity_sum = 0.0
+
+    def add(self, source: str, translation: str, source_lang: str, target_lang: str):
+        """Store a masked source and its masked translation."""
+        pair = (source_lang, target_lang)
+        tokens = tokenize(source)
+        if not tokens:
+            return
+        with self.lock:
+            if (pair, source) in self.exact:
+                return
+            entry = MemoryEntry(self.next_id, pair, source, tokens, translation, ngrams(tokens, self.n))
+            self.next_id += 1
+            self.entries[entry.entry_id] = entry
+            self.exact[(pair, source)] = entry.entry_id
+            for gram in entry.grams:
+                self.index.setdefault((pair, gram), set()).add(entry.entry_id)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries.values())))
+
+    def _remove(self, entry: MemoryEntry):
+        del self.entries[entry.entry_id]
+        del self.exact[(entry.pair, entry.source)]
+        for gram in entry.grams:
+            ids = self.index[(entry.pair, gram)]
+            ids.discard(entry.entry_id)
+            if not ids:
+                del self.index[(entry.pair, gram)]
+
+    def lookup(self, source: str, source_lang: str, target_lang: str) -> Optional[MemoryMatch]:
+        """Find a reusable masked translation for a masked source."""
+        pair = (source_lang, target_lang)
+        tokens = tokenize(source)
+        with self.lock:
+            self.counters["lookups"] += 1
+            entry_id = self.exact.get((pair, source))
+            if entry_id is not None:
+                return self._hit(self.entries[entry_id].translation, 1.0, True)
+
+            # Entries sharing the most n-grams, then the closest by token sequence
+            shared = Counter()
+            for gram in ngrams(tokens, self.n):
+                ids = self.index.get((pair, gram), ())
+                if len(ids) <= MAX_POSTINGS:
+                    shared.update(ids)
+            best, best_similarity = None, 0.0
+            for candidate_id, _ in shared.most_common(MAX_CANDIDATES):
+                candidate = self.entries[candidate_id]
+                similarity = difflib.SequenceMatcher(a=candidate.tokens, b=tokens, autojunk=False).ratio()
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+
+            if best is None or best_similarity < self.threshold:
+                self.counters["misses"] += 1
+                return None
+            translation = substitute(best, tokens)
+            if translation is None:
+                # Similar enough, but the difference is not a safe substitution
+                self.counters["rejected"] += 1
+                return None
+            return self._hit(translation, best_similarity, False)
+
+    def _hit(self, translation: str, similarity: float, exact: bool) -> MemoryMatch:
+        self.counters["exact_hits" if exact else "fuzzy_hits"] += 1
+        self.similarity_sum += similarity
+        verify = self.verify_rate > 0 and random.random() < self.verify_rate
+        return MemoryMatch(translation, similarity, exact, verify)
+
+    def record_verification(self, match: MemoryMatch, model_translation: str):
+        """Compare a sampled match with the model's translation of the same segment."""
+        with self.lock:
+            kind = "exact" if match.exact else "fuzzy"
+            self.counters[f"{kind}_verified"] += 1
+            if match.translation.strip() == model_translation.strip():
+                self.counters[f"{kind}_agreed"] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counters = self.counters
+            hits = counters["exact_hits"] + counters["fuzzy_hits"]
+            return {
+                "entries": len(self.entries),
+                "threshold": self.threshold,
+                "lookups": counters["lookups"],
+                "exact_hits": counters["exact_hits"],
+                "fuzzy_hits": counters["fuzzy_hits"],
+                "rejected": counters["rejected"],
+                "misses": counters["misses"],
+                "hit_rate": round(hits / counters["lookups"], 4) if counters["lookups"] else 0,
+                "mean_similarity": round(self.similarity_sum / hits, 4) if hits else 0,
+                "quality": {
+                    kind: {
+                        "verified": counters[f"{kind}_verified"],
+                        "agreed": counters[f"{kind}_agreed"],
+                        "agreement": round(counters[f"{kind}_agreed"] / counters[f"{kind}_verified"], 4)
+                        if counters[f"{kind}_verified"] else None
+                    }
+                    for kind in ("exact", "fuzzy")
+                }
+            }
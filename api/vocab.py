@@ -0,0 +1,47 @@
+# api/vocab.py
+import json
+import logging
+import os
+from typing import List, Optional
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Written next to a pruned model by scripts/prune_vocab.py
+VOCAB_MAP_FILE = "vocab_map.json"
+
+class VocabRemap:
+    """Maps tokenizer IDs to the rows of a pruned model vocabulary and back.
+
+    The tokenizer is kept unchanged, so it keeps producing the original IDs.
+    Inputs are mapped into the pruned vocabulary before they reach the model,
+    and generated IDs are mapped back before decoding. Tokens that were pruned
+    become <unk>.
+    """
+
+    def __init__(self, kept_ids: List[int], languages: List[str], original_vocab_size: int, unk_token_id: int):
+        self.languages = languages
+        self.to_original = torch.tensor(kept_ids, dtype=torch.long)
+        unk = kept_ids.index(unk_token_id)
+        self.to_pruned = torch.full((original_vocab_size,), unk, dtype=torch.long)
+        self.to_pruned[self.to_original] = torch.arange(len(kept_ids), dtype=torch.long)
+
+    @classmethod
+    def from_dir(cls, path: str) -> Optional["VocabRemap"]:
+        """Load the map of a pruned model directory, or None for a full model."""
+        map_path = os.path.join(path, VOCAB_MAP_FILE)
+        if not os.path.exists(map_path):
+            return None
+        with open(map_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        logger.info(f"Model vocabulary pruned to {len(data['kept_ids'])} tokens for {', '.join(data['languages'])}")
+        return cls(data["kept_ids"], data["languages"], data["original_vocab_size"], data["unk_token_id"])
+
+    def to_model(self, ids: torch.Tensor) -> torch.Tensor:
+        return self.to_pruned[ids]
+
+    def to_tokenizer(self, ids: torch.Tensor) -> torch.Tensor:
+        return self.to_original[ids]
+
+    def token_id(self, original_id: int) -> int:
+        return int(self.to_pruned[original_id])
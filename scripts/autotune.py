@@ -0,0 +1,203 @@
+"""Sweep CPU execution settings on this machine and write a performance profile.
+
+Run from the repository root:
+
+    python -m scripts.autotune --workload samples.txt --source-lang en --target-lang de
+
+The profile (api/models/perf_profile.json by default) is applied by
+TranslationModel and api.server at startup.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import platform
+import time
+from typing import Dict, List
+
+from api import config
+from api.decoding import DecodingPolicy
+from api.perf_profile import load_profile, save_profile
+
+# Used when no workload file is given: a mix of labels, sentences and paragraphs
+SAMPLE_WORKLOAD = [
+    "Total",
+    "Save changes",
+    "Quarterly revenue",
+    "Please review the attached document before the meeting.",
+    "The system will be unavailable on Saturday due to scheduled maintenance.",
+    "Click the button below to confirm your e-mail address.",
+    "Our team has analysed the results of the last quarter and prepared a summary of the most important findings.",
+    "If you have any questions about this process, please contact your local representative, "
+    "who will be happy to help you with the next steps and provide additional documentation.",
+    "Product overview",
+    "Delivery date",
+    "The new version improves performance and fixes several issues reported by customers.",
+    "All employees are required to complete the security training by the end of the month.",
+]
+
+def load_workload(path: str) -> List[str]:
+    if not path:
+        return SAMPLE_WORKLOAD
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def run_trial(model_path: str, intra_op_threads: int, inter_op_threads: int, batch_sizes: List[int],
+              beam_counts: List[int], texts: List[str], source_lang: str, target_lang: str,
+              repeats: int, barrier=None) -> List[Dict]:
+    """Measure throughput for every batch size and beam count with fixed thread counts.
+
+    Runs in a fresh process, since torch's inter-op thread count can only be set once.
+    """
+    from api.model import TranslationModel
+
+    model = TranslationModel(model_path, perf_profile={
+        "intra_op_threads": intra_op_threads,
+        "inter_op_threads": inter_op_threads,
+        "batch_size": batch_sizes[0],
+        "num_beams": beam_counts[0],
+        "workers": 1
+    })
+
+    # Warm up once so one-time allocation costs are not measured
+    model.translate_batch(texts[:2], source_lang, target_lang)
+
+    if barrier is not None:
+        # Concurrent worker trials start measuring at the same moment
+        barrier.wait()
+
+    results = []
+    for batch_size, num_beams in itertools.product(batch_sizes, beam_counts):
+        model.batch_size = batch_size
+        model.decoding_policy.num_beams = num_beams
+        segments = 0
+        tokens = 0
+        start = time.time()
+        for _ in range(repeats):
+            # Measure the model, not the cache
+            model.cache.clear()
+            _, metrics = model.translate_batch(texts, source_lang, target_lang)
+            segments += len(texts)
+            tokens += metrics.get("total_tokens", 0)
+        elapsed = time.time() - start
+        results.append({
+            "intra_op_threads": intra_op_threads,
+            "inter_op_threads": inter_op_threads,
+            "batch_size": batch_size,
+            "num_beams": num_beams,
+            "segments_per_second": round(segments / elapsed, 2),
+            "tokens_per_second": round(tokens / elapsed, 2)
+        })
+    return results
+
+def sweep_process_settings(args, texts: List[str]) -> List[Dict]:
+    """Sweep threads, batch size and beams for a single process."""
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for intra, inter in itertools.product(args.intra_op_threads, args.inter_op_threads):
+        print(f"Measuring intra_op_threads={intra}, inter_op_threads={inter}...")
+        with ctx.Pool(1) as pool:
+            trial = pool.apply(run_trial, (
+                args.model_path, intra, inter, args.batch_sizes, args.num_beams,
+                texts, args.source_lang, args.target_lang, args.repeats
+            ))
+        for result in trial:
+            print(f"  batch_size={result['batch_size']:<3} num_beams={result['num_beams']} "
+                  f"{result['segments_per_second']:>8} segments/s")
+        results.extend(trial)
+    return results
+
+def sweep_workers(args, texts: List[str], best: Dict) -> List[Dict]:
+    """Measure aggregate throughput of N concurrent processes using the best per-process settings."""
+    ctx = multiprocessing.get_context("spawn")
+    cores = os.cpu_count() or 1
+    candidates = [w for w in args.workers if w * best["intra_op_threads"] <= cores] or [1]
+
+    results = []
+    for workers in candidates:
+        print(f"Measuring workers={workers}...")
+        with ctx.Manager() as manager:
+            barrier = manager.Barrier(workers)
+            with ctx.Pool(workers) as pool:
+                start = time.time()
+                trials = [
+                    pool.apply_async(run_trial, (
+                        args.model_path, best["intra_op_threads"], best["inter_op_threads"],
+                        [best["batch_size"]], [best["num_beams"]],
+                        texts, args.source_lang, args.target_lang, args.repeats, barrier
+                    ))
+                    for _ in range(workers)
+                ]
+                trial_results = [trial.get()[0] for trial in trials]
+                elapsed = time.time() - start
+        total = sum(result["segments_per_second"] for result in trial_results)
+        results.append({"workers": workers, "segments_per_second": round(total, 2)})
+        print(f"  {round(total, 2):>8} segments/s in total ({elapsed:.1f}s including model loading)")
+    return results
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+def main():
+    cores = os.cpu_count() or 1
+    default_threads = sorted({t for t in (1, 2, 4, 8, 16, cores) if t <= cores})
+
+    parser = argparse.ArgumentParser(description="Autotune CPU execution settings for the translation model")
+    parser.add_argument("--model-path", default=config.MODEL_PATH)
+    parser.add_argument("--output", default=config.PERF_PROFILE_PATH)
+    parser.add_argument("--workload", help="Text file with one sample segment per line")
+    parser.add_argument("--source-lang", default="en")
+    parser.add_argument("--target-lang", default="de")
+    parser.add_argument("--intra-op-threads", type=parse_int_list, default=default_threads)
+    parser.add_argument("--inter-op-threads", type=parse_int_list, default=[1, 2])
+    parser.add_argument("--batch-sizes", type=parse_int_list, default=[1, 8, 16, 32])
+    # Fewer beams is always faster but changes translation quality, so beams are
+    # only swept when asked for
+    parser.add_argument("--num-beams", type=parse_int_list,
+                        help="Beam counts to sweep (default: keep the configured one)")
+    parser.add_argument("--workers", type=parse_int_list, default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    # The beam count in use: the decoding policy file overrides the profile
+    current_beams = DecodingPolicy.from_file(
+        config.DECODING_POLICY_PATH, num_beams=load_profile(config.PERF_PROFILE_PATH)["num_beams"]
+    ).num_beams
+    if args.num_beams is None:
+        args.num_beams = [current_beams]
+
+    texts = load_workload(args.workload)
+    print(f"Autotuning on {cores} cores with {len(texts)} sample segments")
+
+    process_results = sweep_process_settings(args, texts)
+    best = max(process_results, key=lambda r: r["segments_per_second"])
+    print(f"\nBest single-process settings: {best}")
+    if best["num_beams"] < current_beams:
+        print(f"WARNING: num_beams={best['num_beams']} is fewer beams than the {current_beams} in use. "
+              f"It is faster, but translation quality may drop; check it before deploying this profile.")
+
+    worker_results = sweep_workers(args, texts, best)
+    best_workers = max(worker_results, key=lambda r: r["segments_per_second"])
+    print(f"\nBest worker count: {best_workers}")
+
+    profile = {
+        "intra_op_threads": best["intra_op_threads"],
+        "inter_op_threads": best["inter_op_threads"],
+        "batch_size": best["batch_size"],
+        "num_beams": best["num_beams"],
+        "workers": best_workers["workers"],
+        "measured": {
+            "machine": platform.machine(),
+            "cpu_count": cores,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source_lang": args.source_lang,
+            "target_lang": args.target_lang,
+            "process_sweep": process_results,
+            "worker_sweep": worker_results
+        }
+    }
+    save_profile(profile, args.output)
+    print(f"\nProfile saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Translate documents and JSONL corpora offline, without going through the HTTP API.
+
+Run from the repository root:
+
+    python -m scripts.batch_translate docs/ --source-lang en --target-lang de --workers 4 --threads 2
+    python -m scripts.batch_translate corpus.jsonl --source-lang en --target-lang de
+
+Documents are written next to their input as <name>_translated_<lang>.<ext>, JSONL
+files as <name>.<lang>.jsonl (or below --output-dir, keeping the relative layout).
+JSONL records use the same format as /api/translate/stream/.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from api.document_translator import BATCH_MAX_CHARS, SUPPORTED_EXTENSIONS, translated_filename
+
+# Set in each worker process by init_worker
+worker_model = None
+worker_doc_translator = None
+
+def init_worker(threads: int, batch_size: Optional[int]):
+    """Load the model once per worker process with a fixed torch thread count."""
+    global worker_model, worker_doc_translator
+    from api.document_translator import DocumentTranslator
+    from api.model_registry import load_configured_registry
+    from api.perf_profile import load_profile
+    from api import config
+
+    profile = load_profile(config.PERF_PROFILE_PATH)
+    profile["intra_op_threads"] = threads
+    profile["inter_op_threads"] = 1
+    if batch_size:
+        profile["batch_size"] = batch_size
+
+    worker_model = load_configured_registry(profile)
+    worker_doc_translator = DocumentTranslator(worker_model, checkpoint_dir=config.CHECKPOINT_DIR or None,
+                                               ooxml_fast_path=config.OOXML_FAST_PATH)
+
+def translate_document_task(input_path: str, output_path: str, source_lang: str, target_lang: str) -> Dict:
+    with open(input_path, 'rb') as f:
+        content = f.read()
+
+    try:
+        translated_content, metrics = asyncio.run(worker_doc_translator.translate_file(
+            content, input_path, source_lang, target_lang,
+            lambda progress, message: None
+        ))
+    except Exception as e:
+        return {"path": input_path, "error": str(e)}
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(translated_content)
+
+    return {
+        "path": input_path,
+        "records": 0,
+        "input_tokens": metrics.get("input_tokens", 0),
+        "output_tokens": metrics.get("output_tokens", 0)
+    }
+
+def translate_records_task(lines: List[str], source_lang: str, target_lang: str) -> Tuple[List[str], Dict]:
+    """Translate a chunk of JSONL lines, returning output lines in the same order."""
+    results: List[Optional[dict]] = [None] * len(lines)
+    groups: Dict[Tuple[str, str], List[Tuple[int, dict]]] = {}
+
+    for i, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+                raise ValueError("Record needs a string 'text' field")
+        except ValueError as e:
+            results[i] = {"error": str(e), "line": line}
+            continue
+        pair = (record.get("source_lang") or source_lang, record.get("target_lang") or target_lang)
+        groups.setdefault(pair, []).append((i, record))
+
+    input_tokens = 0
+    output_tokens = 0
+    for (src, tgt), records in groups.items():
+        # Batched inputs are truncated to the model's input length; long and
+        # multi-line records are split into chunks by translate()
+        short_records = [(i, r) for i, r in records if len(r["text"]) <= BATCH_MAX_CHARS and "\n" not in r["text"]]
+        long_records = [(i, r) for i, r in records if len(r["text"]) > BATCH_MAX_CHARS or "\n" in r["text"]]
+        if short_records:
+            try:
+                translations, metrics = worker_model.translate_batch([r["text"] for _, r in short_records], src, tgt)
+                input_tokens += metrics.get("input_tokens", 0)
+                output_tokens += metrics.get("output_tokens", 0)
+                for (i, record), translation in zip(short_records, translations):
+                    results[i] = {**record, "translation": translation}
+            except Exception as e:
+                for i, record in short_records:
+                    results[i] = {**record, "error": str(e)}
+        for i, record in long_records:
+            try:
+                translation, metrics = worker_model.translate(record["text"], src, tgt)
+                input_tokens += metrics.get("input_tokens", 0)
+                output_tokens += metrics.get("output_tokens", 0)
+                results[i] = {**record, "translation": translation}
+            except Exception as e:
+                results[i] = {**record, "error": str(e)}
+
+    output = [json.dumps(result, ensure_ascii=False) for result in results]
+    return output, {"records": len(lines), "input_tokens": input_tokens, "output_tokens": output_tokens}
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[List[str]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        chunk = []
+        for line in f:
+            if line.strip():
+                chunk.append(line.rstrip("\n"))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def find_inputs(root: str, target_lang: str) -> Tuple[List[str], List[str]]:
+    """Split the input (file or directory) into documents and JSONL files."""
+    paths = []
+    if os.path.isdir(root):
+        for dirpath, _, filenames in os.walk(root):
+            for name in sorted(filenames):
+                paths.append(os.path.join(dirpath, name))
+    else:
+        paths.append(root)
+
+    documents = []
+    corpora = []
+    for path in paths:
+        name = os.path.basename(path).lower()
+        # Skip our own output from earlier runs
+        if "_translated_" in name or name.endswith(f".{target_lang.lower()}.jsonl"):
+            continue
+        if name.endswith(".jsonl"):
+            corpora.append(path)
+        elif name.endswith(SUPPORTED_EXTENSIONS):
+            documents.append(path)
+    return documents, corpora
+
+def output_path_for(path: str, root: str, output_dir: Optional[str], filename: str) -> str:
+    if output_dir:
+        base = root if os.path.isdir(root) else os.path.dirname(root)
+        relative_dir = os.path.relpath(os.path.dirname(path), base)
+        return os.path.normpath(os.path.join(output_dir, relative_dir, filename))
+    return os.path.join(os.path.dirname(path), filename)
+
+def add_stats(totals: Dict, stats: Dict):
+    for key in ("records", "input_tokens", "output_tokens"):
+        totals[key] += stats.get(key, 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Translate documents and JSONL corpora offline")
+    parser.add_argument("input", help="Directory, document or .jsonl file")
+    parser.add_argument("--source-lang", required=True)
+    parser.add_argument("--target-lang", required=True)
+    parser.add_argument("--output-dir", help="Write outputs here instead of next to the inputs")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Number of worker processes, each with its own model")
+    parser.add_argument("--threads", type=int, default=2, help="Torch intra-op threads per worker")
+    parser.add_argument("--batch-size", type=int, help="Texts per generate call (default: from profile)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="JSONL records per worker task")
+    args = parser.parse_args()
+
+    documents, corpora = find_inputs(args.input, args.target_lang)
+    if not documents and not corpora:
+        print(f"No supported inputs found in {args.input}")
+        return
+
+    print(f"Translating {len(documents)} documents and {len(corpora)} JSONL files "
+          f"with {args.workers} workers x {args.threads} threads")
+
+    totals = {"files": 0, "errors": 0, "records": 0, "input_tokens": 0, "output_tokens": 0}
+    ctx = multiprocessing.get_context("spawn")
+    start = time.time()
+
+    with ctx.Pool(args.workers, initializer=init_worker, initargs=(args.threads, args.batch_size)) as pool:
+        # Documents are independent, one task each
+        document_tasks = []
+        for path in documents:
+            output_path = output_path_for(path, args.input, args.output_dir,
+                                          translated_filename(os.path.basename(path), args.target_lang))
+            document_tasks.append(pool.apply_async(
+                translate_document_task, (path, output_path, args.source_lang, args.target_lang)
+            ))
+
+        # JSONL files are split into chunks. Only a bounded number of chunks is
+        # in flight, and results are written in input order.
+        for path in corpora:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            output_path = output_path_for(path, args.input, args.output_dir, f"{stem}.{args.target_lang}.jsonl")
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+            pending = deque()
+            with open(output_path, 'w', encoding='utf-8') as out:
+                for chunk in read_chunks(path, args.chunk_size):
+                    pending.append(pool.apply_async(
+                        translate_records_task, (chunk, args.source_lang, args.target_lang)
+                    ))
+                    if len(pending) >= args.workers * 2:
+                        lines, stats = pending.popleft().get()
+                        out.write("\n".join(lines) + "\n")
+                        add_stats(totals, stats)
+                while pending:
+                    lines, stats = pending.popleft().get()
+                    out.write("\n".join(lines) + "\n")
+                    add_stats(totals, stats)
+            totals["files"] += 1
+            print(f"✓ {path} -> {output_path}")
+
+        for task in document_tasks:
+            result = task.get()
+            if "error" in result:
+                totals["errors"] += 1
+                print(f"✗ {result['path']}: {result['error']}")
+            else:
+                totals["files"] += 1
+                add_stats(totals, result)
+                print(f"✓ {result['path']}")
+
+    elapsed = time.time() - start
+    total_tokens = totals["input_tokens"] + totals["output_tokens"]
+    print("\nSummary")
+    print(f"  Files translated: {totals['files']} ({totals['errors']} failed)")
+    print(f"  JSONL records:    {totals['records']}")
+    print(f"  Tokens:           {total_tokens} ({totals['input_tokens']} in, {totals['output_tokens']} out)")
+    print(f"  Elapsed:          {elapsed:.1f}s (including model loading)")
+    if elapsed > 0:
+        print(f"  Throughput:       {total_tokens / elapsed:.1f} tokens/s, {totals['records'] / elapsed:.1f} records/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import shutil
+import time
+from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
+
+def build_snapshot(model_path="api/models/m2m100", snapshot_path="api/models/m2m100-snapshot"):
+    """Re-serialize the local model as a memory-mappable safetensors snapshot"""
+    print(f"Building snapshot of {model_path}...")
+
+    if os.path.exists(snapshot_path):
+        print(f"Removing existing snapshot directory: {snapshot_path}")
+        shutil.rmtree(snapshot_path)
+
+    try:
+        tokenizer = M2M100Tokenizer.from_pretrained(model_path)
+        model = M2M100ForConditionalGeneration.from_pretrained(model_path)
+        model.eval()
+
+        tokenizer.save_pretrained(snapshot_path)
+        model.save_pretrained(snapshot_path, safe_serialization=True)
+        print("✓ Snapshot saved successfully!")
+
+        # Verify the snapshot and report the load time it gives us
+        print("\nVerifying snapshot...")
+        start = time.time()
+        M2M100ForConditionalGeneration.from_pretrained(
+            snapshot_path,
+            use_safetensors=True,
+            low_cpu_mem_usage=True
+        )
+        print(f"✓ Snapshot loads in {time.time() - start:.2f}s")
+
+        print(f"\nSnapshot saved to: {snapshot_path}")
+        return True
+
+    except Exception as e:
+        print(f"\nError occurred while building snapshot: {str(e)}")
+        if os.path.exists(snapshot_path):
+            print(f"Cleaning up {snapshot_path}")
+            shutil.rmtree(snapshot_path)
+        return False
+
+if __name__ == "__main__":
+    success = build_snapshot()
+    if not success:
+        print("\nSnapshot build failed.")
+    else:
+        print("\nSnapshot build completed successfully!")
@@ -0,0 +1,313 @@
+"""Load-test the HTTP API end to end.
+
+Run from the repository root:
+
+    python -m scripts.loadtest --rates 5,10,20,40 --duration 30
+    python -m scripts.loadtest --mix translate=1 --rates 50,100,200 --stub-latency-ms 5
+    python -m scripts.loadtest --url http://localhost:8000 --rates 2,4   # an already running server
+
+Unless --url is given, the app from api/main.py is started with uvicorn on a local
+port. By default it serves with the deterministic stub model (TRANSLATION_STUB_MODEL),
+so the results show the cost of FastAPI/uvicorn, the document parsers and the
+scheduler alone; --real-model loads the configured models instead.
+
+Requests arrive at each offered rate (Poisson arrivals) for --duration seconds, with
+the operation picked by --mix. A document request uploads a text document, then
+follows the progress WebSocket and downloads the result. Each step reports latency
+percentiles and error rates per operation, and the first step where the server
+falls behind the offered rate, errors or exceeds --max-inflight is reported as the
+saturation point.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+
+SCENARIOS = ("translate", "batch", "document")
+
+WORDS = ("the quick brown fox jumps over the lazy dog while the translation server keeps "
+         "serving requests from many clients at the same time with documents tables and "
+         "slides of every size").split()
+
+def sample_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def http_request(base_url: str, method: str, path: str, body: Optional[bytes] = None,
+                 headers: Optional[Dict] = None, timeout: float = 300) -> Tuple[int, bytes]:
+    url = urllib.parse.urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+def multipart_body(fields: Dict[str, str], filename: str, content: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+class LoadTest:
+    def __init__(self, args, executor: ThreadPoolExecutor):
+        self.args = args
+        self.base_url = args.url.rstrip("/")
+        self.executor = executor
+        self.rng = random.Random(args.seed)
+        # (operation, status, latency in seconds); status 0 is a client-side error
+        self.results: List[Tuple[str, int, float]] = []
+
+    async def call(self, operation: str, method: str, path: str, body: Optional[bytes] = None,
+                   headers: Optional[Dict] = None) -> Tuple[int, bytes]:
+        loop = asyncio.get_event_loop()
+        start = time.perf_counter()
+        try:
+            status, payload = await loop.run_in_executor(
+                self.executor, http_request, self.base_url, method, path, body, headers
+            )
+        except Exception as e:
+            status, payload = 0, str(e).encode()
+        self.results.append((operation, status, time.perf_counter() - start))
+        return status, payload
+
+    def json_headers(self, client_id: str) -> Dict:
+        return {"Content-Type": "application/json", "X-Client-ID": client_id}
+
+    async def run_translate(self, client_id: str):
+        body = {"text": sample_text(self.rng, self.args.words), "source_lang": "en", "target_lang": "de"}
+        await self.call("translate", "POST", "/api/translate/", json.dumps(body).encode(), self.json_headers(client_id))
+
+    async def run_batch(self, client_id: str):
+        body = {
+            "texts": [sample_text(self.rng, self.args.words) for _ in range(self.args.batch_texts)],
+            "source_lang": "en",
+            "target_lang": "de"
+        }
+        await self.call("batch", "POST", "/api/translate/batch/", json.dumps(body).encode(), self.json_headers(client_id))
+
+    async def run_document(self, client_id: str):
+        lines = [sample_text(self.rng, self.args.words) for _ in range(self.args.document_lines)]
+        body, content_type = multipart_body(
+            {"source_lang": "en", "target_lang": "de"}, "loadtest.txt", "\n".join(lines).encode()
+        )
+        status, payload = await self.call(
+            "document", "POST", "/api/translate/document/", body,
+            {"Content-Type": content_type, "X-Client-ID": client_id}
+        )
+        if status != 200:
+            return
+        result = json.loads(payload)
+        await self.follow_progress(result["task_id"])
+        await self.call("download", "GET", result["download_url"])
+
+    async def follow_progress(self, task_id: str):
+        ws_url = self.base_url.replace("http://", "ws://", 1) + f"/ws/translation-progress/{task_id}"
+        start = time.perf_counter()
+        status = 0
+        try:
+            async with websockets.connect(ws_url) as ws:
+                while True:
+                    message = json.loads(await asyncio.wait_for(ws.recv(), timeout=60))
+                    if message.get("status") in ("completed", "error"):
+                        status = 200 if message["status"] == "completed" else 500
+                        break
+        except Exception:
+            status = 0
+        self.results.append(("websocket", status, time.perf_counter() - start))
+
+    async def run_step(self, rate: float, mix: Dict[str, float]) -> Dict:
+        """Offer requests at `rate` per second for the configured duration."""
+        self.results = []
+        runners = {"translate": self.run_translate, "batch": self.run_batch, "document": self.run_document}
+        operations = list(mix)
+        weights = [mix[operation] for operation in operations]
+        inflight = set()
+        dropped = 0
+        offered = 0
+
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival - start < self.args.duration:
+            await asyncio.sleep(max(0, next_arrival - time.perf_counter()))
+            offered += 1
+            if len(inflight) >= self.args.max_inflight:
+                dropped += 1
+            else:
+                operation = self.rng.choices(operations, weights)[0]
+                client_id = f"loadtest-{self.rng.randrange(self.args.clients)}"
+                task = asyncio.ensure_future(runners[operation](client_id))
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+            next_arrival += self.rng.expovariate(rate)
+
+        if inflight:
+            await asyncio.wait(inflight, timeout=self.args.drain_timeout)
+        elapsed = time.perf_counter() - start
+        return summarize(rate, offered, dropped, elapsed, self.results)
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(rate: float, offered: int, dropped: int, elapsed: float, results: List[Tuple[str, int, float]]) -> Dict:
+    operations = {}
+    for operation in sorted({operation for operation, _, _ in results}):
+        entries = [(status, latency) for op, status, latency in results if op == operation]
+        latencies = sorted(latency for _, latency in entries)
+        errors = {}
+        for status, _ in entries:
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        operations[operation] = {
+            "count": len(entries),
+            "error_rate": round(sum(errors.values()) / len(entries), 4),
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p90_ms": round(percentile(latencies, 90) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1)
+        }
+
+    # Requests are what arrived; downloads and WebSocket follow-ups belong to documents
+    requests = [entry for entry in results if entry[0] in SCENARIOS]
+    completed = [entry for entry in requests if entry[1] == 200]
+    return {
+        "offered_rate": rate,
+        "offered": offered,
+        "dropped": dropped,
+        "completed_rate": round(len(completed) / elapsed, 2) if elapsed > 0 else 0,
+        "error_rate": round(1 - len(completed) / len(requests), 4) if requests else 0,
+        "operations": operations
+    }
+
+def is_saturated(step: Dict, max_error_rate: float) -> bool:
+    return (
+        step["dropped"] > 0
+        or step["error_rate"] > max_error_rate
+        or step["completed_rate"] < 0.9 * step["offered_rate"]
+    )
+
+def print_step(step: Dict):
+    print(f"\nOffered {step['offered_rate']}/s: {step['offered']} requests, {step['dropped']} dropped, "
+          f"{step['completed_rate']}/s completed, {step['error_rate'] * 100:.1f}% errors")
+    print(f"  {'operation':<10} {'count':>6} {'errors':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for operation, stats in step["operations"].items():
+        print(f"  {operation:<10} {stats['count']:>6} {stats['error_rate'] * 100:>6.1f}% {stats['p50_ms']:>9} "
+              f"{stats['p90_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+        if stats["errors"]:
+            print(f"  {'':<10} status codes: {stats['errors']}")
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        operation, _, weight = item.partition("=")
+        if operation not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{operation}', expected one of {', '.join(SCENARIOS)}")
+        mix[operation] = float(weight or 1)
+    return mix
+
+def start_server(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    if not args.real_model:
+        env["TRANSLATION_STUB_MODEL"] = "1"
+        env["TRANSLATION_STUB_LATENCY_MS"] = str(args.stub_latency_ms)
+        env["TRANSLATION_STUB_TOKEN_LATENCY_MS"] = str(args.stub_token_latency_ms)
+    print(f"Starting server on port {args.port} (log: {args.server_log})")
+    with open(args.server_log, "w") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+
+def wait_until_ready(base_url: str, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, _ = http_request(base_url, "GET", "/api/status/ready/", timeout=5)
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the translation API")
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the started server")
+    parser.add_argument("--real-model", action="store_true", help="Serve with the configured models, not the stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=20, help="Stub latency per model call")
+    parser.add_argument("--stub-token-latency-ms", type=float, default=1, help="Stub latency per token")
+    parser.add_argument("--server-log", default="loadtest_server.log")
+    parser.add_argument("--rates", default="5,10,20,40", help="Comma-separated offered request rates per second")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per rate step")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("translate=6,batch=3,document=1"),
+                        help="Operation weights, e.g. translate=6,batch=3,document=1")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Client-side concurrency limit")
+    parser.add_argument("--clients", type=int, default=16, help="Distinct X-Client-ID values")
+    parser.add_argument("--words", type=int, default=12, help="Words per text")
+    parser.add_argument("--batch-texts", type=int, default=16, help="Texts per batch request")
+    parser.add_argument("--document-lines", type=int, default=50, help="Lines per uploaded document")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Wait for in-flight requests after a step")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate counted as saturation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        args.url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args)
+
+    try:
+        wait_until_ready(args.url, timeout=600 if args.real_model else 60)
+        rates = [float(rate) for rate in args.rates.split(",")]
+        executor = ThreadPoolExecutor(max_workers=args.max_inflight)
+        test = LoadTest(args, executor)
+
+        steps = []
+        saturation = None
+        for rate in rates:
+            step = asyncio.run(test.run_step(rate, args.mix))
+            steps.append(step)
+            print_step(step)
+            if saturation is None and is_saturated(step, args.max_error_rate):
+                saturation = rate
+        executor.shutdown(wait=False)
+
+        print()
+        if saturation is None:
+            print(f"No saturation up to {rates[-1]} requests/s")
+        else:
+            print(f"Saturated at {saturation} requests/s")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"mix": args.mix, "saturation_rate": saturation, "steps": steps}, f, indent=2)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Build an M2M100 model whose vocabulary only covers the languages we serve.
+
+Run from the repository root:
+
+    python -m scripts.prune_vocab --languages en,de,fr,es
+    python -m scripts.prune_vocab --languages en,ja --corpus samples/ja.txt
+
+A token is kept when all of its letters belong to the scripts of the selected
+languages (digits and punctuation are always kept), or when it occurs in one of
+the --corpus files. The embeddings and the (tied) output projection are cut
+down to the kept rows, and vocab_map.json records the original ID of each row
+so TranslationModel can map between the tokenizer and the pruned model.
+
+The output is a safetensors snapshot; point TRANSLATION_MODEL_SNAPSHOT at it.
+"""
+import argparse
+import json
+import os
+import shutil
+import unicodedata
+from typing import Iterable, List, Set
+
+import torch
+from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
+
+from api.vocab import VOCAB_MAP_FILE
+
+# Unicode scripts (as named in unicodedata) of languages not written in Latin script
+LANGUAGE_SCRIPTS = {
+    "am": ["ETHIOPIC"],
+    "ar": ["ARABIC"], "fa": ["ARABIC"], "ps": ["ARABIC"], "sd": ["ARABIC"], "ur": ["ARABIC"],
+    "ba": ["CYRILLIC"], "be": ["CYRILLIC"], "bg": ["CYRILLIC"], "kk": ["CYRILLIC"], "mk": ["CYRILLIC"],
+    "mn": ["CYRILLIC"], "ru": ["CYRILLIC"], "uk": ["CYRILLIC"], "sr": ["CYRILLIC", "LATIN"],
+    "bn": ["BENGALI"],
+    "el": ["GREEK"],
+    "gu": ["GUJARATI"],
+    "he": ["HEBREW"], "yi": ["HEBREW"],
+    "hi": ["DEVANAGARI"], "mr": ["DEVANAGARI"], "ne": ["DEVANAGARI"],
+    "hy": ["ARMENIAN"],
+    "ja": ["CJK", "HIRAGANA", "KATAKANA"],
+    "ka": ["GEORGIAN"],
+    "km": ["KHMER"],
+    "kn": ["KANNADA"],
+    "ko": ["HANGUL", "CJK"],
+    "lo": ["LAO"],
+    "ml": ["MALAYALAM"],
+    "my": ["MYANMAR"],
+    "or": ["ORIYA"],
+    "pa": ["GURMUKHI"],
+    "si": ["SINHALA"],
+    "ta": ["TAMIL"],
+    "th": ["THAI"],
+    "zh": ["CJK"],
+}
+
+def scripts_for(languages: Iterable[str]) -> Set[str]:
+    scripts = set()
+    for lang in languages:
+        scripts.update(LANGUAGE_SCRIPTS.get(lang, ["LATIN"]))
+    return scripts
+
+def in_scripts(piece: str, scripts: Set[str]) -> bool:
+    """True when every letter of the piece is written in one of the scripts."""
+    for char in piece.replace("▁", ""):
+        if not unicodedata.category(char).startswith("L"):
+            continue
+        name_words = unicodedata.name(char, "").split()
+        if not any(script in name_words for script in scripts):
+            return False
+    return True
+
+def select_tokens(tokenizer: M2M100Tokenizer, languages: List[str], corpus_paths: List[str]) -> List[int]:
+    lang_ids = set(tokenizer.lang_code_to_id.values())
+    kept = {tokenizer.bos_token_id, tokenizer.pad_token_id, tokenizer.eos_token_id, tokenizer.unk_token_id}
+    kept.update(tokenizer.get_lang_id(lang) for lang in languages)
+
+    scripts = scripts_for(languages)
+    for piece, token_id in tokenizer.get_vocab().items():
+        if token_id not in lang_ids and in_scripts(piece, scripts):
+            kept.add(token_id)
+
+    for path in corpus_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    kept.update(tokenizer(line.strip(), add_special_tokens=False)["input_ids"])
+
+    # Sorted, so the special tokens at the start of the vocabulary keep their IDs
+    return sorted(kept)
+
+def prune_model(model: M2M100ForConditionalGeneration, kept_ids: List[int]):
+    """Cut the shared embeddings and the tied output projection down to kept_ids."""
+    old_embeddings = model.get_input_embeddings()
+    index = torch.tensor(kept_ids, dtype=torch.long)
+
+    new_embeddings = torch.nn.Embedding(len(kept_ids), old_embeddings.embedding_dim,
+                                        padding_idx=model.config.pad_token_id)
+    new_embeddings.weight.data = old_embeddings.weight.data[index].clone()
+    model.set_input_embeddings(new_embeddings)
+
+    model.set_output_embeddings(torch.nn.Linear(old_embeddings.embedding_dim, len(kept_ids), bias=False))
+    model.config.vocab_size = len(kept_ids)
+    model.tie_weights()
+
+def parameter_mb(model) -> float:
+    return sum(p.numel() * p.element_size() for p in model.parameters()) / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune the M2M100 vocabulary to a set of languages")
+    parser.add_argument("--languages", required=True, help="Comma-separated language codes, e.g. en,de,fr")
+    parser.add_argument("--corpus", nargs="*", default=[], help="Text files whose tokens are always kept")
+    parser.add_argument("--model-path", default="api/models/m2m100")
+    parser.add_argument("--output", default="api/models/m2m100-pruned")
+    args = parser.parse_args()
+
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()]
+    tokenizer = M2M100Tokenizer.from_pretrained(args.model_path)
+    unknown = [lang for lang in languages if lang not in tokenizer.lang_code_to_id]
+    if unknown:
+        parser.error(f"Unknown language codes: {', '.join(unknown)}")
+
+    model = M2M100ForConditionalGeneration.from_pretrained(args.model_path)
+    model.eval()
+    original_vocab_size = model.config.vocab_size
+    original_mb = parameter_mb(model)
+
+    kept_ids = select_tokens(tokenizer, languages, args.corpus)
+    print(f"Keeping {len(kept_ids)} of {original_vocab_size} tokens for {', '.join(languages)}")
+    prune_model(model, kept_ids)
+
+    if os.path.exists(args.output):
+        print(f"Removing existing directory: {args.output}")
+        shutil.rmtree(args.output)
+    tokenizer.save_pretrained(args.output)
+    model.save_pretrained(args.output, safe_serialization=True)
+    with open(os.path.join(args.output, VOCAB_MAP_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            "languages": languages,
+            "original_vocab_size": original_vocab_size,
+            "unk_token_id": tokenizer.unk_token_id,
+            "kept_ids": kept_ids
+        }, f)
+
+    print(f"Parameters: {original_mb:.0f}MB -> {parameter_mb(model):.0f}MB")
+    print(f"Pruned model saved to: {args.output}")
+    print(f"Serve it with TRANSLATION_MODEL_SNAPSHOT={args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import pytest
+from api.artifacts import accepts_gzip, parse_range
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("br, *", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.0, *", False),
+    ("br, *;q=0", False),
+    ("identity", False),
+    ("", False),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
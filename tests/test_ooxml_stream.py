@@ -0,0 +1,114 @@
+import io
+import zipfile
+import pytest
+
+docx = pytest.importorskip("docx")
+pptx = pytest.importorskip("pptx")
+from pptx.util import Inches
+from api import ooxml_stream
+
+def translate(package: ooxml_stream.OoxmlPackage):
+    """Extract a package and write it back with every segment upper-cased."""
+    segments = package.extract()
+    return segments, package.write({segment.text: segment.text.upper() for segment in segments})
+
+def make_docx(paragraphs: int = 200) -> bytes:
+    document = docx.Document()
+    multi_run = document.add_paragraph()
+    multi_run.add_run("Hello ")
+    multi_run.add_run("bold").bold = True
+    multi_run.add_run(" world")
+    document.add_paragraph("Fish & Chips <served> \"hot\"")
+    for i in range(paragraphs):
+        document.add_paragraph(f"Paragraph number {i} with some filler text")
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+def make_pptx() -> bytes:
+    presentation = pptx.Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+    slide.shapes.title.text = "Title & <subtitle>"
+    text_frame = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(4), Inches(2)).text_frame
+    paragraph = text_frame.paragraphs[0]
+    paragraph.add_run().text = "First run, "
+    paragraph.add_run().text = "second run"
+    text_frame.add_paragraph().text = "Another paragraph"
+    output = io.BytesIO()
+    presentation.save(output)
+    return output.getvalue()
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_docx_round_trip(monkeypatch, chunk_size):
+    # Small chunks put text nodes, tags and entities across chunk boundaries
+    monkeypatch.setattr(ooxml_stream, "CHUNK_SIZE", chunk_size)
+    content = make_docx()
+    original = [paragraph.text for paragraph in docx.Document(io.BytesIO(content)).paragraphs]
+
+    segments, result = translate(ooxml_stream.OoxmlPackage(content, ".docx"))
+
+    assert [segment.text for segment in segments] == original
+    assert len(segments[0].nodes) == 3
+    translated = docx.Document(io.BytesIO(result))
+    assert [paragraph.text for paragraph in translated.paragraphs] == [text.upper() for text in original]
+    # The translation goes into the first run, keeping its formatting
+    assert [run.text for run in translated.paragraphs[0].runs] == ["HELLO BOLD WORLD", "", ""]
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_pptx_round_trip(monkeypatch, chunk_size):
+    monkeypatch.setattr(ooxml_stream, "CHUNK_SIZE", chunk_size)
+    content = make_pptx()
+
+    segments, result = translate(ooxml_stream.OoxmlPackage(content, ".pptx"))
+
+    assert [segment.text for segment in segments] == [
+        "Title & <subtitle>", "First run, second run", "Another paragraph"
+    ]
+    shapes = pptx.Presentation(io.BytesIO(result)).slides[0].shapes
+    assert shapes.title.text_frame.text == "TITLE & <SUBTITLE>"
+    assert shapes[1].text_frame.text == "FIRST RUN, SECOND RUN\nANOTHER PARAGRAPH"
+
+def replace_member(content: bytes, name: str, transform) -> bytes:
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(content)) as original, zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as result:
+        for info in original.infolist():
+            data = original.read(info)
+            result.writestr(info, transform(data) if info.filename == name else data)
+    return output.getvalue()
+
+@pytest.mark.parametrize("raw_copy", [True, False])
+def test_untranslated_members_are_copied_unchanged(monkeypatch, raw_copy):
+    # Without the zipfile internals, members are recompressed instead of copied raw
+    monkeypatch.setattr(ooxml_stream, "RAW_COPY_SUPPORTED", raw_copy)
+    content = make_docx(paragraphs=5)
+    _, result = translate(ooxml_stream.OoxmlPackage(content, ".docx"))
+
+    with zipfile.ZipFile(io.BytesIO(content)) as original, zipfile.ZipFile(io.BytesIO(result)) as translated:
+        assert translated.namelist() == original.namelist()
+        for name in original.namelist():
+            if name != "word/document.xml":
+                assert translated.read(name) == original.read(name)
+
+def test_encrypted_member_is_unsupported():
+    content = bytearray(make_docx(paragraphs=5))
+    # Set the encryption flag on every member in the central directory
+    offset = content.find(b"PK\x01\x02")
+    while offset != -1:
+        content[offset + 8] |= 0x1
+        offset = content.find(b"PK\x01\x02", offset + 4)
+
+    with pytest.raises(ooxml_stream.UnsupportedPackage):
+        ooxml_stream.OoxmlPackage(bytes(content), ".docx").extract()
+
+def test_comment_in_text_node_is_unsupported():
+    content = replace_member(make_docx(paragraphs=5), "word/document.xml",
+                             lambda data: data.replace(b">Hello ", b"><!-- note -->Hello ", 1))
+
+    with pytest.raises(ooxml_stream.UnsupportedPackage):
+        ooxml_stream.OoxmlPackage(content, ".docx").extract()
+
+def test_verify_checks_bytes_across_chunks():
+    chunks = [b"<w:t", b">Hi</w:t><w:t>", b"Yo</w:t>"]
+    assert b"".join(ooxml_stream.verify(chunks, [4, 12, 17], b">")) == b"".join(chunks)
+    with pytest.raises(ooxml_stream.UnsupportedPackage):
+        list(ooxml_stream.verify(chunks, [4, 13], b">"))
@@ -0,0 +1,44 @@
+import pytest
+from api.segment_filter import is_translatable, mask, unmask
+
+@pytest.mark.parametrize("text", [
+    "Save changes",
+    "(optional)",
+    "e.g.",
+    "etc.",
+    "[Draft]",
+    "File(s)",
+    "是",
+    "水",
+    "ア",
+    "Version 2",
+])
+def test_words_are_translatable(text):
+    assert is_translatable(text)
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "12.5%",
+    "2024-01-31",
+    "https://example.com/docs",
+    "support@example.com",
+    "AB-1234",
+    "{name}",
+    "x",
+    "foo_bar",
+    "__init__",
+    "camelCase",
+    "getValue()",
+    "items[0]",
+    "os.path",
+    "config.yaml",
+    "width=100",
+])
+def test_numbers_tokens_and_code_are_not_translatable(text):
+    assert not is_translatable(text)
+
+def test_mask_round_trip():
+    masked, tokens = mask("Order AB-1234 ships on 2024-01-31, see https://example.com")
+    assert "AB-1234" not in masked and "https://example.com" not in masked
+    assert unmask(masked, tokens) == ("Order AB-1234 ships on 2024-01-31, see https://example.com", True)
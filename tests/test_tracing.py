@@ -0,0 +1,42 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from api import tracing
+
+@pytest.fixture
+def spans(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracing.configure("file", str(path))
+    yield lambda: [json.loads(line) for line in path.read_text().splitlines()]
+    tracing.shutdown()
+
+def test_request_span_covers_streamed_body(spans):
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(3):
+                await asyncio.sleep(0.05)
+                with tracing.span("chunk", index=i):
+                    yield f"{i}\n"
+        return StreamingResponse(body(), media_type="text/plain")
+
+    response = TestClient(app).get("/stream", headers={"traceparent": f"00-{'a' * 32}-{'b' * 16}-01"})
+
+    assert response.text == "0\n1\n2\n"
+    recorded = spans()
+    request_span = next(span for span in recorded if span["name"] == "GET /stream")
+    assert response.headers["x-trace-id"] == request_span["trace_id"] == "a" * 32
+    assert request_span["parent_id"] == "b" * 16
+    assert request_span["attributes"]["http.status_code"] == 200
+    assert request_span["duration_ms"] >= 150
+    # The request span ends after the body, so it is exported after every chunk span
+    assert recorded[-1] is request_span
+    assert all(span["trace_id"] == request_span["trace_id"] for span in recorded)
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from api.admission import AdmissionController
+from api.routers import translation
+from api.scheduler import TranslationScheduler
+from api.stub_model import StubTranslationModel
+from api.document_translator import BATCH_MAX_CHARS
+
+class TruncatingStubModel(StubTranslationModel):
+    """Cuts batched inputs to a fixed length, like the tokenizer's max_length does."""
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        return super().translate_batch([text[:BATCH_MAX_CHARS] for text in texts], source_lang, target_lang)
+
+@pytest.fixture
+def app():
+    scheduler = TranslationScheduler()
+    scheduler.start()
+    translation.router.model = StubTranslationModel(latency_ms=0, token_latency_ms=0)
+    translation.router.scheduler = scheduler
+    translation.router.admission = AdmissionController()
+    app = FastAPI()
+    app.include_router(translation.router, prefix="/api")
+    yield app
+    scheduler.stop()
+
+def post_chunked(app, path: str, query: str, chunks, hold_after: int = None):
+    """POST a body as separate http.request messages, like a server receiving a chunked upload.
+
+    receive() yields to the event loop before every message, so tasks reading
+    the body concurrently interleave the way they do under uvicorn. With
+    hold_after, the chunks after that many are only sent once the response
+    has returned some output.
+    """
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    response_done = asyncio.Event()
+    output_sent = asyncio.Event()
+    sent = []
+    received = 0
+
+    async def receive():
+        nonlocal received
+        await asyncio.sleep(0.001)
+        if hold_after is not None and received >= hold_after:
+            await output_sent.wait()
+        if messages:
+            received += 1
+            return messages.pop(0)
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and message.get("body"):
+            output_sent.set()
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"content-type", b"application/x-ndjson")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+
+    async def run():
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+
+    asyncio.run(run())
+    status = next(message["status"] for message in sent if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return status, body.decode("utf-8")
+
+def test_stream_returns_every_record(app):
+    records = [{"id": f"r{i}", "text": f"Sentence number {i} to translate."} for i in range(4)]
+    chunks = [(json.dumps(record) + "\n").encode("utf-8") for record in records]
+
+    status, text = post_chunked(app, "/api/translate/stream/", "source_lang=en&target_lang=de", chunks)
+
+    assert status == 200
+    results = [json.loads(line) for line in text.splitlines()]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["id"] for result in results] == ["r0", "r1", "r2", "r3"]
+    assert [result["translation"] for result in results] == [f"[de] {record['text']}" for record in records]
+
+def test_stream_reports_bad_records_in_order(app):
+    chunks = [b'{"text": "First record."}\nnot js', b'on\n{"text": "Third record.", "target_lang": "fr"}\n']
+
+    status, text = post_chunked(app, "/api/translate/stream/", "source_lang=en&target_lang=de", chunks)
+
+    results = [json.loads(line) for line in text.splitlines()]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert results[0]["translation"] == "[de] First record."
+    assert "error" in results[1]
+    assert results[2]["translation"] == "[fr] Third record."
+
+def test_stream_returns_results_before_the_upload_ends(app):
+    records = [{"text": f"Sentence number {i}."} for i in range(translation.STREAM_BATCH_SIZE + 2)]
+    chunks = [(json.dumps(record) + "\n").encode("utf-8") for record in records]
+
+    # The last records are only sent after the first batch's results came back
+    status, text = post_chunked(app, "/api/translate/stream/", "source_lang=en&target_lang=de", chunks,
+                                hold_after=translation.STREAM_BATCH_SIZE + 1)
+
+    assert status == 200
+    assert [json.loads(line)["index"] for line in text.splitlines()] == list(range(len(records)))
+
+def test_stream_translates_long_records_whole(app):
+    translation.router.model = TruncatingStubModel(latency_ms=0, token_latency_ms=0)
+    long_text = "A long sentence that keeps going. " * 20
+    records = [{"text": "Short one."}, {"text": long_text}, {"text": "First line.\nSecond line."}]
+    chunks = [(json.dumps(record) + "\n").encode("utf-8") for record in records]
+
+    status, text = post_chunked(app, "/api/translate/stream/", "source_lang=en&target_lang=de", chunks)
+
+    assert len(long_text) > BATCH_MAX_CHARS
+    results = [json.loads(line) for line in text.splitlines()]
+    assert [result["translation"] for result in results] == [f"[de] {record['text']}" for record in records]